@@ -1,33 +1,337 @@
 import json
-from typing import List, Dict
-from tools.llm_interface import invoke_llm
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+from tools.llm_interface import invoke_llm_json, invoke_llm_stream
+from tools.json_stream import iter_json_array_items
+from tools.json_repair import extract_string_field, matches_schema
+from tools.token_utils import estimate_tokens
+from tools.prompt_compressor import compress_transcript, PROMPT_TOKEN_BUDGET
+from utils.exceptions import QuotaExceededError
+
+# Transcripts longer than this are answered question by question in "auto" mode
+PER_QUESTION_MIN_CHARS = 20000
+# Context sent with each question: a window of nearby sentences plus the
+# passages the transcript index retrieves for it, each within a token budget
+CONTEXT_SENTENCES_BEFORE = 6
+CONTEXT_SENTENCES_AFTER = 4
+LOCAL_CONTEXT_TOKENS = 600
+RETRIEVED_CONTEXT_TOKENS = 600
+MAX_CONCURRENT_ANSWERS = 4
+# An empty answer array, optionally in a markdown code fence
+EMPTY_ARRAY = re.compile(r"(```\w*\s*)?\[\s*\](\s*```)?")
+# Question of the last-resort answer made of the whole LLM output
+FULL_TRANSCRIPT_QUESTION = "(full transcript)"
+# Output schemas for constrained generation
+ANSWER_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"question": {"type": "STRING"}, "answer": {"type": "STRING"}},
+    "required": ["question", "answer"],
+}
+ANSWER_LIST_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"id": {"type": "STRING"}, "question": {"type": "STRING"}, "answer": {"type": "STRING"}},
+        "required": ["id", "question", "answer"],
+    },
+}
+
+
+def locate_question(question: str, sentences: List[str], start: int = 0) -> int:
+    """
+    Index of the transcript sentence an extracted question came from. The
+    question may be rephrased or carry its options, so sentences are scored
+    by word overlap; ties go to the first sentence at or after `start`.
+    """
+    words = set(re.findall(r"\w+", question.lower()))
+
+    def score(i):
+        sentence_words = set(re.findall(r"\w+", sentences[i].lower()))
+        union = words | sentence_words
+        return (len(words & sentence_words) / len(union) if union else 0.0, i >= start, -i)
+    return max(range(len(sentences)), key=score)
+
+
+def find_question_windows(transcript: str, language: str = "en", index=None, stats: Optional[dict] = None,
+                          questions: Optional[List[Dict]] = None, speaker_transcripts: Optional[List[dict]] = None,
+                          threads: int = 1) -> List[Dict]:
+    """
+    Pairs each question extracted by the question splitter with a bounded
+    window of surrounding sentences, plus relevant passages from `index`
+    (a TranscriptIndex) when given. `questions` are extracted from the
+    transcript when not given; their ids are kept in the windows. Contexts
+    are compressed, with token counts added to `stats`. Sentence segmentation
+    of long transcripts uses up to `threads` processes.
+    """
+    from tools.sentence_segmenter import segment_sentences
+
+    if questions is None:
+        from agents.question_splitter import extract_questions
+        questions, _ = extract_questions(transcript, language, speaker_transcripts)
+    sentences = segment_sentences(transcript, language, threads=threads)
+    windows = []
+    position = 0
+    for n, q in enumerate(questions, 1):
+        if not sentences:
+            break
+        i = position = locate_question(q["question"], sentences, position)
+        sentence = sentences[i]
+        before = sentences[max(0, i - CONTEXT_SENTENCES_BEFORE):i]
+        after = sentences[i + 1:i + 1 + CONTEXT_SENTENCES_AFTER]
+        # Drop the oldest context first when the window is over budget
+        while before and estimate_tokens(" ".join(before + [sentence] + after)) > LOCAL_CONTEXT_TOKENS:
+            before = before[1:]
+        context = " ".join(before + [sentence] + after)
+        if index is not None:
+            retrieved = [p["text"] for p in index.search(sentence, token_budget=RETRIEVED_CONTEXT_TOKENS)
+                         if p["text"] not in context]
+            if retrieved:
+                context = "\n".join(retrieved) + "\n...\n" + context
+        windows.append({
+            "id": q.get("id", str(n)),
+            "question": q["question"],
+            "context": compress_transcript(context, stats=stats),
+            "sentence_index": i,
+        })
+    return windows
+
+
+def answer_question(window: Dict, store=None) -> Dict:
+    """
+    Answers a single question from its context window. A near-duplicate in
+    `store` (an AnswerStore) is returned without calling the LLM. If the LLM
+    output is still not usable JSON after repair and one re-ask, the raw
+    output is used as the answer for this question only.
+    """
+    ids = {"id": window["id"]} if "id" in window else {}
+    if store is not None:
+        cached = store.lookup(window["question"])
+        if cached is not None:
+            return {**ids, "question": cached["question"], "answer": cached["answer"], "cached": True}
+    qa, llm_output = invoke_llm_json(
+        prompt_path="prompts/answer_generator_question.md",
+        llm_input={"question": window["question"], "context": window["context"]},
+        response_schema=ANSWER_SCHEMA
+    )
+    if qa is None:
+        return {**ids, "question": window["question"], "answer": llm_output.strip()}
+    return {**ids, "question": qa.get("question") or window["question"], "answer": qa.get("answer", "")}
+
+
+def answer_questions_concurrently(windows: List[Dict], max_workers: int = MAX_CONCURRENT_ANSWERS, store=None,
+                                  on_answer: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """
+    Answers all question windows in parallel and returns the answers in
+    transcript order. A failed question is skipped instead of failing the job;
+    the others keep the ids of their windows.
+    `on_answer` is called with each answer as soon as it is ready.
+    """
+    def safe_answer(window):
+        try:
+            result = answer_question(window, store)
+        except Exception as e:
+            if isinstance(e, QuotaExceededError):
+                raise
+            print(f"Answering question failed, skipping it: {e}")
+            return None
+        if on_answer is not None:
+            on_answer(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = [r for r in executor.map(safe_answer, windows) if r is not None]
+    cached = sum(1 for r in results if r.get("cached"))
+    if cached:
+        print(f"Answered {cached} of {len(results)} questions from the answer cache.")
+    return results
+
+
+def lookup_answers(questions: Optional[List[Dict]], store) -> Optional[List[Dict]]:
+    """
+    Answers every extracted question from `store`, or returns None if any of
+    them has no near-duplicate there; the full-context prompt then answers
+    them all, since it covers the whole transcript in one call anyway.
+    """
+    if not questions:
+        return None
+    answers = []
+    for q in questions:
+        cached = store.lookup(q["question"])
+        if cached is None:
+            return None
+        answers.append({"id": q.get("id", str(len(answers) + 1)), "question": cached["question"],
+                        "answer": cached["answer"], "cached": True})
+    return answers
+
+
+def remember_answers(qa_pairs: List[Dict], store):
+    """Adds newly generated answers to `store` for later jobs."""
+    items = [{"question": qa.get("question"), "answer": qa.get("answer"), "source": "generated"}
+             for qa in qa_pairs if not qa.get("cached") and qa.get("question") != FULL_TRANSCRIPT_QUESTION]
+    if items:
+        store.add_many(items)
+
+
+def stream_full_context_answers(transcript: str, token_budget: int = PROMPT_TOKEN_BUDGET, stats: Optional[dict] = None,
+                                metrics: Optional[dict] = None, stream_fn=None) -> Iterator[Dict]:
+    """
+    Answers every question in the transcript with a single full-context
+    prompt, compressed to `token_budget` tokens. The response is streamed and
+    each question/answer object is yielded as soon as the model closes it.
+    `metrics` receives the stream timings from `iter_json_array_items`, and
+    "reasked" the number of follow-up LLM calls.
+
+    Malformed items are repaired locally; the questions of items that cannot
+    be repaired (or lack an answer) are re-asked one by one. Output with no
+    usable array at all, or a stream cut off by an error, re-asks the whole
+    prompt once; only answers to new questions are then added.
+    """
+    context = compress_transcript(transcript, token_budget, stats)
+    status = {}
+    chunks = invoke_llm_stream(
+        prompt_path="prompts/answer_generator.md",
+        llm_input={"transcript": context},
+        stream_fn=stream_fn,
+        response_schema=ANSWER_LIST_SCHEMA,
+        status=status
+    )
+    raw = []
+    failed = []
+    found = 0
+    answered = set()
+    item_schema = ANSWER_LIST_SCHEMA["items"]
+    for qa in iter_json_array_items(chunks, metrics, raw, failed):
+        if not isinstance(qa, dict):
+            continue
+        if not matches_schema(qa, item_schema):
+            failed.append(json.dumps(qa, ensure_ascii=False))
+            continue
+        found += 1
+        answered.add(qa["question"].strip().lower())
+        yield qa
+    reasked = 0
+    # Targeted re-ask of the items that could not be used
+    for text in failed:
+        question = extract_string_field(text, "question")
+        if not question:
+            continue
+        reasked += 1
+        qa = answer_question({"question": question, "context": context})
+        found += 1
+        answered.add(question.strip().lower())
+        yield {"id": extract_string_field(text, "id") or str(found), **qa}
+    llm_output = "".join(raw).strip()
+    if status.get("truncated") or (not found and llm_output and not EMPTY_ARRAY.fullmatch(llm_output)):
+        reasked += 1
+        qa_pairs, llm_output = invoke_llm_json(
+            prompt_path="prompts/answer_generator.md",
+            llm_input={"transcript": context},
+            response_schema=ANSWER_LIST_SCHEMA
+        )
+        if qa_pairs:
+            yield from (qa for qa in qa_pairs if qa["question"].strip().lower() not in answered)
+        elif not found and llm_output.strip() and not EMPTY_ARRAY.fullmatch(llm_output.strip()):
+            # Last resort: treat the whole output as a single answer
+            yield {"id": "1", "question": FULL_TRANSCRIPT_QUESTION, "answer": llm_output.strip()}
+    if metrics is not None:
+        metrics["reasked"] = reasked
+
+
+def generate_full_context_answers(transcript: str, token_budget: int = PROMPT_TOKEN_BUDGET, stats: Optional[dict] = None) -> List[Dict]:
+    """
+    Answers every question in the transcript with a single full-context prompt.
+    """
+    return list(stream_full_context_answers(transcript, token_budget, stats))
+
+
+class AnswerEmitter:
+    """
+    Publishes answers as they are produced: records the time to the first
+    answer and appends each answer to a JSON-lines file that the backend can
+    show while the job is still running.
+    """
+
+    def __init__(self, partial_path: Optional[str] = None):
+        self.start = time.perf_counter()
+        self.partial_path = partial_path
+        self.time_to_first_answer = None
+        self.lock = threading.Lock()
+        if partial_path:
+            os.makedirs(os.path.dirname(partial_path) or ".", exist_ok=True)
+            open(partial_path, "w").close()
+
+    def __call__(self, qa: Dict):
+        with self.lock:
+            if self.time_to_first_answer is None:
+                self.time_to_first_answer = time.perf_counter() - self.start
+                print(f"First answer after {self.time_to_first_answer:.2f}s.")
+            if self.partial_path:
+                with open(self.partial_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(qa, ensure_ascii=False) + "\n")
 
 
 def answer_generator_agent(state: dict) -> dict:
     """
-    Generates answers for all questions in the transcript, using full context.
+    Generates answers for all questions in the transcript. Short transcripts
+    use one full-context prompt; long ones (or answer_mode "per_question")
+    are answered question by question in parallel with bounded context.
     """
     transcript = state["transcript"]
-    # Use a full-context prompt
-    llm_output = invoke_llm(
-        prompt_path="prompts/answer_generator_fullcontext.md",
-        llm_input={"transcript": transcript}
-    )
-    # Try to extract a JSON array of question/answer pairs from the LLM output
-    try:
-        start_index = llm_output.index('[')
-        end_index = llm_output.rindex(']') + 1
-        qa_str = llm_output[start_index:end_index]
-        qa_pairs = json.loads(qa_str)
-    except (ValueError, json.JSONDecodeError):
-        # Fallback: treat the whole output as a single answer
-        qa_pairs = [{"id": "1", "question": "(full transcript)", "answer": llm_output.strip()}]
-    # Map to output format (qid, question, answer)
+    mode = state.get("answer_mode") or "auto"
+    if mode == "auto":
+        mode = "per_question" if len(transcript) >= PER_QUESTION_MIN_CHARS else "full"
+
+    from tools.answer_cache import get_answer_store
+    store = get_answer_store()
+    qa_pairs = None
+    prompt_stats = {}
+    emit = AnswerEmitter(state.get("partial_answers_path"))
+    if mode == "per_question":
+        from tools.transcript_index import TranscriptIndex
+        language = state.get("language") or "en"
+        index = TranscriptIndex.from_transcript(transcript, state.get("speaker_transcripts"), language)
+        if state.get("index_path"):
+            # Keep the index for follow-up questions on this job
+            index.save(state["index_path"])
+        from orchestration.resources import thread_budget
+        windows = find_question_windows(transcript, language, index, prompt_stats, state.get("questions"),
+                                        state.get("speaker_transcripts"), thread_budget())
+        if windows:
+            qa_pairs = answer_questions_concurrently(windows, store=store, on_answer=emit)
+    if qa_pairs is None:
+        prompt_stats = {}
+        qa_pairs = lookup_answers(state.get("questions"), store)
+        if qa_pairs is not None:
+            print(f"Answered all {len(qa_pairs)} questions from the answer cache.")
+            for qa in qa_pairs:
+                emit(qa)
+        else:
+            qa_pairs = []
+            for qa in stream_full_context_answers(transcript, stats=prompt_stats):
+                emit(qa)
+                qa_pairs.append(qa)
+    remember_answers(qa_pairs, store)
+    print(f"Answer prompts: {prompt_stats.get('tokens_before', 0)} -> {prompt_stats.get('tokens_after', 0)} estimated tokens.")
+
+    # Map to output format (qid, question, answer); questions and answers
+    # are paired by qid downstream, so each qid must be unique
     answers = []
+    qids = set()
     for qa in qa_pairs:
+        qid = str(qa.get("id") or len(answers) + 1)
+        while qid in qids:
+            qid = str(int(qid) + 1) if qid.isdigit() else qid + "'"
+        qids.add(qid)
         answers.append({
-            "qid": qa.get("id", str(len(answers)+1)),
+            "qid": qid,
             "question": qa.get("question", ""),
             "answer": qa.get("answer", "")
         })
-    return {"answers": answers}
+    result = {"answers": answers, "prompt_tokens": {"answer_generator": prompt_stats}}
+    if emit.time_to_first_answer is not None:
+        result["timings"] = {"time_to_first_answer": emit.time_to_first_answer}
+    return result
@@ -1,18 +1,15 @@
-from tools.speech_to_text import transcribe_audio
+import os
+from typing import Iterator, List, Optional
+from tools.speech_to_text import transcribe_audio, new_upload_stats
 from tools.nlp_utils import detect_language
+from tools.profanity_filter import contains_profanity
 
-def audio_transcriber_agent(state: dict) -> dict:
+def iter_transcribed_segments(audio_file: str, speaker_timestamps: List[dict], language: Optional[str] = None, upload_stats: Optional[dict] = None) -> Iterator[dict]:
     """
-    Transcribes the audio file, detects the language if not provided,
-    and adds the transcript and language to the state.
+    Transcribes the audio speaker segment by speaker segment and yields each
+    segment as soon as its transcript is ready, so downstream text processing
+    can start before the whole file is transcribed.
     """
-    audio_file_to_transcribe = state.get("enhanced_audio_file") or state["audio_file"]
-    language = state.get("language")
-    speaker_timestamps = state.get("speaker_timestamps", [])
-
-    full_transcript_text = []
-    speaker_transcripts = []
-
     if speaker_timestamps:
         for entry in speaker_timestamps:
             speaker = entry["speaker"]
@@ -20,32 +17,87 @@ def audio_transcriber_agent(state: dict) -> dict:
             end = entry["end"]
             
             segment_transcript = transcribe_audio(
-                audio_file_to_transcribe,
+                audio_file,
                 language=language,
                 start_time=start,
-                end_time=end
+                end_time=end,
+                upload_stats=upload_stats
             )
-            full_transcript_text.append(f"[{speaker}]: {segment_transcript}")
-            speaker_transcripts.append({
+            yield {
                 "speaker": speaker,
                 "start": start,
                 "end": end,
                 "transcript": segment_transcript
-            })
+            }
     else:
         # Fallback to transcribing the whole audio if no speaker timestamps
-        transcript = transcribe_audio(audio_file_to_transcribe, language=language)
-        full_transcript_text.append(transcript)
-        speaker_transcripts.append({
+        transcript = transcribe_audio(audio_file, language=language, upload_stats=upload_stats)
+        yield {
             "speaker": "UNKNOWN",
             "start": 0,
             "end": -1, # Indicate full audio
             "transcript": transcript
-        })
+        }
+
+def format_segment(segment: dict) -> str:
+    """
+    Formats a transcribed segment as a transcript line.
+    """
+    if segment["speaker"] == "UNKNOWN" and segment["end"] == -1:
+        return segment["transcript"]
+    return f"[{segment['speaker']}]: {segment['transcript']}"
 
-    final_transcript = "\n".join(full_transcript_text)
+def audio_transcriber_agent(state: dict) -> dict:
+    """
+    Transcribes the audio file, detects the language if not provided,
+    and adds the transcript and language to the state. Transcription stops
+    at the first segment containing profanity. Each clean segment is handed
+    to question extraction as soon as it is transcribed, so questions are
+    detected while later segments are still being transcribed.
+    """
+    from agents.question_splitter import QuestionStream
+    audio_file_to_transcribe = state.get("enhanced_audio_file") or state["audio_file"]
+    language = state.get("language")
+    speaker_timestamps = state.get("speaker_timestamps", [])
+
+    upload_stats = new_upload_stats()
+    upload_stats["source_bytes"] = os.path.getsize(audio_file_to_transcribe)
+
+    # Check each segment as it arrives; on profanity, stop before transcribing the rest
+    speaker_transcripts = []
+    profanity_detected = False
+    question_stream = None
+    for segment in iter_transcribed_segments(audio_file_to_transcribe, speaker_timestamps, language, upload_stats):
+        speaker_transcripts.append(segment)
+        if contains_profanity(segment["transcript"]):
+            profanity_detected = True
+            print(f"Profanity in segment {len(speaker_transcripts)} of {max(len(speaker_timestamps), 1)}; skipping the remaining segments.")
+            break
+        if question_stream is None:
+            # Question detection needs the language before the transcript is complete
+            if not language:
+                language = detect_language(segment["transcript"])
+            question_stream = QuestionStream(language)
+        question_stream.put(format_segment(segment))
+    final_transcript = "\n".join(format_segment(segment) for segment in speaker_transcripts)
 
     if not language:
         language = detect_language(final_transcript)
 
-    return {"transcript": final_transcript, "language": language, "speaker_transcripts": speaker_transcripts}
+    print(f"Uploaded {upload_stats['uploaded_bytes']} bytes in {upload_stats['uploads']} request(s) "
+          f"for a {upload_stats['source_bytes']} byte source file.")
+
+    result = {"transcript": final_transcript, "language": language, "speaker_transcripts": speaker_transcripts, "upload_stats": upload_stats}
+    if profanity_detected:
+        result["profanity_detected"] = True
+        if question_stream is not None:
+            question_stream.cancel()
+    elif question_stream is not None:
+        try:
+            questions, prompt_stats = question_stream.close()
+            result["questions"] = questions
+            result["prompt_tokens"] = {"question_splitter": prompt_stats}
+        except Exception as e:
+            # The answer generator extracts the questions itself
+            print(f"Question extraction failed during transcription: {e}")
+    return result
@@ -1,14 +1,12 @@
 from pyannote.audio import Pipeline
-import torch
 import os
+import time
+from tools.audio_probe import probe_audio
+from tools.windowed_diarization import (
+    PIPELINE_NAME, WINDOWED_MIN_SECONDS, MIN_TURN_SECONDS, diarize_windowed, merge_short_turns
+)
 
-def diarization_agent(state: dict) -> dict:
-    """
-    Performs speaker diarization on the audio file.
-    """
-    audio_file = state.get("enhanced_audio_file") or state["audio_file"]
-    
-    # Initialize the diarization pipeline
+def load_diarization_pipeline():
     # You need to provide a Hugging Face token to use pyannote.audio models.
     # 1. Visit hf.co/pyannote/speaker-diarization and accept the user agreement.
     # 2. Generate a User Access Token: hf.co/settings/tokens
@@ -16,17 +14,17 @@ def diarization_agent(state: dict) -> dict:
     #    Alternatively, set the HF_HOME environment variable to a directory
     #    where your token can be stored, or pass the token directly.
     try:
-        pipeline = Pipeline.from_pretrained(
-            "pyannote/speaker-diarization",
+        return Pipeline.from_pretrained(
+            PIPELINE_NAME,
             use_auth_token=os.getenv("HF_TOKEN")
         )
     except Exception as e:
         raise Exception(f"Failed to load diarization pipeline. Please ensure you have accepted the user agreement for pyannote/speaker-diarization and are logged in to Hugging Face CLI or have set your HF_HOME environment variable. Error: {e}")
-    
-    # Perform diarization
+
+def diarize_single_pass(audio_file: str) -> list:
+    """Runs the pyannote pipeline over the whole file in one call."""
+    pipeline = load_diarization_pipeline()
     diarization = pipeline(audio_file)
-    
-    # Process the diarization output
     speaker_timestamps = []
     for turn, _, speaker in diarization.itertracks(yield_label=True):
         speaker_timestamps.append({
@@ -34,5 +32,46 @@ def diarization_agent(state: dict) -> dict:
             "start": turn.start,
             "end": turn.end
         })
-        
-    return {"speaker_timestamps": speaker_timestamps}
+    return speaker_timestamps
+
+def diarization_agent(state: dict) -> dict:
+    """
+    Performs speaker diarization on the audio file. Long recordings (or
+    diarization_mode "windowed") are diarized in overlapping windows in
+    parallel processes; turns shorter than diarization_min_turn are merged.
+    Single-pass turns are kept as pyannote returns them unless
+    diarization_min_turn is set.
+    """
+    audio_file = state.get("enhanced_audio_file") or state["audio_file"]
+    mode = state.get("diarization_mode") or "auto"
+    min_turn = state.get("diarization_min_turn")
+
+    info = probe_audio(audio_file) or {}
+    duration = info.get("duration")
+    if mode == "auto":
+        mode = "windowed" if duration and duration >= WINDOWED_MIN_SECONDS else "single"
+    if mode == "windowed" and not duration:
+        print("Audio duration unknown; diarizing in a single pass.")
+        mode = "single"
+
+    start = time.perf_counter()
+    if mode == "windowed":
+        # Stitching windows leaves fragments at the seams, so windowed turns are always merged
+        speaker_timestamps = diarize_windowed(audio_file, duration, state.get("diarization_workers"),
+                                              min_turn=MIN_TURN_SECONDS if min_turn is None else min_turn)
+        raw_turns = None
+    else:
+        speaker_timestamps = diarize_single_pass(audio_file)
+        raw_turns = len(speaker_timestamps)
+        if min_turn:
+            speaker_timestamps = merge_short_turns(speaker_timestamps, min_turn)
+
+    stats = {
+        "mode": mode,
+        "seconds": round(time.perf_counter() - start, 3),
+        "turns": len(speaker_timestamps),
+        "speakers": len({t["speaker"] for t in speaker_timestamps}),
+    }
+    if raw_turns is not None:
+        stats["raw_turns"] = raw_turns
+    return {"speaker_timestamps": speaker_timestamps, "diarization_stats": stats}
@@ -2,8 +2,11 @@ from tools.profanity_filter import contains_profanity
 
 def profanity_agent(state: dict) -> dict:
     """
-    Checks for profanity in the transcript.
+    Checks for profanity in the transcript, unless the transcriber already
+    found some.
     """
+    if state.get("profanity_detected"):
+        return {"profanity_detected": True}
     transcript = state["transcript"]
     if contains_profanity(transcript):
         return {"profanity_detected": True}
@@ -1,170 +1,190 @@
-import json
-import re
-from tools.llm_interface import invoke_llm
-from tools.nlp_utils import split_into_sentences, is_potential_question, QUESTION_WORDS
+import queue
+import threading
+from typing import Iterable, Iterator, List, Optional
+from tools.llm_interface import invoke_llm_json
+from tools.question_classifier import is_likely_question
+from tools.choice_parser import iter_question_fragments, choice_question
+from tools.preprocess_utils import preprocess_stream
+from tools.sentence_segmenter import segment_chunks
+from tools.token_utils import estimate_tokens
+from tools.prompt_compressor import compress_transcript, PROMPT_TOKEN_BUDGET
 
-def question_splitter_agent(state: dict) -> dict:
-    from tools.sensitive_topic_utils import detect_sensitive_topics
+# Budget for the preceding sentences sent along with each question
+QUESTION_CONTEXT_TOKENS = 500
+# Output schema for constrained generation
+QUESTION_LIST_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"id": {"type": "STRING"}, "question": {"type": "STRING"}},
+        "required": ["id", "question"],
+    },
+}
+
+def iter_transcript_sentences(pieces: Iterable[str], language: str = "en", flags: Optional[dict] = None) -> Iterator[str]:
     """
-    Extracts questions from the transcript using a language-aware hybrid approach.
+    Preprocesses transcript pieces as they arrive and yields their sentences.
     """
-    transcript = state["transcript"]
-    language = state.get("language", "en")
+    for chunk in preprocess_stream(pieces, flags=flags):
+        yield from segment_chunks([chunk], language, n_process=1)
+
+def _annotate(q: dict, detect_sensitive_topics) -> dict:
+    sensitive = detect_sensitive_topics(q["question"])
+    if sensitive:
+        q["sensitive_topics"] = sensitive
+    return q
 
-    import spacy
-    from tools.preprocess_utils import normalize_unicode, annotate_emojis, annotate_math_symbols
-    from tools.math_utils import normalize_math_phrases
-    nlp = spacy.load("en_core_web_sm")
-
-    # Step 1: Unicode normalization
-    norm_transcript = normalize_unicode(transcript)
-    # Step 2: Annotate emojis and math symbols for LLM/context
-    norm_transcript = annotate_emojis(norm_transcript)
-    norm_transcript = annotate_math_symbols(norm_transcript)
-    # Step 3: Normalize math phrases
-    norm_transcript, math_found = normalize_math_phrases(norm_transcript)
-    # Step 4: Remove filler words for cleaner processing
-    cleaned = re.sub(r"\b(uh|um|like|and then|so|the final one|and|uh,)\b", "", norm_transcript, flags=re.IGNORECASE)
-    # Step 5: Use spaCy for robust sentence segmentation
-    doc = nlp(cleaned)
-    sentences = [sent.text.strip() for sent in doc.sents if sent.text.strip()]
+def stream_questions(pieces: Iterable[str], language: str = "en", progress: Optional[dict] = None) -> Iterator[dict]:
+    """
+    Yields questions as soon as they are detected in a stream of transcript
+    pieces, e.g. speaker segments while later ones are still being transcribed.
+    Multiple-choice and true/false questions are parsed locally; only the
+    fragments the parser cannot resolve are rephrased by the LLM.
+    `progress` collects the sentences seen so far, the "math_found" flag and
+    the number of LLM calls made ("llm_calls") and avoided ("llm_calls_avoided").
+    """
+    from tools.sensitive_topic_utils import detect_sensitive_topics
+    if progress is None:
+        progress = {}
+    progress.setdefault("sentences", [])
+    progress.setdefault("math_found", False)
+    progress.setdefault("llm_calls", 0)
+    progress.setdefault("llm_calls_avoided", 0)
+
+    def sentences():
+        for sent in iter_transcript_sentences(pieces, language, progress):
+            progress["sentences"].append(sent)
+            yield sent
 
     # Group context sentences with each question for context-aware extraction
-    questions = []
+    count = 0
     context_buffer = []
-    for i, sent in enumerate(sentences):
-        if is_potential_question(sent, language):
+    # Only sentences the local classifier is confident about become questions
+    fragments = iter_question_fragments(sentences(), lambda sent: is_likely_question(sent, language))
+    for kind, item in fragments:
+        if kind == "context":
+            # Keep only the most recent sentences that fit the context budget
+            context_buffer.append(item)
+            while len(context_buffer) > 1 and estimate_tokens(" ".join(context_buffer)) > QUESTION_CONTEXT_TOKENS:
+                context_buffer.pop(0)
+            continue
+        parsed = choice_question(item, str(count + 1))
+        if parsed is not None:
+            progress["llm_calls_avoided"] += 1
+            qs = [_annotate(parsed, detect_sensitive_topics)]
+        else:
             # Group all previous context sentences with this question
-            context = " ".join(context_buffer + [sent])
+            context = " ".join(context_buffer + [item["text"]])
             # Use LLM to robustly rephrase the context+question if needed
-            llm_rephrased = invoke_llm(
+            progress["llm_calls"] += 1
+            qs, _ = invoke_llm_json(
                 prompt_path="prompts/question_splitter.md",
-                llm_input={"transcript": context}
+                llm_input={"transcript": context},
+                response_schema=QUESTION_LIST_SCHEMA
             )
-            try:
-                start_index = llm_rephrased.index('[')
-                end_index = llm_rephrased.rindex(']') + 1
-                questions_str = llm_rephrased[start_index:end_index]
-                qs = json.loads(questions_str)
-                for q in qs:
-                    sensitive = detect_sensitive_topics(q["question"])
-                    if sensitive:
-                        q["sensitive_topics"] = sensitive
-                    if math_found:
-                        q["is_math"] = True
-                questions.extend(qs)
-            except (ValueError, json.JSONDecodeError):
-                sensitive = detect_sensitive_topics(context)
-                q = {"id": str(len(questions)+1), "question": context}
-                if sensitive:
-                    q["sensitive_topics"] = sensitive
-                if math_found:
-                    q["is_math"] = True
-                questions.append(q)
-            context_buffer = []  # Reset buffer after a question
-        else:
-            # Add to context buffer if not a question
-            context_buffer.append(sent)
+            if qs is None:
+                qs = [{"id": str(count+1), "question": context}]
+            qs = [_annotate(q, detect_sensitive_topics) for q in qs]
+        for q in qs:
+            count += 1
+            # Ids number the questions of the whole stream, not of one LLM call
+            q["id"] = str(count)
+            yield q
+        context_buffer = []  # Reset buffer after a question
+
+class QuestionStream:
+    """
+    Runs stream_questions on a worker thread over the transcript pieces
+    passed to `put`, so questions are detected while later pieces are still
+    being transcribed. `close` returns the questions and prompt stats.
+    """
+
+    def __init__(self, language: str = "en"):
+        self.pieces = queue.Queue()
+        self.progress = {}
+        self.questions = []
+        self.error = None
+        self.cancelled = False
+        self.thread = threading.Thread(target=self._run, args=(language,), daemon=True)
+        self.thread.start()
+
+    def _iter_pieces(self) -> Iterator[str]:
+        while True:
+            piece = self.pieces.get()
+            if piece is None or self.cancelled:
+                return
+            yield piece
+
+    def _run(self, language: str):
+        try:
+            for q in stream_questions(self._iter_pieces(), language, self.progress):
+                self.questions.append(q)
+        except Exception as e:
+            self.error = e
+
+    def put(self, piece: str):
+        self.pieces.put(piece)
+
+    def cancel(self):
+        """Stops after the current piece, without waiting for the worker."""
+        self.cancelled = True
+        self.pieces.put(None)
+
+    def close(self):
+        """Waits for the pieces put so far; returns (questions, prompt_stats)."""
+        self.pieces.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return finish_questions(self.questions, self.progress)
+
+def finish_questions(questions: List[dict], progress: dict):
+    """
+    Completes the questions of a stream_questions run: if none were found,
+    the LLM is asked for the questions of the whole transcript. Returns
+    (questions, prompt_stats).
+    """
+    from tools.sensitive_topic_utils import detect_sensitive_topics
+    prompt_stats = {}
     # If no questions found, fallback to LLM for all sentences
-    if not questions:
-        potential_questions_str = "\n".join(sentences)
-        questions_raw = invoke_llm(
+    if not questions and progress.get("sentences"):
+        potential_questions_str = compress_transcript("\n".join(progress["sentences"]), PROMPT_TOKEN_BUDGET, prompt_stats)
+        progress["llm_calls"] += 1
+        questions, _ = invoke_llm_json(
             prompt_path="prompts/question_splitter.md",
-            llm_input={"transcript": potential_questions_str}
+            llm_input={"transcript": potential_questions_str},
+            response_schema=QUESTION_LIST_SCHEMA
         )
-        try:
-            start_index = questions_raw.index('[')
-            end_index = questions_raw.rindex(']') + 1
-            questions_str = questions_raw[start_index:end_index]
-            questions = json.loads(questions_str)
-            for q in questions:
-                sensitive = detect_sensitive_topics(q["question"])
-                if sensitive:
-                    q["sensitive_topics"] = sensitive
-                if math_found:
-                    q["is_math"] = True
-        except (ValueError, json.JSONDecodeError):
-            questions = []
-        # Collect answer choices from subsequent sentences
-        choices = []
-        choice_pattern = re.compile(r"([A-Da-d])[.,)]?\s*(\d+)")
-        for sent in sentences[question_idx+1:]:
-            found = choice_pattern.findall(sent)
-            if found:
-                choices.extend(found)
-            # Also handle sentences like "the final one, 51"
-            final_match = re.search(r"final one[,:]?\s*(\d+)", sent, re.IGNORECASE)
-            if final_match:
-                choices.append((chr(65+len(choices)), final_match.group(1)))
-        # If choices found, merge into a single question
-        if choices:
-            options = ", ".join([f"{label.upper()}. {value}" for label, value in choices])
-            merged_question = f"{sentences[question_idx]} {options}"
-            # Use LLM to robustly rephrase the question if needed
-            llm_rephrased = invoke_llm(
-                prompt_path="prompts/question_splitter.md",
-                llm_input={"transcript": merged_question}
-            )
-            try:
-                start_index = llm_rephrased.index('[')
-                end_index = llm_rephrased.rindex(']') + 1
-                questions_str = llm_rephrased[start_index:end_index]
-                questions = json.loads(questions_str)
-                # Sensitive topic detection for each question
-                for q in questions:
-                    sensitive = detect_sensitive_topics(q["question"])
-                    if sensitive:
-                        q["sensitive_topics"] = sensitive
-                    if math_found:
-                        q["is_math"] = True
-            except (ValueError, json.JSONDecodeError):
-                # Fallback: use merged_question directly
-                sensitive = detect_sensitive_topics(merged_question)
-                q = {"id": "1", "question": merged_question}
-                if sensitive:
-                    q["sensitive_topics"] = sensitive
-                if math_found:
-                    q["is_math"] = True
-                questions = [q]
-        else:
-            # Fallback to LLM for question extraction from all sentences
-            potential_questions_str = "\n".join(sentences)
-            questions_raw = invoke_llm(
-                prompt_path="prompts/question_splitter.md",
-                llm_input={"transcript": potential_questions_str}
-            )
-            try:
-                start_index = questions_raw.index('[')
-                end_index = questions_raw.rindex(']') + 1
-                questions_str = questions_raw[start_index:end_index]
-                questions = json.loads(questions_str)
-                for q in questions:
-                    sensitive = detect_sensitive_topics(q["question"])
-                    if sensitive:
-                        q["sensitive_topics"] = sensitive
-                    if math_found:
-                        q["is_math"] = True
-            except (ValueError, json.JSONDecodeError):
-                questions = []
+        questions = [_annotate(q, detect_sensitive_topics) for q in questions or []]
+    if progress.get("math_found"):
+        for q in questions:
+            q["is_math"] = True
+    prompt_stats["llm_calls"] = progress.get("llm_calls", 0)
+    prompt_stats["llm_calls_avoided"] = progress.get("llm_calls_avoided", 0)
+    return questions, prompt_stats
+
+def extract_questions(transcript: str, language: str = "en", speaker_transcripts: Optional[List[dict]] = None):
+    """
+    Extracts the questions of a finished transcript, speaker segment by
+    segment (or line by line without segments). Returns (questions, prompt_stats).
+    """
+    from agents.audio_transcriber import format_segment
+    if speaker_transcripts:
+        pieces = [format_segment(segment) for segment in speaker_transcripts]
     else:
-        # Fallback to LLM for question extraction from all sentences
-        potential_questions_str = "\n".join(sentences)
-        questions_raw = invoke_llm(
-            prompt_path="prompts/question_splitter.md",
-            llm_input={"transcript": potential_questions_str}
-        )
-        try:
-            start_index = questions_raw.index('[')
-            end_index = questions_raw.rindex(']') + 1
-            questions_str = questions_raw[start_index:end_index]
-            questions = json.loads(questions_str)
-            for q in questions:
-                sensitive = detect_sensitive_topics(q["question"])
-                if sensitive:
-                    q["sensitive_topics"] = sensitive
-                if math_found:
-                    q["is_math"] = True
-        except (ValueError, json.JSONDecodeError):
-            questions = []
-
-    return {"questions": questions}
+        pieces = transcript.split("\n")
+    progress = {}
+    questions = list(stream_questions(pieces, language, progress))
+    return finish_questions(questions, progress)
+
+def question_splitter_agent(state: dict) -> dict:
+    """
+    Extracts questions from the transcript using a language-aware hybrid approach.
+    """
+    language = state.get("language", "en")
+
+    # Preprocess and segment the transcript speaker segment by segment,
+    # detecting questions as sentences become available
+    questions, prompt_stats = extract_questions(state["transcript"], language, state.get("speaker_transcripts"))
+
+    return {"questions": questions, "prompt_tokens": {"question_splitter": prompt_stats}}
@@ -1,19 +1,29 @@
 
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
-import shutil
+import asyncio
+import functools
+import math
 import os
-import uuid
 import threading
+import uuid
 import time
 import json
 import sys
+from collections import OrderedDict
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Limit BLAS/OpenMP pools before numpy and torch are loaded
+from orchestration.resources import configure_process_threads
+configure_process_threads()
 from db import SessionLocal, init_db
 from models import User, AudioJob, Transcript, Question, Answer
+from scheduler import FairScheduler
+from utils.exceptions import CapacityExceededError
+from tools.storage import get_storage
 
 # Import your pipeline as a function
 from orchestration.pipeline import main as pipeline_main
@@ -61,30 +71,31 @@ def login(username: str, password: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return {"msg": "Login successful", "user_id": user.id}
 
-def run_pipeline_and_store(job_id, audio_path, user_id, db):
+# Caps concurrent pipeline runs and shares them fairly between users
+scheduler = FairScheduler()
+
+def run_pipeline_and_store(job_id, audio_path, user_id, asr_tier=None, cost=None):
+    """
+    Runs the pipeline for one job and stores its results. Runs on a
+    scheduler thread with its own database session; returns True when the
+    pipeline completed.
+    """
+    db = SessionLocal()
     try:
-        # Directly call the pipeline and get the result as a dict
+        job = db.query(AudioJob).get(job_id)
+        job.status = 'processing'
+        db.commit()
         from orchestration.pipeline import main as pipeline_main
-        # pipeline_main should be refactored to accept arguments and return a result dict
-        # We'll simulate command-line args using argparse.Namespace
-        import types
-        args = types.SimpleNamespace(
-            audio_file=audio_path,
-            output_format='json',
-            language=None,
-            enhance_audio=False
-        )
-        # Patch sys.argv for pipeline_main if needed
-        import sys
-        sys.argv = ["pipeline.py", audio_path, "--output_format", "json"]
-        # pipeline_main will save the output to outputs/{job_id}.json
-        pipeline_main()
-        import os, json
+        argv = [audio_path, "--output_format", "result"]
+        if asr_tier:
+            argv += ["--asr-tier", asr_tier]
+        # pipeline_main will save the output to outputs/{job_id}.a2a
+        pipeline_main(argv)
+        from orchestration.result_format import RESULT_EXTENSION, load_result
         output_filename = os.path.splitext(os.path.basename(audio_path))[0]
-        output_path = f"outputs/{output_filename}.json"
-        with open(output_path, "r") as f:
-            result = json.load(f)
-        job = db.query(AudioJob).get(job_id)
+        output_path = f"outputs/{output_filename}.{RESULT_EXTENSION}"
+        # Only decode the sections that are stored in the database
+        result = load_result(output_path, sections=["transcript", "questions", "answers", "math_results"])
         job.status = 'done'
         job.completed_at = time.strftime('%Y-%m-%d %H:%M:%S')
         # Store transcript
@@ -100,22 +111,87 @@ def run_pipeline_and_store(job_id, audio_path, user_id, db):
                     answer = Answer(question_id=question.id, answer_text=a['answer'], math_results=result.get('math_results'))
                     db.add(answer)
         db.commit()
+        get_storage().unpin(job_id)
+        return True
+    except SystemExit as e:
+        from orchestration.pipeline import EXIT_REQUEUE
+        db.rollback()
+        job = db.query(AudioJob).get(job_id)
+        if e.code == EXIT_REQUEUE:
+            # Out of LLM quota: park the job and rerun it when the shared budget refills
+            from tools.llm_quota import get_governor
+            retry_after = max(get_governor().status()["retry_after_seconds"], 1.0)
+            job.status = 'queued'
+            db.commit()
+            scheduler.submit_later(retry_after, job_id, user_id, cost,
+                                   functools.partial(run_pipeline_and_store, job_id, audio_path, user_id, asr_tier, cost))
+        else:
+            job.status = 'error'
+            db.commit()
+            get_storage().unpin(job_id)
     except Exception as e:
+        db.rollback()
         job = db.query(AudioJob).get(job_id)
         job.status = 'error'
         db.commit()
+        get_storage().unpin(job_id)
+    finally:
+        db.close()
+    return False
+
+def too_busy(error: CapacityExceededError):
+    return HTTPException(status_code=429, detail=str(error),
+                         headers={"Retry-After": str(max(1, math.ceil(error.retry_after or 0)))})
 
 @app.post("/api/upload-audio/")
-async def upload_audio(background_tasks: BackgroundTasks, file: UploadFile = File(...), user_id: int = 1, db: Session = Depends(get_db)):
+async def upload_audio(file: UploadFile = File(...), user_id: int = 1, asr_tier: str = None, db: Session = Depends(get_db)):
+    from tools.asr_tiers import WHISPER_TIERS
+    from tools.audio_probe import probe_audio
+    if asr_tier is not None and asr_tier not in WHISPER_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown ASR tier. Choose one of: {', '.join(WHISPER_TIERS)}")
+    # Reject before spending disk and I/O on the upload
+    try:
+        scheduler.check_admission(user_id)
+    except CapacityExceededError as e:
+        raise too_busy(e)
     job_id = str(uuid.uuid4())
     audio_path = os.path.join(UPLOAD_DIR, f"{job_id}_{file.filename}")
-    with open(audio_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    job = AudioJob(id=job_id, user_id=user_id, filename=file.filename, status='processing')
+    storage = get_storage()
+
+    def store_and_probe():
+        # Identical uploads share one copy on disk
+        storage.store_upload(file.file, audio_path)
+        storage.pin(job_id, [audio_path])
+        # Jobs are charged by audio duration
+        try:
+            return (probe_audio(audio_path) or {}).get("duration")
+        except OSError:
+            return None
+    # Copying and probing the upload blocks, so it runs off the event loop
+    cost = await run_in_threadpool(store_and_probe)
+    job = AudioJob(id=job_id, user_id=user_id, filename=file.filename, status='queued')
     db.add(job)
     db.commit()
-    background_tasks.add_task(run_pipeline_and_store, job_id, audio_path, user_id, db)
-    return {"job_id": job_id}
+    try:
+        ahead = scheduler.submit(job_id, user_id, cost,
+                                 functools.partial(run_pipeline_and_store, job_id, audio_path, user_id, asr_tier, cost))
+    except CapacityExceededError as e:
+        db.delete(job)
+        db.commit()
+        storage.unpin(job_id)
+        os.remove(audio_path)
+        raise too_busy(e)
+    return {"job_id": job_id, "queue_position": ahead}
+
+@app.get("/api/storage")
+def storage_report():
+    """Disk usage and budgets of uploads/, outputs/ and cache/, evictions and deduplication savings."""
+    return get_storage().report()
+
+@app.get("/api/scheduler")
+def scheduler_status():
+    """Running and queued pipeline jobs and the current wait estimate."""
+    return scheduler.status()
 
 @app.get("/api/result/{job_id}")
 def get_result(job_id: str, db: Session = Depends(get_db)):
@@ -135,7 +211,142 @@ def get_result(job_id: str, db: Session = Depends(get_db)):
     elif job.status == 'error':
         return {"status": "error"}
     else:
-        return {"status": job.status}
+        # Answers streamed so far by the running pipeline
+        output_filename = os.path.splitext(f"{job.id}_{job.filename}")[0]
+        partial_path = f"outputs/{output_filename}.partial.jsonl"
+        partial_answers = []
+        if os.path.exists(partial_path):
+            with open(partial_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        partial_answers.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # The last line may still be being written
+                        break
+        return {"status": job.status, "partial_answers": partial_answers}
+
+# Transcript indexes of recently asked jobs, kept for follow-up questions;
+# older ones are reloaded from their cache/ file when asked again
+JOB_INDEX_CACHE_SIZE = int(os.getenv("JOB_INDEX_CACHE_SIZE", "32"))
+_JOB_INDEXES = OrderedDict()
+_JOB_INDEXES_LOCK = threading.Lock()
+
+def get_job_index(job, db):
+    """
+    Returns the retrieval index of a finished job: from memory, from the
+    pipeline's cache/ file, or built once from the stored transcript.
+    """
+    from tools.transcript_index import TranscriptIndex
+    with _JOB_INDEXES_LOCK:
+        if job.id in _JOB_INDEXES:
+            _JOB_INDEXES.move_to_end(job.id)
+            return _JOB_INDEXES[job.id]
+    output_filename = os.path.splitext(f"{job.id}_{job.filename}")[0]
+    index_path = f"cache/{output_filename}.index.pkl"
+    if os.path.exists(index_path):
+        index = TranscriptIndex.load(index_path)
+        get_storage().touch(index_path)
+    else:
+        transcript = db.query(Transcript).filter_by(job_id=job.id).first()
+        index = TranscriptIndex.from_transcript(transcript.transcript_text if transcript else '')
+        os.makedirs("cache", exist_ok=True)
+        index.save(index_path)
+        get_storage().record(index_path)
+    with _JOB_INDEXES_LOCK:
+        _JOB_INDEXES[job.id] = index
+        if len(_JOB_INDEXES) > JOB_INDEX_CACHE_SIZE:
+            _JOB_INDEXES.popitem(last=False)
+    return index
+
+@app.post("/api/ask/{job_id}")
+def ask_followup(job_id: str, question: str, db: Session = Depends(get_db)):
+    from agents.answer_generator import answer_question
+    job = db.query(AudioJob).get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != 'done':
+        raise HTTPException(status_code=409, detail="Job is not finished")
+    context = get_job_index(job, db).context_for(question)
+    qa = answer_question({"question": question, "context": context})
+    return {"question": question, "answer": qa["answer"], "context": context}
+
+@app.get("/api/llm-quota")
+def llm_quota_status():
+    """Shared LLM budget: available requests, circuit breaker and wait times."""
+    from tools.llm_quota import get_governor
+    return get_governor().status()
+
+@app.websocket("/api/live")
+async def live_lecture(websocket: WebSocket, language: str = "en", user_id: int = 1):
+    """
+    Live lecture mode. The client sends 16 kHz mono s16le PCM as binary
+    messages and the text message "end" when the lecture is over; sentence,
+    question and answer events are pushed back as JSON while it runs.
+    Sessions hold a pipeline run slot for their whole length.
+    """
+    session_id = f"live-{uuid.uuid4()}"
+    try:
+        scheduler.claim(session_id, user_id)
+    except CapacityExceededError as e:
+        # 1013: try again later
+        await websocket.close(code=1013, reason=str(e))
+        return
+    try:
+        await run_live_session(websocket, language)
+    finally:
+        scheduler.release(session_id)
+
+async def run_live_session(websocket: WebSocket, language: str):
+    """Streams one admitted live session between the client and a LiveSession."""
+    from concurrent.futures import ThreadPoolExecutor
+    from orchestration.live import LiveSession
+    from tools.answer_cache import get_answer_store
+
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    # One worker per session keeps the audio chunks in order
+    feeder = ThreadPoolExecutor(max_workers=1)
+
+    def new_session():
+        # Loads Whisper and the answer store, so it must not run on the event loop
+        return LiveSession(lambda event: loop.call_soon_threadsafe(events.put_nowait, event),
+                           language=language, store=get_answer_store())
+    try:
+        session = await loop.run_in_executor(feeder, new_session)
+    except BaseException:
+        feeder.shutdown(wait=False)
+        raise
+
+    async def send_events():
+        while True:
+            event = await events.get()
+            await websocket.send_json(event)
+            if event["type"] == "summary":
+                return
+
+    sender = asyncio.create_task(send_events())
+    disconnected = False
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                disconnected = True
+                break
+            if message.get("bytes"):
+                await loop.run_in_executor(feeder, session.feed, message["bytes"])
+            elif message.get("text") == "end":
+                break
+        await loop.run_in_executor(feeder, session.close)
+        if disconnected:
+            sender.cancel()
+        else:
+            await sender
+            await websocket.close()
+    except WebSocketDisconnect:
+        sender.cancel()
+    finally:
+        feeder.shutdown(wait=False)
 
 @app.get("/api/history/")
 def get_history(user_id: int = 1, db: Session = Depends(get_db)):
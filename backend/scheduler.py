@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from utils.exceptions import CapacityExceededError
+
+# Fair-share scheduling of pipeline runs. At most MAX_CONCURRENT_RUNS run at
+# once; waiting jobs are ordered by weighted fair queuing on user_id with
+# the audio duration as cost. Each job gets the virtual finish tag
+#   F = max(V, last F of its user) + duration / weight
+# and the smallest tag runs next, so one user's backlog cannot starve
+# others, and among otherwise equal users shorter recordings go first.
+MAX_CONCURRENT_RUNS = int(os.getenv("PIPELINE_MAX_CONCURRENT", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("PIPELINE_MAX_QUEUED", "20"))
+MAX_QUEUED_PER_USER = int(os.getenv("PIPELINE_MAX_QUEUED_PER_USER", "5"))
+# Cost of a job whose duration could not be probed
+DEFAULT_COST_SECONDS = 300.0
+# Seconds of processing per second of audio until runs have been measured
+DEFAULT_SECONDS_PER_AUDIO_SECOND = 1.0
+RATE_SMOOTHING = 0.3
+
+
+class ScheduledJob:
+    def __init__(self, job_id: str, user_id, cost: float, run: Callable[[], bool], finish_tag: float, seq: int):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.cost = cost
+        self.run = run
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.started = None
+
+    def __lt__(self, other):
+        return (self.finish_tag, self.seq) < (other.finish_tag, other.seq)
+
+
+class FairScheduler:
+    """
+    Admission control and weighted fair queuing for pipeline runs. `submit`
+    queues a job or raises CapacityExceededError with a Retry-After estimate;
+    jobs run on their own threads as slots free up.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_RUNS, max_queued: int = MAX_QUEUED_JOBS,
+                 max_queued_per_user: int = MAX_QUEUED_PER_USER, weights: Optional[Dict] = None):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self.weights = weights or {}
+        self.queue = []
+        self.running = {}
+        self.virtual_time = 0.0
+        self.last_finish = {}
+        self.seconds_per_audio_second = DEFAULT_SECONDS_PER_AUDIO_SECOND
+        self.completed = 0
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+
+    def _queued_for(self, user_id) -> int:
+        return sum(1 for job in self.queue if job.user_id == user_id)
+
+    def _retry_after(self, extra_cost: float = 0.0) -> float:
+        """
+        Seconds until a new job would likely start: the queued audio plus what
+        is left of the running jobs, at the recent processing rate, spread
+        over the run slots.
+        """
+        now = time.monotonic()
+        remaining = sum(max(job.cost * self.seconds_per_audio_second - (now - job.started), 0.0)
+                        for job in self.running.values())
+        queued = sum(job.cost for job in self.queue) + extra_cost
+        return (remaining + queued * self.seconds_per_audio_second) / self.max_concurrent
+
+    def check_admission(self, user_id):
+        """Raises CapacityExceededError if a job from `user_id` would be rejected now."""
+        with self.lock:
+            self._check_admission(user_id)
+
+    def _check_admission(self, user_id):
+        if len(self.queue) >= self.max_queued:
+            raise CapacityExceededError("Too many jobs are waiting; try again later.", self._retry_after())
+        if self._queued_for(user_id) >= self.max_queued_per_user:
+            # Wait for this user's own backlog to shrink
+            own = [job for job in self.queue if job.user_id == user_id]
+            retry_after = min(job.cost for job in own) * self.seconds_per_audio_second
+            raise CapacityExceededError("You already have the maximum number of queued jobs.", retry_after)
+
+    def submit(self, job_id: str, user_id, cost: Optional[float], run: Callable[[], bool], admit: bool = True) -> int:
+        """
+        Queues `run` and returns the number of jobs ahead of it. With `admit`
+        False the admission limits are skipped (e.g. for requeued jobs).
+        """
+        cost = cost if cost and cost > 0 else DEFAULT_COST_SECONDS
+        with self.lock:
+            if admit:
+                self._check_admission(user_id)
+            weight = self.weights.get(user_id, 1.0)
+            finish_tag = max(self.virtual_time, self.last_finish.get(user_id, 0.0)) + cost / weight
+            self.last_finish[user_id] = finish_tag
+            job = ScheduledJob(job_id, user_id, cost, run, finish_tag, next(self.counter))
+            heapq.heappush(self.queue, job)
+            ahead = sum(1 for other in self.queue if other < job)
+        self._dispatch()
+        return ahead
+
+    def submit_later(self, delay: float, job_id: str, user_id, cost: Optional[float], run: Callable[[], bool]):
+        """Requeues a job after `delay` seconds, bypassing admission control."""
+        timer = threading.Timer(delay, self.submit, args=(job_id, user_id, cost, run), kwargs={"admit": False})
+        timer.daemon = True
+        timer.start()
+
+    def claim(self, job_id: str, user_id):
+        """
+        Takes a run slot right away for work that runs outside the queue,
+        such as a live session, or raises CapacityExceededError if none is
+        free. Call `release` when the work ends.
+        """
+        with self.lock:
+            self._check_admission(user_id)
+            if self.queue or len(self.running) >= self.max_concurrent:
+                raise CapacityExceededError("All pipeline slots are busy; try again later.", self._retry_after())
+            job = ScheduledJob(job_id, user_id, DEFAULT_COST_SECONDS, None, self.virtual_time, next(self.counter))
+            job.started = time.monotonic()
+            self.running[job_id] = job
+
+    def release(self, job_id: str):
+        """Frees a slot taken with `claim`, charging its user for the time held."""
+        with self.lock:
+            job = self.running.pop(job_id, None)
+            if job is not None:
+                held = time.monotonic() - job.started
+                weight = self.weights.get(job.user_id, 1.0)
+                self.last_finish[job.user_id] = max(self.virtual_time, self.last_finish.get(job.user_id, 0.0)) + held / weight
+        self._dispatch()
+
+    def _dispatch(self):
+        with self.lock:
+            while self.queue and len(self.running) < self.max_concurrent:
+                job = heapq.heappop(self.queue)
+                # Virtual time advances to the start tag of the job entering service
+                self.virtual_time = max(self.virtual_time, job.finish_tag - job.cost / self.weights.get(job.user_id, 1.0))
+                job.started = time.monotonic()
+                self.running[job.job_id] = job
+                threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job: ScheduledJob):
+        completed = False
+        try:
+            # `run` returns True when the pipeline ran to completion
+            completed = bool(job.run())
+        finally:
+            elapsed = time.monotonic() - job.started
+            with self.lock:
+                self.running.pop(job.job_id, None)
+                if completed:
+                    rate = elapsed / job.cost
+                    self.seconds_per_audio_second += RATE_SMOOTHING * (rate - self.seconds_per_audio_second)
+                    self.completed += 1
+            self._dispatch()
+
+    def status(self) -> Dict:
+        with self.lock:
+            users = {}
+            for job in self.queue:
+                users[str(job.user_id)] = users.get(str(job.user_id), 0) + 1
+            return {
+                "running": len(self.running),
+                "max_concurrent": self.max_concurrent,
+                "queued": len(self.queue),
+                "queued_by_user": users,
+                "seconds_per_audio_second": round(self.seconds_per_audio_second, 3),
+                "completed": self.completed,
+                "estimated_wait_seconds": round(self._retry_after(), 1),
+            }
@@ -4,6 +4,10 @@ import os
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
+# Limit BLAS/OpenMP pools before numpy and torch are loaded
+from orchestration.resources import configure_process_threads
+configure_process_threads()
+
 from orchestration.pipeline import main
 
 if __name__ == "__main__":
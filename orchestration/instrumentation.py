@@ -0,0 +1,190 @@
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+MB = 1024 * 1024
+RSS_SAMPLE_SECONDS = 0.05
+# Allocation sites listed per node when tracemalloc tracing is on
+TOP_ALLOCATIONS = 5
+# tracemalloc slows Python allocations down noticeably, so it is opt-in
+_TRACE_MEMORY = os.getenv("A2A_TRACE_MEMORY") == "1"
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def merge_dicts(left: dict, right: dict) -> dict:
+    """
+    State reducer that merges per-node metric dicts instead of overwriting them.
+    """
+    return {**(left or {}), **(right or {})}
+
+
+def timed_node(name: str, node):
+    """
+    Wraps a graph node so its wall-clock time is reported in state["timings"].
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        start = time.perf_counter()
+        result = node(state) or {}
+        # Keep any finer-grained timings the node reports itself
+        timings = dict(result.get("timings") or {}, **{name: time.perf_counter() - start})
+        return dict(result, timings=timings)
+    return wrapper
+
+
+@contextmanager
+def stage_timer(timings: dict, name: str):
+    """
+    Records the wall-clock time of a block of code in `timings[name]`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def set_memory_tracing(enabled: bool):
+    """Turns tracemalloc snapshots in `track_memory` on or off."""
+    global _TRACE_MEMORY
+    _TRACE_MEMORY = enabled
+
+
+def current_rss() -> int:
+    """
+    Resident set size of this process in bytes. Falls back to the peak RSS
+    where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RSSSampler(threading.Thread):
+    """Background thread recording the highest RSS seen until `stop`."""
+
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self) -> int:
+        self._stopped.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+# tracemalloc is process-global while graph nodes run on backend threads, so
+# concurrent `track_memory` blocks share one tracing session
+_TRACE_LOCK = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+_trace_sessions = 0
+
+
+def _begin_trace() -> tuple:
+    """
+    Joins the shared tracing session, starting tracemalloc for the first
+    user. Returns this block's session number and whether it is traced alone.
+    """
+    global _trace_users, _trace_owned, _trace_sessions
+    with _TRACE_LOCK:
+        if _trace_users == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _trace_owned = True
+            # Only the sole tracer may reset the peak without clobbering others
+            tracemalloc.reset_peak()
+        _trace_users += 1
+        _trace_sessions += 1
+        return _trace_sessions, _trace_users == 1
+
+
+def _end_trace(session: int, alone: bool) -> dict:
+    """
+    Reads the traced peak and a snapshot, then leaves the shared session,
+    stopping tracemalloc once the last user that started it is done.
+    """
+    global _trace_users, _trace_owned
+    entry = {}
+    with _TRACE_LOCK:
+        try:
+            if tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1]
+                snapshot = tracemalloc.take_snapshot()
+                alone = alone and _trace_users == 1 and _trace_sessions == session
+                entry = {"python_peak_mb": round(peak / MB, 1), "python_peak_shared": not alone}
+            else:
+                snapshot = None
+        finally:
+            _trace_users -= 1
+            if _trace_users == 0 and _trace_owned:
+                tracemalloc.stop()
+                _trace_owned = False
+    if snapshot is not None:
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        entry["top_allocations"] = [
+            {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "mb": round(stat.size / MB, 2)}
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        ]
+    return entry
+
+
+@contextmanager
+def track_memory(memory: dict, name: str):
+    """
+    Records the memory use of a block in `memory[name]`: RSS at start and
+    end, sampled peak RSS and, with tracing on, the peak of Python-tracked
+    allocations and the largest allocation sites still alive at the end.
+    When other blocks traced concurrently, the Python peak covers them too
+    and `python_peak_shared` is set.
+    """
+    trace = _TRACE_MEMORY
+    if trace:
+        session, alone = _begin_trace()
+    start_rss = current_rss()
+    sampler = RSSSampler()
+    sampler.start()
+    try:
+        yield
+    finally:
+        peak = sampler.stop()
+        entry = {
+            "rss_start_mb": round(start_rss / MB, 1),
+            "rss_end_mb": round(current_rss() / MB, 1),
+            "peak_rss_mb": round(peak / MB, 1),
+        }
+        if trace:
+            entry.update(_end_trace(session, alone))
+        memory[name] = entry
+
+
+def memory_node(name: str, node):
+    """
+    Wraps a graph node so its memory use is reported in state["memory"].
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        memory = {}
+        with track_memory(memory, name):
+            result = node(state) or {}
+        return dict(result, memory=memory)
+    return wrapper
@@ -0,0 +1,233 @@
+import bisect
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from orchestration.resources import get_scheduler
+from tools.asr_tiers import DEFAULT_TIER, parse_tier
+from tools.token_utils import estimate_tokens
+
+# Live lecture mode. Clients send 16 kHz mono s16le PCM in small chunks; the
+# session re-transcribes a rolling window of recent audio every STEP_SECONDS,
+# finalizes segments once they are HOLDBACK_SECONDS behind the live edge, and
+# answers each finalized sentence that looks like a question. Offensive
+# sentences are dropped before question detection.
+LIVE_SAMPLE_RATE = 16000
+STEP_SECONDS = 2.0
+HOLDBACK_SECONDS = 1.5
+# Upper bound on the audio decoded per step, which bounds the decode time
+WINDOW_SECONDS = 20.0
+# Target from the end of a spoken question to its answer reaching the client
+LATENCY_TARGET_SECONDS = 10.0
+CONTEXT_TOKENS = 600
+MAX_CONCURRENT_ANSWERS = 2
+SENTENCE_SPLIT = re.compile(r"(?<=[.?!])\s+")
+
+_TRANSCRIBE_LOCK = threading.Lock()
+
+
+def whisper_window_transcriber(tier: str = DEFAULT_TIER):
+    """
+    Returns transcribe(audio, language) -> segments over a warm Whisper
+    model shared by all live sessions of the process.
+    """
+    from tools.asr_math_pipeline import load_whisper_model
+    model = load_whisper_model(*parse_tier(tier))
+
+    def transcribe(audio: np.ndarray, language: Optional[str]) -> List[Dict]:
+        # One decode at a time: the model is shared between sessions. Decodes
+        # also take an ASR host slot, like the ASR stage of pipeline runs
+        with get_scheduler().stage("asr"), _TRANSCRIBE_LOCK:
+            result = model.transcribe(audio, language=language, condition_on_previous_text=False, fp16=False)
+        return [{"start": s["start"], "end": s["end"], "text": s["text"].strip()} for s in result["segments"]]
+    return transcribe
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    return float(np.percentile(values, q)) if values else None
+
+
+class LiveSession:
+    """
+    One live lecture. `feed` takes PCM chunks as they arrive; `on_event` is
+    called with "sentence", "profanity", "question", "answer" and, after
+    `close`, "summary" events (possibly from worker threads).
+    """
+
+    def __init__(self, on_event: Callable[[Dict], None], language: Optional[str] = "en", transcribe=None,
+                 answer_fn=None, store=None, latency_target: float = LATENCY_TARGET_SECONDS, profanity_fn=None):
+        if transcribe is None:
+            transcribe = whisper_window_transcriber()
+        if answer_fn is None:
+            from agents.answer_generator import answer_question
+            answer_fn = answer_question
+        if profanity_fn is None:
+            from tools.profanity_filter import contains_profanity
+            profanity_fn = contains_profanity
+        self.on_event = on_event
+        self.language = language
+        self.transcribe = transcribe
+        self.answer_fn = answer_fn
+        self.profanity_fn = profanity_fn
+        self.store = store
+        self.latency_target = latency_target
+        self.step_seconds = STEP_SECONDS
+
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_start = 0       # absolute sample index of buffer[0]
+        self.received = 0           # samples received so far
+        self.decoded_until = 0      # value of `received` at the last decode
+        self.arrivals = ([], [])    # (cumulative samples, wall-clock arrival time)
+        self.pending_text = ""
+        self.sentences = []
+        self.rejected = 0
+        self.questions = 0
+        self.latencies = []
+        self.decode_seconds = []
+        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_ANSWERS)
+        self.futures = []
+        self.event_lock = threading.Lock()
+
+    def _emit(self, event: Dict):
+        with self.event_lock:
+            self.on_event(event)
+
+    def feed(self, pcm: bytes):
+        """Adds a chunk of 16 kHz mono s16le PCM."""
+        pcm = pcm[:len(pcm) - len(pcm) % 2]
+        self.feed_samples(np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0)
+
+    def feed_samples(self, samples: np.ndarray):
+        """Adds float32 samples in [-1, 1]."""
+        self.buffer = np.concatenate([self.buffer, samples.astype(np.float32)])
+        self.received += len(samples)
+        self.arrivals[0].append(self.received)
+        self.arrivals[1].append(time.perf_counter())
+        if self.received - self.decoded_until >= self.step_seconds * LIVE_SAMPLE_RATE:
+            self._decode(final=False)
+
+    def _arrival_time(self, audio_seconds: float) -> float:
+        """Wall-clock time at which the audio up to `audio_seconds` had arrived."""
+        i = bisect.bisect_left(self.arrivals[0], int(audio_seconds * LIVE_SAMPLE_RATE))
+        return self.arrivals[1][min(i, len(self.arrivals[1]) - 1)]
+
+    def _decode(self, final: bool):
+        self.decoded_until = self.received
+        if len(self.buffer) == 0:
+            return
+        start = time.perf_counter()
+        segments = self.transcribe(self.buffer, self.language)
+        elapsed = time.perf_counter() - start
+        self.decode_seconds.append(elapsed)
+        # Never schedule decodes faster than they complete, or audio backs up
+        self.step_seconds = max(STEP_SECONDS, elapsed)
+
+        buffer_seconds = len(self.buffer) / LIVE_SAMPLE_RATE
+        horizon = buffer_seconds if final else buffer_seconds - HOLDBACK_SECONDS
+        if not final and buffer_seconds >= WINDOW_SECONDS and segments:
+            # Window full: finalize everything but the segment still being
+            # spoken, or that segment too if it fills the whole window
+            horizon = max(horizon, segments[-2]["end"] if len(segments) > 1 else segments[-1]["end"])
+        finalized = []
+        for segment in segments:
+            if segment["end"] > horizon:
+                break
+            finalized.append(segment)
+
+        offset = self.buffer_start / LIVE_SAMPLE_RATE
+        for segment in finalized:
+            self._add_text(segment["text"], offset + segment["end"])
+        if final:
+            self._add_text("", offset + buffer_seconds, flush=True)
+            cut = len(self.buffer)
+        elif finalized:
+            cut = int(finalized[-1]["end"] * LIVE_SAMPLE_RATE)
+        elif buffer_seconds >= WINDOW_SECONDS:
+            # Nothing final in a full window (silence or one long segment): drop the oldest half
+            cut = int(WINDOW_SECONDS / 2 * LIVE_SAMPLE_RATE)
+        else:
+            cut = 0
+        self.buffer = self.buffer[cut:]
+        self.buffer_start += cut
+
+    def _add_text(self, text: str, audio_end: float, flush: bool = False):
+        """Adds finalized text and handles every sentence it completes."""
+        if text:
+            self.pending_text = f"{self.pending_text} {text}".strip()
+        parts = SENTENCE_SPLIT.split(self.pending_text) if self.pending_text else []
+        if parts and not flush and not parts[-1].endswith((".", "?", "!")):
+            self.pending_text = parts.pop()
+        else:
+            self.pending_text = ""
+        for sentence in parts:
+            self._on_sentence(sentence, audio_end)
+
+    def _context(self) -> str:
+        context = []
+        for sentence in reversed(self.sentences):
+            if context and estimate_tokens(" ".join(context + [sentence])) > CONTEXT_TOKENS:
+                break
+            context.insert(0, sentence)
+        return " ".join(context)
+
+    def _on_sentence(self, sentence: str, audio_end: float):
+        from tools.question_classifier import is_likely_question
+        # Offensive sentences are neither shown, kept as context nor answered
+        if self.profanity_fn(sentence):
+            self.rejected += 1
+            self._emit({"type": "profanity", "end": round(audio_end, 2)})
+            return
+        self.sentences.append(sentence)
+        self._emit({"type": "sentence", "text": sentence, "end": round(audio_end, 2)})
+        if not is_likely_question(sentence, self.language or "en"):
+            return
+        self.questions += 1
+        qid = str(self.questions)
+        self._emit({"type": "question", "id": qid, "question": sentence, "end": round(audio_end, 2)})
+        window = {"question": sentence, "context": self._context()}
+        self.futures.append(self.executor.submit(self._answer, qid, window, self._arrival_time(audio_end)))
+
+    def _answer(self, qid: str, window: Dict, spoken_at: float):
+        try:
+            qa = self.answer_fn(window, self.store) if self.store is not None else self.answer_fn(window)
+        except Exception as e:
+            self._emit({"type": "error", "id": qid, "error": str(e)})
+            return
+        latency = time.perf_counter() - spoken_at
+        self.latencies.append(latency)
+        self._emit({
+            "type": "answer",
+            "id": qid,
+            "question": qa.get("question", window["question"]),
+            "answer": qa.get("answer", ""),
+            "latency": round(latency, 3),
+            "within_target": latency <= self.latency_target,
+        })
+
+    def stats(self) -> Dict:
+        return {
+            "audio_seconds": round(self.received / LIVE_SAMPLE_RATE, 2),
+            "sentences": len(self.sentences),
+            "rejected_sentences": self.rejected,
+            "questions": self.questions,
+            "answers": len(self.latencies),
+            "latency_target": self.latency_target,
+            "latency_p50": percentile(self.latencies, 50),
+            "latency_p95": percentile(self.latencies, 95),
+            "within_target": sum(1 for l in self.latencies if l <= self.latency_target),
+            "decode_p95": percentile(self.decode_seconds, 95),
+        }
+
+    def close(self) -> Dict:
+        """Finalizes the remaining audio, waits for pending answers and emits the summary."""
+        self._decode(final=True)
+        for future in self.futures:
+            future.result()
+        self.executor.shutdown()
+        summary = self.stats()
+        self._emit(dict(summary, type="summary"))
+        return summary
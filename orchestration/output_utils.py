@@ -1,9 +1,13 @@
 import json
 import os
-from fpdf import FPDF
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
 import jsonschema
 from utils.exceptions import InvalidOutputFormatError
 from tools.latex_utils import latex_to_unicode
+from orchestration.pdf_writer import StreamingPDFWriter
+from orchestration.result_format import RESULT_EXTENSION, save_as_result
 
 # Load the output schema
 SCHEMA_PATH = os.path.join(os.path.dirname(__file__), '..', 'schemas', 'output_schema.json')
@@ -23,19 +27,39 @@ def validate_output_data(data: dict):
     # No schema validation performed as per user request.
     pass
 
-def save_as_json(data: dict, output_path: str):
+# File extension for each output format
+OUTPUT_EXTENSIONS = {"json": "json", "text": "txt", "pdf": "pdf", "result": RESULT_EXTENSION}
+
+def atomic_write(output_path: str, write, mode: str = "w"):
+    """
+    Calls `write(f)` on a temporary file next to `output_path` and renames it
+    into place, so readers never see a partially written output.
     """
-    Saves the data as a JSON file.
+    directory = os.path.dirname(output_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            write(f)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def save_as_json(data: dict, output_path: str, indent: Optional[int] = None):
     """
-    with open(output_path, "w") as f:
-        json.dump(data, f, indent=4)
+    Saves the data as a JSON file. Compact unless `indent` is given.
+    """
+    separators = None if indent is not None else (",", ":")
+    atomic_write(output_path, lambda f: json.dump(data, f, indent=indent, separators=separators, ensure_ascii=False, default=str))
     print(f"Saved JSON output to {output_path}")
 
 def save_as_text(data: dict, output_path: str):
     """
     Saves the data as a plain text file.
     """
-    with open(output_path, "w") as f:
+    def write(f):
         f.write("--- Transcript ---\n")
         f.write(data["transcript"] + "\n\n")
         f.write("--- Questions ---\n")
@@ -47,42 +71,50 @@ def save_as_text(data: dict, output_path: str):
         for a in data["answers"]:
             f.write(f"QID: {a['qid']}\n")
             f.write(f"Answer: {a['answer']}\n\n")
+    atomic_write(output_path, write)
     print(f"Saved text output to {output_path}")
 
 def save_as_pdf(data: dict, output_path: str):
     """
-    Saves the data as a PDF file.
+    Saves the data as a PDF file, streamed to disk a page at a time.
     """
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-
-    # Calculate effective page width
-    page_width = pdf.w - 2 * pdf.l_margin
+    def write(f):
+        with StreamingPDFWriter(f) as pdf:
+            pdf.heading("Transcript")
+            pdf.paragraph(data["transcript"])
 
-    def write_to_pdf(text):
-        # Encode text to latin-1, replacing characters that can't be encoded
-        return text.encode('latin-1', 'replace').decode('latin-1')
+            pdf.new_page()
+            pdf.heading("Questions")
+            for q in data["questions"]:
+                # Convert LaTeX to Unicode for PDF output
+                pdf.paragraph(f"ID: {q['id']}\nQuestion: {latex_to_unicode(q['question'])}")
+                if q.get("options"):
+                    pdf.paragraph(f"Options: {', '.join(str(o) for o in q['options'])}")
 
-    pdf.cell(page_width, 10, txt="Transcript", ln=True, align='C')
-    pdf.multi_cell(page_width, 10, txt=write_to_pdf(data["transcript"]))
-    pdf.ln()
+            pdf.new_page()
+            pdf.heading("Answers")
+            for a in data["answers"]:
+                pdf.paragraph(f"QID: {a['qid']}\nAnswer: {latex_to_unicode(a['answer'])}")
+    atomic_write(output_path, write, mode="wb")
+    print(f"Saved PDF output to {output_path}")
 
-    pdf.add_page()
-    pdf.cell(page_width, 10, txt="Questions", ln=True, align='C')
-    for q in data["questions"]:
-        # Convert LaTeX to Unicode for PDF output
-        question_text = f"ID: {q['id']}\nQuestion: {latex_to_unicode(q['question'])}"
-        pdf.multi_cell(page_width, 10, txt=write_to_pdf(question_text))
-        pdf.ln()
+RENDERERS = {"json": save_as_json, "text": save_as_text, "pdf": save_as_pdf, "result": save_as_result}
 
-    pdf.add_page()
-    pdf.cell(page_width, 10, txt="Answers", ln=True, align='C')
-    for a in data["answers"]:
-        # Convert LaTeX to Unicode for PDF output
-        answer_text = f"QID: {a['qid']}\nAnswer: {latex_to_unicode(a['answer'])}"
-        pdf.multi_cell(page_width, 10, txt=write_to_pdf(answer_text))
-        pdf.ln()
-    
-    pdf.output(output_path)
-    print(f"Saved PDF output to {output_path}")
+def render_outputs(data: dict, output_base: str, formats: Iterable[str]) -> Dict[str, str]:
+    """
+    Renders `data` in every requested format concurrently, writing each to
+    `{output_base}.{extension}`. Returns the path written for each format.
+    """
+    formats = list(dict.fromkeys(formats))
+    for fmt in formats:
+        if fmt not in RENDERERS:
+            raise InvalidOutputFormatError(f"Unsupported output format: {fmt}")
+    paths = {fmt: f"{output_base}.{OUTPUT_EXTENSIONS[fmt]}" for fmt in formats}
+    if len(formats) == 1:
+        RENDERERS[formats[0]](data, paths[formats[0]])
+        return paths
+    with ThreadPoolExecutor(max_workers=len(formats)) as executor:
+        futures = [executor.submit(RENDERERS[fmt], data, paths[fmt]) for fmt in formats]
+        for future in futures:
+            future.result()
+    return paths
@@ -0,0 +1,126 @@
+import textwrap
+import zlib
+from typing import BinaryIO, List
+
+# A4 in points, laid out in a monospace font so line wrapping is exact
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+FONT_SIZE = 10
+LEADING = 12
+# Courier glyphs are 600/1000 em wide
+CHARS_PER_LINE = int((PAGE_WIDTH - 2 * MARGIN) / (FONT_SIZE * 0.6))
+LINES_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN) / LEADING)
+
+CATALOG_ID = 1
+PAGES_ID = 2
+FONT_ID = 3
+BOLD_FONT_ID = 4
+FIRST_PAGE_ID = 5
+
+
+def _escape(text: str) -> bytes:
+    # Same latin-1 fallback as the FPDF renderer used
+    data = text.encode("latin-1", "replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def wrap_text(text: str, width: int = CHARS_PER_LINE) -> List[str]:
+    """
+    Wraps text to `width` characters, keeping blank lines and hard-breaking
+    words that are longer than a line (long option lists, URLs, equations).
+    """
+    lines = []
+    for paragraph in text.replace("\t", "    ").split("\n"):
+        lines.extend(textwrap.wrap(paragraph, width=width, break_long_words=True, break_on_hyphens=False) or [""])
+    return lines
+
+
+class StreamingPDFWriter:
+    """
+    Writes a text-only PDF one page at a time. Only the current page's lines
+    and the byte offset of each object are kept in memory; finished pages
+    are compressed and flushed to the file immediately.
+    """
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.offsets = {}
+        self.page_ids = []
+        self.lines = []
+        self.position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(FONT_ID, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+        self._object(BOLD_FONT_ID, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>")
+        self.next_id = FIRST_PAGE_ID
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    def _write(self, data: bytes):
+        self.f.write(data)
+        self.position += len(data)
+
+    def _object(self, object_id: int, body: bytes):
+        self.offsets[object_id] = self.position
+        self._write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+
+    def _add_line(self, text: str, bold: bool = False, center: bool = False):
+        if len(self.lines) >= LINES_PER_PAGE:
+            self.new_page()
+        self.lines.append((text, bold, center))
+
+    def heading(self, text: str):
+        """Starts a section with a centered bold title line."""
+        for line in wrap_text(text):
+            self._add_line(line, bold=True, center=True)
+        self._add_line("")
+
+    def paragraph(self, text: str):
+        for line in wrap_text(text):
+            self._add_line(line)
+        self._add_line("")
+
+    def new_page(self):
+        """Flushes the current page to the file."""
+        if not self.lines:
+            return
+        ops = [b"BT", b"%d TL" % LEADING]
+        y = PAGE_HEIGHT - MARGIN - FONT_SIZE
+        for text, bold, center in self.lines:
+            x = MARGIN + ((CHARS_PER_LINE - len(text)) * FONT_SIZE * 0.6 / 2 if center else 0)
+            font = b"/F2" if bold else b"/F1"
+            ops.append(b"%s %d Tf 1 0 0 1 %.2f %d Tm (%s) Tj" % (font, FONT_SIZE, x, y, _escape(text)))
+            y -= LEADING
+        ops.append(b"ET")
+        content = zlib.compress(b"\n".join(ops))
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(content_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream")
+        self._object(page_id, (
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>"
+        ) % (PAGES_ID, PAGE_WIDTH, PAGE_HEIGHT, FONT_ID, BOLD_FONT_ID, content_id))
+        self.page_ids.append(page_id)
+        self.lines = []
+
+    def close(self):
+        """Flushes the last page and writes the page tree, xref table and trailer."""
+        self.new_page()
+        if not self.page_ids:
+            # A PDF needs at least one page
+            self._add_line("")
+            self.new_page()
+        kids = b" ".join(b"%d 0 R" % i for i in self.page_ids)
+        self._object(PAGES_ID, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)))
+        self._object(CATALOG_ID, b"<< /Type /Catalog /Pages %d 0 R >>" % PAGES_ID)
+        xref_offset = self.position
+        size = self.next_id
+        xref = [b"xref", b"0 %d" % size, b"0000000000 65535 f "]
+        xref += [b"%010d 00000 n " % self.offsets[i] for i in range(1, size)]
+        self._write(b"\n".join(xref) + b"\n")
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, CATALOG_ID, xref_offset))
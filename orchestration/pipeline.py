@@ -1,17 +1,39 @@
 import argparse
+import glob
 import os
-import subprocess
 import sys
+from orchestration.resources import get_scheduler, scheduled_node, plan_memory_modes, MEMORY_BUDGET_MB
+from concurrent.futures import ThreadPoolExecutor
 from langgraph.graph import StateGraph, END
-from utils.exceptions import LargeFileError, UnsupportedAudioFormatError, UnsupportedAudioCodecError, CorruptAudioError
+from langgraph.checkpoint.memory import MemorySaver
+from utils.exceptions import AudioProcessingError, LargeFileError, UnsupportedAudioFormatError, UnsupportedAudioCodecError, CorruptAudioError, QuotaExceededError
+from tools.audio_probe import probe_audio
 
 # Constants for audio validation
 MAX_AUDIO_FILE_SIZE_MB = 500  # 500 MB
 SUPPORTED_AUDIO_FORMATS = ['mp3', 'wav', 'flac', 'm4a', 'ogg']
 SUPPORTED_AUDIO_CODECS = ['mp3', 'pcm_s16le', 'flac', 'aac', 'opus']
-from typing import TypedDict, List, Optional
-
-def validate_audio_file(audio_file_path: str):
+# Exit status (EX_TEMPFAIL) telling the caller to requeue the job after the LLM quota refills
+EXIT_REQUEUE = 75
+from typing import Annotated, TypedDict, List, Optional
+
+def _normalize_format_name(format_name: Optional[str]) -> Optional[str]:
+    """
+    ffprobe reports demuxer lists such as "mov,mp4,m4a,3gp,3g2,mj2";
+    pick the entry we support, if any.
+    """
+    if not format_name:
+        return format_name
+    for name in format_name.split(","):
+        if name in SUPPORTED_AUDIO_FORMATS:
+            return name
+    return format_name
+
+def validate_audio_file(audio_file_path: str) -> dict:
+    """
+    Validates size, container format and codec of an audio file and returns
+    its stream information (format, codec, channels, sample_rate, duration).
+    """
     if not os.path.exists(audio_file_path):
         raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
     if not os.path.isfile(audio_file_path):
@@ -22,46 +44,55 @@ def validate_audio_file(audio_file_path: str):
     if file_size_mb > MAX_AUDIO_FILE_SIZE_MB:
         raise LargeFileError(f"Audio file size ({file_size_mb:.2f} MB) exceeds the maximum allowed size of {MAX_AUDIO_FILE_SIZE_MB} MB.")
 
-    # Validate format and codec using ffprobe
+    # Validate format and codec from the file header, falling back to ffprobe
     try:
-        cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-select_streams", "a:0",
-            "-show_entries", "stream=codec_name:format=format_name",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            audio_file_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        output = result.stdout.strip().split('\n')
-        
-        if len(output) < 2:
-            raise CorruptAudioError(f"Could not get audio stream information from {audio_file_path}. It might be corrupt or not an audio file.")
-
-        codec_name = output[0]
-        format_name = output[1]
-
-        if format_name not in SUPPORTED_AUDIO_FORMATS:
-            raise UnsupportedAudioFormatError(f"Unsupported audio format: {format_name}. Supported formats are: {', '.join(SUPPORTED_AUDIO_FORMATS)}")
-        
-        if codec_name not in SUPPORTED_AUDIO_CODECS:
-            raise UnsupportedAudioCodecError(f"Unsupported audio codec: {codec_name}. Supported codecs are: {', '.join(SUPPORTED_AUDIO_CODECS)}")
-
-    except subprocess.CalledProcessError as e:
-        raise CorruptAudioError(f"ffprobe failed to analyze audio file: {e.stderr.strip()}")
-    except Exception as e:
-        raise CorruptAudioError(f"An unexpected error occurred during audio file analysis: {e}")
+        info = probe_audio(audio_file_path)
+    except OSError as e:
+        raise CorruptAudioError(f"Could not read audio file {audio_file_path}: {e}")
+
+    if info is None or not info.get("codec") or not info.get("format"):
+        raise CorruptAudioError(f"Could not get audio stream information from {audio_file_path}. It might be corrupt or not an audio file.")
+
+    format_name = _normalize_format_name(info["format"])
+    codec_name = info["codec"]
+
+    if format_name not in SUPPORTED_AUDIO_FORMATS:
+        raise UnsupportedAudioFormatError(f"Unsupported audio format: {format_name}. Supported formats are: {', '.join(SUPPORTED_AUDIO_FORMATS)}")
+
+    if codec_name not in SUPPORTED_AUDIO_CODECS:
+        raise UnsupportedAudioCodecError(f"Unsupported audio codec: {codec_name}. Supported codecs are: {', '.join(SUPPORTED_AUDIO_CODECS)}")
+
+    return dict(info, format=format_name)
+
+def validate_audio_files(audio_file_paths: List[str], max_workers: int = 8) -> dict:
+    """
+    Validates many audio files concurrently. Returns a mapping of path to the
+    stream information, or to the exception raised for that file.
+    """
+    def validate(path):
+        try:
+            return validate_audio_file(path)
+        except (FileNotFoundError, ValueError, AudioProcessingError) as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(audio_file_paths, executor.map(validate, audio_file_paths)))
 
 
 from agents.profanity_agent import profanity_agent
+from tools.profanity_filter import contains_profanity
 from agents.audio_enhancer_agent import audio_enhancer_agent
 from agents.diarization_agent import diarization_agent
 from agents.audio_transcriber import audio_transcriber_agent
 from tools.asr_math_pipeline import transcribe_audio_whisper, normalize_math_llm
+from tools.asr_tiers import WHISPER_TIERS, DEFAULT_TIER, DEFAULT_BATCH_SIZE
 from tools.math_utils import normalize_math_phrases, parse_equation, solve_equation, compute_derivative, compute_integral, to_latex
 from agents.question_splitter import question_splitter_agent
 from agents.answer_generator import answer_generator_agent
-from orchestration.output_utils import save_as_json, save_as_text, save_as_pdf
+from orchestration.output_utils import render_outputs, validate_output_data
+from orchestration.result_format import RESULT_EXTENSION, load_result, save_as_result
+from orchestration.instrumentation import merge_dicts, timed_node, stage_timer, memory_node, track_memory, set_memory_tracing
+from tools.storage import get_storage
 
 class AppState(TypedDict):
     audio_file: str
@@ -74,16 +105,31 @@ class AppState(TypedDict):
     speaker_timestamps: List[dict]
     speaker_transcripts: List[dict]
     profanity_detected: bool
+    upload_stats: dict
+    answer_mode: Optional[str]
+    index_path: Optional[str]
+    timings: Annotated[dict, merge_dicts]
+    prompt_tokens: Annotated[dict, merge_dicts]
+    partial_answers_path: Optional[str]
+    diarization_mode: Optional[str]
+    diarization_min_turn: Optional[float]
+    diarization_workers: Optional[int]
+    diarization_stats: dict
+    memory: Annotated[dict, merge_dicts]
+
+def graph_node(name: str, agent):
+    """A graph node run under its CPU budget, with its time and memory use recorded."""
+    return timed_node(name, memory_node(name, scheduled_node(name, agent)))
 
 # Build the graph
 workflow = StateGraph(AppState)
 
-workflow.add_node("enhancer", audio_enhancer_agent)
-workflow.add_node("diarizer", diarization_agent)
-workflow.add_node("transcriber", audio_transcriber_agent)
-workflow.add_node("profanity_checker", profanity_agent)
+workflow.add_node("enhancer", graph_node("enhancer", audio_enhancer_agent))
+workflow.add_node("diarizer", graph_node("diarizer", diarization_agent))
+workflow.add_node("transcriber", graph_node("transcriber", audio_transcriber_agent))
+workflow.add_node("profanity_checker", graph_node("profanity_checker", profanity_agent))
 
-workflow.add_node("generator", answer_generator_agent)
+workflow.add_node("generator", graph_node("generator", answer_generator_agent))
 workflow.add_edge("enhancer", "diarizer")
 workflow.add_edge("diarizer", "transcriber")
 workflow.add_edge("transcriber", "profanity_checker")
@@ -105,9 +151,12 @@ def should_enhance(state: AppState):
 
 workflow.set_conditional_entry_point(should_enhance)
 
-app = workflow.compile()
+# Node outputs are checkpointed per run, so a retry resumes after the last
+# completed node instead of re-running diarization and transcription
+checkpointer = MemorySaver()
+app = workflow.compile(checkpointer=checkpointer)
 
-def main():
+def main(argv: Optional[List[str]] = None):
     from dotenv import load_dotenv
     load_dotenv()
     from huggingface_hub import login
@@ -118,15 +167,23 @@ def main():
         print("Warning: HF_TOKEN environment variable not set. Diarization might fail if the model requires authentication.")
     parser = argparse.ArgumentParser(description="Audio-to-Answer Pipeline")
     parser.add_argument("audio_file", help="Path to the audio file to process.")
-    parser.add_argument("--output_format", choices=["json", "text", "pdf"], default="json", help="Desired output format.")
+    parser.add_argument("--output_format", nargs="+", choices=["json", "text", "pdf", "result"], default=["json"], help="Desired output format(s). Several formats are rendered in parallel; 'result' is the compact binary container.")
     parser.add_argument("--language", help="Language of the audio file (e.g., 'en', 'es'). If not provided, language will be auto-detected.")
     parser.add_argument("--enhance-audio", action="store_true", help="Enhance the audio before transcription to improve quality.")
     parser.add_argument("--feedback", action="store_true", help="Enable human-in-the-loop feedback.")
-    args = parser.parse_args()
+    parser.add_argument("--answer-mode", choices=["auto", "full", "per_question"], default="auto", help="Answer with one full-context prompt, per question with bounded context in parallel, or pick by transcript length.")
+    parser.add_argument("--asr-tier", choices=WHISPER_TIERS, default=DEFAULT_TIER, help="Whisper model size, with '-int8' for the int8-quantized CPU variant (default from WHISPER_TIER, else 'base').")
+    parser.add_argument("--asr-batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Number of 30-second windows decoded per forward pass; 1 uses Whisper's sequential transcription.")
+    parser.add_argument("--diarization", choices=["auto", "single", "windowed"], default="auto", help="Diarize in one pass, in overlapping windows in parallel processes, or pick by recording length.")
+    parser.add_argument("--memory-budget-mb", type=float, default=MEMORY_BUDGET_MB, help="Memory budget for the job. Recordings whose estimated footprint exceeds it are transcribed and diarized in streamed windows (default from A2A_MEMORY_BUDGET_MB, else unlimited).")
+    parser.add_argument("--trace-memory", action="store_true", help="Record tracemalloc peaks and top allocation sites per stage (slower).")
+    parser.add_argument("--min-turn-seconds", type=float, default=None, help="Join same-speaker turns and absorb turns shorter than this many seconds (default 1.0 for windowed diarization, off for a single pass).")
+    args = parser.parse_args(argv)
 
     import time
     import pickle
     import json
+    import uuid
 
     # Create feedback directory if it doesn't exist
     feedback_dir = "feedback"
@@ -146,23 +203,55 @@ def main():
         output_filename = f"{job_id}_{audio_hash}"
     else:
         output_filename = os.path.splitext(os.path.basename(args.audio_file))[0]
-    output_path = f"outputs/{output_filename}.{args.output_format}"
-    transcript_cache_path = f"cache/{output_filename}.transcript.pkl"
-    answer_cache_path = f"cache/{output_filename}.answers.pkl"
+    output_base = f"outputs/{output_filename}"
+    transcript_cache_path = f"cache/{output_filename}.{args.asr_tier}.transcript.pkl"
+    answer_cache_path = f"cache/{output_filename}.result.{RESULT_EXTENSION}"
+    index_path = f"cache/{output_filename}.index.pkl"
+    # Answers are appended here as they are generated, for display while the job runs
+    partial_answers_path = f"{output_base}.partial.jsonl"
     feedback_path = f"feedback/{output_filename}.json"
 
+    # Wall-clock time and memory use of the stages that run before the graph
+    timings = {}
+    memory = {}
+    if args.trace_memory:
+        set_memory_tracing(True)
+
+    # Keep this job's input and artifacts out of storage eviction while it runs
+    storage = get_storage()
+    audio_stem = os.path.splitext(os.path.basename(args.audio_file))[0]
+    artifact_prefixes = [output_base, f"cache/{output_filename}.", f"outputs/{audio_stem}_enhanced"]
+    storage.pin(output_base, [args.audio_file] + artifact_prefixes)
+
     try:
-        validate_audio_file(args.audio_file)
+        with stage_timer(timings, "validation"):
+            audio_info = validate_audio_file(args.audio_file)
+
+        # Switch to streamed/windowed stages if the whole-file ones would not fit in memory
+        memory_plan = plan_memory_modes(audio_info, args.memory_budget_mb, args.asr_tier)
+        if memory_plan["asr_stream"]:
+            print(f"Estimated ASR footprint {memory_plan['estimated_mb']['asr']:.0f} MB exceeds the {args.memory_budget_mb:.0f} MB budget; streaming the audio in windows.")
+        diarization_mode = args.diarization
+        if memory_plan["diarization_mode"]:
+            if diarization_mode == "single":
+                print(f"Warning: single-pass diarization is estimated at {memory_plan['estimated_mb']['diarizer']:.0f} MB, over the memory budget.")
+            else:
+                print(f"Estimated diarization footprint {memory_plan['estimated_mb']['diarizer']:.0f} MB exceeds the budget; diarizing in windows with {memory_plan['diarization_workers']} worker(s).")
+                diarization_mode = memory_plan["diarization_mode"]
 
         # --- ASR: Transcribe audio to text using Whisper ---
+        asr_start = time.perf_counter()
         if os.path.exists(transcript_cache_path):
             with open(transcript_cache_path, 'rb') as f:
                 transcript = pickle.load(f)
             print("Loaded cached transcript.")
+            storage.touch(transcript_cache_path)
         else:
             for attempt in range(MAX_RETRIES):
                 try:
-                    transcript = transcribe_audio_whisper(args.audio_file)
+                    with get_scheduler().stage("asr", timings), track_memory(memory, "asr"):
+                        transcript = transcribe_audio_whisper(args.audio_file, args.asr_tier, args.asr_batch_size, args.language,
+                                                              stream=memory_plan["asr_stream"])
                     with open(transcript_cache_path, 'wb') as f:
                         pickle.dump(transcript, f)
                     break
@@ -172,22 +261,29 @@ def main():
                         print("Transcription failed after retries. Exiting.")
                         sys.exit(1)
                     time.sleep(RETRY_DELAY)
+        timings["asr"] = time.perf_counter() - asr_start
+
+        # Reject offensive uploads before any LLM call or diarization
+        if contains_profanity(transcript):
+            print("Offensive language detected in the audio. Please revise the audio.")
+            return
 
         # --- Math Normalization: Use Gemini LLM and regex/rules ---
+        math_start = time.perf_counter()
         for attempt in range(MAX_RETRIES):
             try:
                 math_normalized = normalize_math_llm(transcript)
                 math_normalized, math_found = normalize_math_phrases(math_normalized)
                 break
             except Exception as e:
-                if 'quota' in str(e).lower() or 'rate limit' in str(e).lower():
-                    print("LLM API quota exceeded. Please try again later or check your API limits.")
-                    sys.exit(1)
+                if isinstance(e, QuotaExceededError):
+                    raise
                 print(f"Math normalization failed (attempt {attempt+1}/{MAX_RETRIES}): {e}")
                 if attempt == MAX_RETRIES-1:
                     print("Math normalization failed after retries. Exiting.")
                     sys.exit(1)
                 time.sleep(RETRY_DELAY)
+        timings["math_normalization"] = time.perf_counter() - math_start
 
         # --- (Optional) Math Parsing/Solving: Use SymPy if math detected ---
         if math_found:
@@ -215,30 +311,47 @@ def main():
             "language": args.language,
             "enhance_audio": args.enhance_audio,
             "transcript": math_normalized,
+            "answer_mode": args.answer_mode,
+            "index_path": index_path,
+            "partial_answers_path": partial_answers_path,
+            "diarization_mode": diarization_mode,
+            "diarization_workers": memory_plan["diarization_workers"],
+            "diarization_min_turn": args.min_turn_seconds,
         }
 
         # Run the pipeline (diarization, profanity, then generator/LLM full-context answer)
         final_state = None
         if os.path.exists(answer_cache_path):
-            with open(answer_cache_path, 'rb') as f:
-                final_state = pickle.load(f)
+            final_state = load_result(answer_cache_path)
             print("Loaded cached answers.")
+            storage.touch(answer_cache_path)
         else:
-            for attempt in range(MAX_RETRIES):
-                try:
-                    final_state = app.invoke(initial_state)
-                    with open(answer_cache_path, 'wb') as f:
-                        pickle.dump(final_state, f)
-                    break
-                except Exception as e:
-                    if 'quota' in str(e).lower() or 'rate limit' in str(e).lower():
-                        print("LLM API quota exceeded. Please try again later or check your API limits.")
-                        sys.exit(1)
-                    print(f"Answer generation failed (attempt {attempt+1}/{MAX_RETRIES}): {e}")
-                    if attempt == MAX_RETRIES-1:
-                        print("Answer generation failed after retries. Exiting.")
-                        sys.exit(1)
-                    time.sleep(RETRY_DELAY)
+            thread_id = f"{output_filename}-{uuid.uuid4().hex}"
+            run_config = {"configurable": {"thread_id": thread_id}}
+            try:
+                for attempt in range(MAX_RETRIES):
+                    try:
+                        # Resume from the checkpoint of a failed attempt
+                        snapshot = app.get_state(run_config) if attempt else None
+                        graph_input = None if snapshot is not None and snapshot.next else initial_state
+                        final_state = app.invoke(graph_input, run_config)
+                        save_as_result(final_state, answer_cache_path)
+                        break
+                    except Exception as e:
+                        if isinstance(e, QuotaExceededError):
+                            raise
+                        print(f"Answer generation failed (attempt {attempt+1}/{MAX_RETRIES}): {e}")
+                        if attempt == MAX_RETRIES-1:
+                            print("Answer generation failed after retries. Exiting.")
+                            sys.exit(1)
+                        time.sleep(RETRY_DELAY)
+            finally:
+                if hasattr(checkpointer, "delete_thread"):
+                    checkpointer.delete_thread(thread_id)
+
+        final_state["timings"] = merge_dicts(timings, final_state.get("timings"))
+        final_state["memory"] = merge_dicts(memory, final_state.get("memory"))
+        final_state["memory_plan"] = memory_plan
 
         # Attach math results if available
         if math_results:
@@ -289,15 +402,36 @@ def main():
                 json.dump(feedbacks, f, indent=4)
             print(f"\nFeedback saved to {feedback_path}")
 
+        # Render every requested output format in parallel
+        with stage_timer(final_state["timings"], "render"):
+            validate_output_data(final_state)
+            render_outputs(final_state, output_base, args.output_format)
+        if os.path.exists(partial_answers_path):
+            os.remove(partial_answers_path)
+
+        # The generator stores new answers; remember feedback on them for future jobs
+        if args.feedback:
+            from tools.answer_cache import get_answer_store, feedback_items
+            get_answer_store().add_many(feedback_items())
+
     except FileNotFoundError as e:
         print(f"Error: {e}")
         sys.exit(1)
     except (LargeFileError, UnsupportedAudioFormatError, UnsupportedAudioCodecError, CorruptAudioError) as e:
         print(f"Audio Validation Error: {e}")
         sys.exit(1)
+    except QuotaExceededError as e:
+        # Cached transcript and answers are reused when the job is rerun
+        print(f"LLM quota exhausted, pausing job for requeue: {e}")
+        sys.exit(EXIT_REQUEUE)
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         sys.exit(1)
+    finally:
+        storage.unpin(output_base)
+        # Eviction only deletes files it knows were written by jobs
+        storage.record(*(path for prefix in artifact_prefixes for path in glob.glob(f"{glob.escape(prefix)}*")))
+        storage.enforce_budgets()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,301 @@
+import fcntl
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Per-stage CPU budgets. Whisper and pyannote (torch), the zero-shot
+# classifier (transformers) and spaCy each default to one thread per core;
+# with several jobs on a host that oversubscribes every core. Heavy stages
+# take one of MAX_HEAVY_STAGES host-wide slots (flock'ed files, so the cap
+# holds across processes) and run with HEAVY_THREADS threads each.
+CPU_COUNT = os.cpu_count() or 1
+MAX_HEAVY_STAGES = int(os.getenv("A2A_MAX_HEAVY_STAGES", str(max(1, CPU_COUNT // 4))))
+HEAVY_THREADS = int(os.getenv("A2A_HEAVY_THREADS", str(max(1, CPU_COUNT // MAX_HEAVY_STAGES))))
+SLOT_DIR = os.getenv("A2A_SLOT_DIR", os.path.join("cache", "cpu_slots"))
+SLOT_POLL_SECONDS = 0.05
+
+# Stage name -> (heavy, threads); light stages run single-threaded without a slot
+STAGE_PROFILES = {
+    "asr": (True, HEAVY_THREADS),
+    "enhancer": (True, HEAVY_THREADS),
+    "diarizer": (True, HEAVY_THREADS),
+    "transcriber": (False, 1),
+    "profanity_checker": (False, 1),
+    # Mostly waits on the LLM; its spaCy segmentation gets a couple of processes
+    "generator": (False, 2),
+}
+DEFAULT_PROFILE = (False, 1)
+
+# Thread-pool size variables read by OpenMP, MKL, OpenBLAS, Accelerate and
+# numexpr when they initialise; they must be set before numpy/torch load
+BLAS_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                 "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+# Memory footprint model for --memory-budget-mb. Whisper's transcribe()
+# decodes the whole file to 16 kHz float32 and computes its full STFT and
+# log-mel spectrogram; pyannote holds the resampled waveform plus the
+# decoded original. Model sizes are resident sizes in fp32 (int8 ~40%).
+MEMORY_BUDGET_MB = float(os.getenv("A2A_MEMORY_BUDGET_MB", "0")) or None
+WHISPER_MODEL_MB = {"tiny": 150, "base": 290, "small": 970, "medium": 3000, "large": 6200}
+INT8_MODEL_FACTOR = 0.4
+# Samples (64 kB/s) + complex STFT (160 kB/s) + magnitudes (80 kB/s) + mel (32 kB/s)
+WHISPER_BYTES_PER_SECOND = 336_000
+PYANNOTE_MODEL_MB = 400
+PYANNOTE_BYTES_PER_SECOND = 16000 * 4
+MB = 1024 * 1024
+
+_SCHEDULER = None
+_local = threading.local()
+
+
+def configure_process_threads(threads: int = HEAVY_THREADS, override: bool = False):
+    """
+    Sets the BLAS/OpenMP thread variables for this process and its children.
+    Call before numpy or torch are imported; existing values are kept unless
+    `override`.
+    """
+    for name in BLAS_ENV_VARS:
+        if override or name not in os.environ:
+            os.environ[name] = str(threads)
+    # Tokenizers spawn their own pool per process otherwise
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def set_torch_threads(threads: int):
+    """Sets torch's intra-op pool, and the inter-op pool if it has not started yet."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only settable before the first parallel operation of the process
+        pass
+
+
+def torch_threads() -> Optional[int]:
+    """torch's current intra-op pool size, or None if torch is not installed."""
+    try:
+        import torch
+    except ImportError:
+        return None
+    return torch.get_num_threads()
+
+
+def _apply_pool_size(threads: Optional[int], original: dict):
+    """
+    Sizes the torch and BLAS pools to `threads`, or restores the sizes saved
+    in `original` when `threads` is None.
+    """
+    if threads is None:
+        if original.get("torch"):
+            set_torch_threads(original["torch"])
+        if original.get("blas") is not None:
+            original["blas"].restore_original_limits()
+        original.clear()
+        return
+    if not original:
+        original["torch"] = torch_threads()
+        # The first limiter remembers the sizes from before any stage ran
+        original["blas"] = threadpool_limits(limits=threads) if threadpool_limits else None
+    elif threadpool_limits:
+        threadpool_limits(limits=threads)
+    set_torch_threads(threads)
+
+
+class ProcessThreadPools:
+    """
+    torch's and BLAS's pools are process-wide, while stage budgets are per
+    thread, and the backend runs several jobs on threads of one process.
+    The pools are sized to the largest budget among the stages running in
+    the process, so a light stage of one job never throttles another job's
+    heavy stage, and restored once no stage is running.
+    """
+
+    def __init__(self, apply=_apply_pool_size):
+        self.apply = apply
+        self.lock = threading.Lock()
+        self.active = []
+        self.size = None
+        self.original = {}
+
+    def _resize(self):
+        size = max(self.active) if self.active else None
+        if size != self.size:
+            self.apply(size, self.original)
+            self.size = size
+
+    def acquire(self, threads: int):
+        with self.lock:
+            self.active.append(threads)
+            self._resize()
+
+    def release(self, threads: int):
+        with self.lock:
+            self.active.remove(threads)
+            self._resize()
+
+
+_POOLS = ProcessThreadPools()
+
+
+def thread_budget() -> int:
+    """Threads available to the stage running on this thread (all cores outside a stage)."""
+    return getattr(_local, "threads", CPU_COUNT)
+
+
+class HostSlots:
+    """
+    Counting semaphore shared by all processes on the host: `count` lock
+    files, each held by at most one stage with a non-blocking flock. A slot
+    is released automatically if its process dies.
+    """
+
+    def __init__(self, count: int = MAX_HEAVY_STAGES, directory: str = SLOT_DIR, name: str = "heavy"):
+        self.count = count
+        self.paths = [os.path.join(directory, f"{name}.{i}.lock") for i in range(count)]
+        os.makedirs(directory, exist_ok=True)
+
+    def try_acquire(self) -> Optional[int]:
+        """Returns a locked file descriptor, or None if all slots are taken."""
+        for path in self.paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            fd = self.try_acquire()
+            if fd is not None:
+                return fd
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"No free CPU slot after {timeout:.1f}s")
+            time.sleep(SLOT_POLL_SECONDS)
+
+    def release(self, fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def in_use(self) -> int:
+        busy = 0
+        for path in self.paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            except BlockingIOError:
+                busy += 1
+            finally:
+                os.close(fd)
+        return busy
+
+
+class ResourceScheduler:
+    """
+    Runs pipeline stages under their thread budget: heavy stages wait for a
+    host slot; code that sizes its own pools reads `thread_budget()`, and the
+    process-wide torch and BLAS pools are sized by ProcessThreadPools.
+    """
+
+    def __init__(self, profiles: Dict[str, tuple] = None, slots: Optional[HostSlots] = None,
+                 pools: Optional[ProcessThreadPools] = None):
+        self.profiles = STAGE_PROFILES if profiles is None else profiles
+        self.slots = slots or HostSlots()
+        self.pools = pools or _POOLS
+
+    @contextmanager
+    def stage(self, name: str, stats: Optional[dict] = None):
+        """
+        Context manager for one stage. If given, `stats` receives
+        "<name>_slot_wait" (seconds spent waiting for a host slot).
+        """
+        heavy, threads = self.profiles.get(name, DEFAULT_PROFILE)
+        fd = None
+        start = time.perf_counter()
+        if heavy:
+            fd = self.slots.acquire()
+            if stats is not None:
+                stats[f"{name}_slot_wait"] = time.perf_counter() - start
+        previous = thread_budget()
+        _local.threads = threads
+        self.pools.acquire(threads)
+        try:
+            yield threads
+        finally:
+            self.pools.release(threads)
+            _local.threads = previous
+            if fd is not None:
+                self.slots.release(fd)
+
+
+def get_scheduler() -> ResourceScheduler:
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        _SCHEDULER = ResourceScheduler()
+    return _SCHEDULER
+
+
+def scheduled_node(name: str, node):
+    """
+    Wraps a graph node so it runs under its stage budget; the slot wait is
+    reported in state["timings"].
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        waits = {}
+        with get_scheduler().stage(name, waits):
+            result = node(state) or {}
+        if not waits:
+            return result
+        return dict(result, timings=dict(result.get("timings") or {}, **waits))
+    return wrapper
+
+
+def estimate_memory_mb(info: dict, asr_tier: str = "base") -> Dict[str, float]:
+    """Estimated peak memory of the whole-file ASR and diarization stages for an audio file."""
+    from tools.asr_tiers import parse_tier
+    duration = info.get("duration") or 0.0
+    sample_rate = info.get("sample_rate") or 16000
+    channels = info.get("channels") or 1
+    size, quantized = parse_tier(asr_tier)
+    model_mb = WHISPER_MODEL_MB[size] * (INT8_MODEL_FACTOR if quantized else 1.0)
+    return {
+        "asr": round(model_mb + duration * WHISPER_BYTES_PER_SECOND / MB, 1),
+        "diarizer": round(PYANNOTE_MODEL_MB + duration * (PYANNOTE_BYTES_PER_SECOND + sample_rate * channels * 4) / MB, 1),
+    }
+
+
+def plan_memory_modes(info: dict, budget_mb: Optional[float], asr_tier: str = "base") -> Dict:
+    """
+    Picks execution modes that fit `budget_mb`: streamed window-by-window
+    ASR instead of whole-file transcription, and windowed diarization with
+    as many worker processes as fit in the budget.
+    """
+    from tools.windowed_diarization import WINDOW_SECONDS
+    estimates = estimate_memory_mb(info, asr_tier)
+    plan = {"budget_mb": budget_mb, "estimated_mb": estimates, "asr_stream": False,
+            "diarization_mode": None, "diarization_workers": None}
+    if not budget_mb:
+        return plan
+    if estimates["asr"] > budget_mb:
+        plan["asr_stream"] = True
+    if estimates["diarizer"] > budget_mb:
+        worker_mb = PYANNOTE_MODEL_MB + WINDOW_SECONDS * PYANNOTE_BYTES_PER_SECOND * 2 / MB
+        plan["diarization_mode"] = "windowed"
+        plan["diarization_workers"] = max(1, int(budget_mb // worker_mb))
+    return plan
@@ -0,0 +1,199 @@
+import json
+import struct
+import zlib
+from typing import Dict, Iterable, Optional
+
+# Binary result container: a fixed header, an offset table, then one
+# independently compressed section per top-level field. Readers seek straight
+# to the section they need, so loading the answers of a long lecture does not
+# decode its transcript.
+#
+#   header:  magic (4s) | version (B) | serializer (B) | compressor (B) | section count (B)
+#   table:   per section: name length (B) | name | offset (Q) | stored size (Q) | raw size (Q)
+#   body:    section payloads
+MAGIC = b"A2AR"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBB")
+TABLE_ENTRY = struct.Struct("<QQQ")
+RESULT_EXTENSION = "a2a"
+
+# Fields that get their own section; everything else is grouped under "meta"
+SECTIONS = ("transcript", "questions", "answers", "math_results")
+META_SECTION = "meta"
+
+SERIALIZER_JSON, SERIALIZER_MSGPACK = 0, 1
+COMPRESSOR_ZLIB, COMPRESSOR_ZSTD = 0, 1
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class ResultFormatError(ValueError):
+    """Raised for files that are not valid result containers."""
+
+
+def _serialize(value, serializer: int) -> bytes:
+    if serializer == SERIALIZER_MSGPACK:
+        return msgpack.packb(value, use_bin_type=True, default=str)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _deserialize(data: bytes, serializer: int):
+    if serializer == SERIALIZER_MSGPACK:
+        if msgpack is None:
+            raise ResultFormatError("This result was written with msgpack, which is not installed.")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data.decode("utf-8"))
+
+
+def _compress(data: bytes, compressor: int) -> bytes:
+    if compressor == COMPRESSOR_ZSTD:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data: bytes, compressor: int, raw_size: int) -> bytes:
+    if compressor == COMPRESSOR_ZSTD:
+        if zstandard is None:
+            raise ResultFormatError("This result was compressed with zstd, which is not installed.")
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_size)
+    return zlib.decompress(data)
+
+
+def split_sections(data: dict) -> Dict[str, object]:
+    """Splits a result dict into container sections."""
+    sections = {name: data[name] for name in SECTIONS if name in data}
+    meta = {k: v for k, v in data.items() if k not in SECTIONS}
+    if meta:
+        sections[META_SECTION] = meta
+    return sections
+
+
+def encode_result(data: dict, serializer: Optional[int] = None, compressor: Optional[int] = None) -> bytes:
+    """
+    Encodes a result dict as a container. Uses msgpack and zstd when they are
+    installed, JSON and zlib otherwise.
+    """
+    if serializer is None:
+        serializer = SERIALIZER_MSGPACK if msgpack is not None else SERIALIZER_JSON
+    if compressor is None:
+        compressor = COMPRESSOR_ZSTD if zstandard is not None else COMPRESSOR_ZLIB
+    payloads = []
+    for name, value in split_sections(data).items():
+        raw = _serialize(value, serializer)
+        payloads.append((name.encode("utf-8"), _compress(raw, compressor), len(raw)))
+
+    table_size = sum(1 + len(name) + TABLE_ENTRY.size for name, _, _ in payloads)
+    offset = HEADER.size + table_size
+    parts = [HEADER.pack(MAGIC, VERSION, serializer, compressor, len(payloads))]
+    for name, stored, raw_size in payloads:
+        parts.append(bytes([len(name)]) + name + TABLE_ENTRY.pack(offset, len(stored), raw_size))
+        offset += len(stored)
+    parts.extend(stored for _, stored, _ in payloads)
+    return b"".join(parts)
+
+
+class ResultReader:
+    """
+    Reads sections of a result container on demand. Only the header and offset
+    table are parsed on open; each section is read and decoded on first use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open(path, "rb")
+        try:
+            magic, version, self.serializer, self.compressor, count = HEADER.unpack(self.f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ResultFormatError(f"{path} is not a result container.")
+            if version != VERSION:
+                raise ResultFormatError(f"Unsupported result container version {version} in {path}.")
+            self.table = {}
+            for _ in range(count):
+                name = self.f.read(self.f.read(1)[0]).decode("utf-8")
+                self.table[name] = TABLE_ENTRY.unpack(self.f.read(TABLE_ENTRY.size))
+        except (struct.error, IndexError) as e:
+            self.f.close()
+            raise ResultFormatError(f"{path} is truncated: {e}")
+        except BaseException:
+            self.f.close()
+            raise
+        self._cache = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    @property
+    def sections(self):
+        return list(self.table)
+
+    def get(self, name: str, default=None):
+        """Returns one section, decoding only its bytes."""
+        if name not in self.table:
+            return default
+        if name not in self._cache:
+            offset, stored_size, raw_size = self.table[name]
+            self.f.seek(offset)
+            raw = _decompress(self.f.read(stored_size), self.compressor, raw_size)
+            self._cache[name] = _deserialize(raw, self.serializer)
+        return self._cache[name]
+
+    def __getitem__(self, name: str):
+        if name not in self.table:
+            raise KeyError(name)
+        return self.get(name)
+
+    def to_dict(self, sections: Optional[Iterable[str]] = None) -> dict:
+        """Decodes the requested sections (all by default) back into a result dict."""
+        data = {}
+        for name in (self.sections if sections is None else sections):
+            if name == META_SECTION:
+                data.update(self.get(META_SECTION, {}))
+            elif name in self.table:
+                data[name] = self.get(name)
+        return data
+
+
+def save_as_result(data: dict, output_path: str):
+    """Saves the data as a binary result container."""
+    from orchestration.output_utils import atomic_write
+    payload = encode_result(data)
+    atomic_write(output_path, lambda f: f.write(payload), mode="wb")
+    print(f"Saved result container to {output_path}")
+
+
+def load_result(path: str, sections: Optional[Iterable[str]] = None) -> dict:
+    """Loads a result container, optionally only some of its sections."""
+    with ResultReader(path) as reader:
+        return reader.to_dict(sections)
+
+
+def read_section(path: str, name: str, default=None):
+    """Reads a single section without decoding the rest of the file."""
+    with ResultReader(path) as reader:
+        return reader.get(name, default)
+
+
+def json_to_result(json_path: str, result_path: str):
+    """Converts a JSON output (schemas/output_schema.json) into a result container."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        save_as_result(json.load(f), result_path)
+
+
+def result_to_json(result_path: str, json_path: str, indent: Optional[int] = None):
+    """Converts a result container back into the JSON output format."""
+    from orchestration.output_utils import save_as_json
+    save_as_json(load_result(result_path), json_path, indent=indent)
@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.asr_tiers import parse_tier, word_error_rate
+from tools.audio_probe import probe_audio
+
+# Real-time factor (transcription time / audio duration, lower is faster) and
+# WER of each Whisper tier on the evaluation recordings. Model loading is
+# excluded from the timings.
+EVAL_DATA_DIR = os.path.join(PROJECT_ROOT, "evaluation_data")
+REPORT_PATH = os.path.join(PROJECT_ROOT, "outputs", "asr_tier_report.json")
+DEFAULT_TIERS = ["tiny", "tiny-int8", "base", "base-int8", "small", "small-int8"]
+
+
+def evaluation_files():
+    """(audio path, reference transcript) for every recording with a .txt reference."""
+    files = []
+    for name in sorted(os.listdir(EVAL_DATA_DIR)):
+        base, ext = os.path.splitext(name)
+        reference = os.path.join(EVAL_DATA_DIR, f"{base}.txt")
+        if ext in (".wav", ".mp3") and os.path.exists(reference):
+            with open(reference) as f:
+                files.append((os.path.join(EVAL_DATA_DIR, name), f.read()))
+    return files
+
+
+def bench_tier(tier, batch_size, files, language):
+    from tools.asr_math_pipeline import load_whisper_model, transcribe_audio_whisper
+    load_whisper_model(*parse_tier(tier))
+    audio_seconds = compute_seconds = 0.0
+    errors = []
+    for path, reference in files:
+        start = time.perf_counter()
+        hypothesis = transcribe_audio_whisper(path, tier, batch_size, language)
+        compute_seconds += time.perf_counter() - start
+        audio_seconds += probe_audio(path)["duration"]
+        errors.append(word_error_rate(reference, hypothesis))
+    return {
+        "tier": tier,
+        "batch_size": batch_size,
+        "rtf": round(compute_seconds / audio_seconds, 4) if audio_seconds else None,
+        "wer": round(sum(errors) / len(errors), 4) if errors else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTF and WER per Whisper tier on evaluation_data.")
+    parser.add_argument("--tiers", nargs="+", default=DEFAULT_TIERS)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--language", default="en")
+    args = parser.parse_args()
+
+    files = evaluation_files()
+    rows = [bench_tier(tier, batch_size, files, args.language) for tier in args.tiers for batch_size in args.batch_sizes]
+    print(f"{'tier':<12} {'batch':>5} {'RTF':>8} {'WER':>8}")
+    for row in rows:
+        print(f"{row['tier']:<12} {row['batch_size']:>5} {row['rtf']:>8} {row['wer']:>8}")
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w") as f:
+        json.dump({"files": len(files), "results": rows}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import glob
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+from tools.choice_parser import iter_question_fragments, choice_question
+from tools.preprocess_utils import preprocess_stream
+from tools.question_classifier import is_likely_question
+from tools.sentence_segmenter import segment_chunks
+
+EVAL_DATA_DIR = "evaluation_data"
+
+# Spoken quiz questions in the forms the parser is meant to cover
+SAMPLE_TRANSCRIPTS = {
+    "letters_across_sentences": "[SPEAKER_00]: Which planet is the largest? A, Mars. B, Jupiter. C, Venus. And the last one, Earth. So which one is it?",
+    "inline_letters": "[SPEAKER_00]: Which number is even? A) 3, B) 4 or C) 5.",
+    "numbered_options": "[SPEAKER_00]: Which gas do plants absorb? Option one, oxygen. Option two, carbon dioxide. Option three, nitrogen.",
+    "true_false": "[SPEAKER_00]: True or false, the sun is a star. True or false? Whales are fish.",
+    "open_question": "[SPEAKER_00]: Today we talk about cells. Why do cells divide? Think about it.",
+}
+
+
+def count_calls(transcript: str) -> dict:
+    """
+    LLM calls made by question extraction before and after the parser:
+    previously every detected question was rephrased by the LLM and the
+    whole transcript was extracted again; now only unresolved fragments are
+    sent, plus one whole-transcript call when no question is found.
+    """
+    sentences = []
+    for chunk in preprocess_stream(transcript.split("\n"), flags={}):
+        sentences.extend(segment_chunks([chunk], "en", n_process=1))
+    detected = sum(1 for s in sentences if is_likely_question(s, "en"))
+    parsed = unresolved = 0
+    for kind, item in iter_question_fragments(sentences, lambda s: is_likely_question(s, "en")):
+        if kind == "question":
+            if choice_question(item) is not None:
+                parsed += 1
+            else:
+                unresolved += 1
+    before = detected + 1
+    after = unresolved + (0 if parsed + unresolved else 1)
+    return {"questions_parsed": parsed, "questions_to_llm": unresolved,
+            "llm_calls_before": before, "llm_calls_after": after, "llm_calls_avoided": before - after}
+
+
+if __name__ == "__main__":
+    transcripts = dict(SAMPLE_TRANSCRIPTS)
+    for path in sorted(glob.glob(os.path.join(EVAL_DATA_DIR, "*.txt"))):
+        with open(path) as f:
+            transcripts[os.path.basename(path)] = f.read()
+
+    report = {name: count_calls(text) for name, text in transcripts.items()}
+    report["total"] = {key: sum(r[key] for r in report.values()) for key in next(iter(report.values()))}
+    print(json.dumps(report, indent=4))
@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.audio_probe import probe_audio
+from tools.windowed_diarization import (
+    WINDOW_SECONDS, OVERLAP_SECONDS, MIN_TURN_SECONDS,
+    diarize_windowed, diarization_error_rate, merge_short_turns, plan_windows
+)
+
+# Compares windowed diarization with the single-pass pipeline on one recording.
+# The single-pass output is the reference for DER; the merged single-pass
+# output is scored too, to separate the cost of turn merging from windowing.
+REPORT_PATH = os.path.join(PROJECT_ROOT, "outputs", "diarization_report.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DER and speedup of windowed vs single-pass diarization.")
+    parser.add_argument("audio_file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--window", type=float, default=WINDOW_SECONDS)
+    parser.add_argument("--overlap", type=float, default=OVERLAP_SECONDS)
+    parser.add_argument("--min-turn-seconds", type=float, default=MIN_TURN_SECONDS)
+    args = parser.parse_args()
+
+    from agents.diarization_agent import diarize_single_pass
+
+    duration = probe_audio(args.audio_file)["duration"]
+    start = time.perf_counter()
+    reference = diarize_single_pass(args.audio_file)
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    windowed = diarize_windowed(args.audio_file, duration, args.workers, args.window, args.overlap, args.min_turn_seconds)
+    windowed_seconds = time.perf_counter() - start
+
+    merged = merge_short_turns(reference, args.min_turn_seconds)
+    report = {
+        "audio_file": args.audio_file,
+        "duration": duration,
+        "windows": len(plan_windows(duration, args.window, args.overlap)),
+        "single_pass": {"seconds": round(single_seconds, 2), "turns": len(reference),
+                        "speakers": len({t["speaker"] for t in reference})},
+        "windowed": {"seconds": round(windowed_seconds, 2), "turns": len(windowed),
+                     "speakers": len({t["speaker"] for t in windowed})},
+        "speedup": round(single_seconds / windowed_seconds, 2) if windowed_seconds else None,
+        "der_windowed": diarization_error_rate(reference, windowed),
+        "der_single_merged": diarization_error_rate(reference, merged),
+    }
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=4)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import glob
+import re
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.prompt_compressor import compress_transcript, STOPWORDS
+from tools.token_utils import estimate_tokens
+
+EVAL_DATA_DIR = os.path.join(PROJECT_ROOT, "evaluation_data")
+BUDGET_FRACTIONS = (None, 0.75, 0.5)
+
+
+def key_terms(text):
+    """Numbers and content words a faithful prompt must keep."""
+    return {w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS and (w.isdigit() or len(w) > 3)}
+
+
+def retention(compressed, ground_truth):
+    """
+    Share of the ground-truth questions' key terms still present in the
+    compressed transcript; terms the transcript never contained are ignored.
+    """
+    kept = total = 0
+    compressed_terms = key_terms(compressed)
+    for qa in ground_truth.get("answers", []):
+        for term in key_terms(qa.get("question", "")) & ground_truth["_transcript_terms"]:
+            total += 1
+            kept += term in compressed_terms
+    return kept / total if total else None
+
+
+if __name__ == "__main__":
+    report = []
+    for transcript_path in sorted(glob.glob(os.path.join(EVAL_DATA_DIR, "*.txt"))):
+        answers_path = os.path.splitext(transcript_path)[0] + ".json"
+        if not os.path.exists(answers_path):
+            continue
+        with open(transcript_path) as f:
+            transcript = f.read()
+        with open(answers_path) as f:
+            ground_truth = json.load(f)
+        ground_truth["_transcript_terms"] = key_terms(transcript)
+        for fraction in BUDGET_FRACTIONS:
+            stats = {}
+            budget = None if fraction is None else max(1, int(fraction * estimate_tokens(transcript)))
+            compressed = compress_transcript(transcript, budget, stats)
+            report.append({
+                "file": os.path.basename(transcript_path),
+                "budget": budget,
+                "tokens_before": stats["tokens_before"],
+                "tokens_after": stats["tokens_after"],
+                "saved": 1 - stats["tokens_after"] / stats["tokens_before"],
+                "question_term_retention": retention(compressed, ground_truth),
+            })
+    if not report:
+        print(f"No transcripts with ground truth in {EVAL_DATA_DIR}.")
+    print(json.dumps(report, indent=4))
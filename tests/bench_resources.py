@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import multiprocessing
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from orchestration.resources import BLAS_ENV_VARS, CPU_COUNT, HEAVY_THREADS, MAX_HEAVY_STAGES
+
+# Throughput of N concurrent "jobs" (processes running a BLAS-heavy stand-in
+# for model inference) with default thread pools vs under the resource
+# scheduler. Without limits every job starts a pool per core, so throughput
+# drops as concurrency rises; with the scheduler it should level off.
+MATRIX_SIZE = 768
+STAGES_PER_JOB = 6
+REPORT_PATH = os.path.join(PROJECT_ROOT, "outputs", "resource_bench_report.json")
+
+
+def run_job(scheduled, slot_dir):
+    if scheduled:
+        from orchestration.resources import configure_process_threads
+        configure_process_threads(override=True)
+    else:
+        for name in BLAS_ENV_VARS:
+            os.environ.pop(name, None)
+    import numpy as np
+    from contextlib import nullcontext
+    from orchestration.resources import HostSlots, ResourceScheduler
+
+    scheduler = ResourceScheduler(slots=HostSlots(directory=slot_dir)) if scheduled else None
+    rng = np.random.default_rng(0)
+    a = rng.standard_normal((MATRIX_SIZE, MATRIX_SIZE))
+    for _ in range(STAGES_PER_JOB):
+        with scheduler.stage("asr") if scheduler else nullcontext():
+            for _ in range(8):
+                a = np.tanh(a @ a.T / MATRIX_SIZE)
+
+
+def throughput(concurrency, scheduled):
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as slot_dir:
+        processes = [context.Process(target=run_job, args=(scheduled, slot_dir)) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+    return concurrency / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jobs per minute vs concurrent jobs, with and without the resource scheduler.")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{CPU_COUNT} cores, {MAX_HEAVY_STAGES} heavy slot(s) x {HEAVY_THREADS} thread(s)")
+    print(f"{'jobs':>5} {'default/min':>12} {'scheduled/min':>14}")
+    for concurrency in args.concurrency:
+        default = throughput(concurrency, scheduled=False) * 60
+        scheduled = throughput(concurrency, scheduled=True) * 60
+        rows.append({"concurrency": concurrency, "default_jobs_per_minute": round(default, 2),
+                     "scheduled_jobs_per_minute": round(scheduled, 2)})
+        print(f"{concurrency:>5} {default:>12.2f} {scheduled:>14.2f}")
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w") as f:
+        json.dump({"cores": CPU_COUNT, "heavy_slots": MAX_HEAVY_STAGES, "heavy_threads": HEAVY_THREADS,
+                   "results": rows}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
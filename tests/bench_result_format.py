@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import time
+import pickle
+import tempfile
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from orchestration.result_format import encode_result, ResultReader, msgpack, zstandard
+
+REPEATS = 5
+
+
+def synthetic_result(lines):
+    transcript = "\n".join(
+        f"[SPEAKER_0{i % 2}]: So the next step is to integrate x squared from zero to {i}, which gives {i}^3 over three."
+        for i in range(lines)
+    )
+    questions = [{"id": f"q{i}", "question": f"What is the integral of x squared from 0 to {i}?"} for i in range(lines // 50)]
+    answers = [{"qid": q["id"], "question": q["question"], "answer": f"{i}^3/3"} for i, q in enumerate(questions)]
+    speakers = [{"speaker": f"SPEAKER_0{i % 2}", "start": i * 4.0, "end": i * 4.0 + 3.5} for i in range(lines)]
+    return {"transcript": transcript, "questions": questions, "answers": answers,
+            "math_results": {}, "speaker_timestamps": speakers, "language": "en"}
+
+
+def best_time(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench(lines, directory):
+    data = synthetic_result(lines)
+    paths = {name: os.path.join(directory, f"{lines}.{name}") for name in ("json", "pkl", "a2a")}
+    with open(paths["json"], "w") as f:
+        json.dump(data, f, indent=4)
+    with open(paths["pkl"], "wb") as f:
+        pickle.dump(data, f)
+    with open(paths["a2a"], "wb") as f:
+        f.write(encode_result(data))
+
+    def json_answers():
+        with open(paths["json"]) as f:
+            return json.load(f)["answers"]
+
+    def pickle_answers():
+        with open(paths["pkl"], "rb") as f:
+            return pickle.load(f)["answers"]
+
+    def container_answers():
+        with ResultReader(paths["a2a"]) as reader:
+            return reader["answers"]
+
+    def container_full():
+        with ResultReader(paths["a2a"]) as reader:
+            return reader.to_dict()
+
+    return {
+        "transcript_lines": lines,
+        "size_bytes": {name: os.path.getsize(path) for name, path in paths.items()},
+        "answers_only_ms": {"json": best_time(json_answers), "pkl": best_time(pickle_answers), "a2a": best_time(container_answers)},
+        "full_decode_a2a_ms": best_time(container_full),
+    }
+
+
+if __name__ == "__main__":
+    print(f"msgpack: {'yes' if msgpack else 'no (json fallback)'}, zstd: {'yes' if zstandard else 'no (zlib fallback)'}")
+    with tempfile.TemporaryDirectory() as directory:
+        report = [bench(lines, directory) for lines in (1000, 10000, 50000)]
+    print(json.dumps(report, indent=4))
@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+EVAL_DATA_DIR = os.path.join(PROJECT_ROOT, "evaluation_data")
+CALLS = 5
+# Repeat the evaluation transcripts to approximate an hour-long lecture
+TRANSCRIPT_REPEAT = 400
+
+# Each variant runs in a fresh interpreter so peak RSS is not shared between them.
+VARIANT_SCRIPT = """
+import os, resource, sys, time, json
+sys.path.insert(0, {root!r})
+text = open({path!r}).read()
+variant = {variant!r}
+latencies = []
+for _ in range({calls}):
+    start = time.perf_counter()
+    if variant == "full_pipeline_per_call":
+        import spacy
+        nlp = spacy.load("en_core_web_sm")
+        sentences = [s.text.strip() for s in nlp(text).sents if s.text.strip()]
+    else:
+        from tools.sentence_segmenter import segment_sentences
+        sentences = segment_sentences(text, "en", threads=os.cpu_count())
+    latencies.append(time.perf_counter() - start)
+print(json.dumps({{
+    "variant": variant,
+    "sentences": len(sentences),
+    "first_call_s": latencies[0],
+    "warm_call_s": min(latencies[1:]) if len(latencies) > 1 else latencies[0],
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def build_transcript(path):
+    texts = [open(os.path.join(EVAL_DATA_DIR, f)).read() for f in sorted(os.listdir(EVAL_DATA_DIR)) if f.endswith(".txt")]
+    with open(path, "w") as f:
+        f.write("\n".join(texts * TRANSCRIPT_REPEAT))
+
+
+def run_variant(variant, path):
+    script = VARIANT_SCRIPT.format(root=PROJECT_ROOT, path=path, variant=variant, calls=CALLS)
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"variant": variant, "error": result.stderr.strip().splitlines()[-1:]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    transcript_path = os.path.join(PROJECT_ROOT, "cache", "bench_segmentation.txt")
+    os.makedirs(os.path.dirname(transcript_path), exist_ok=True)
+    build_transcript(transcript_path)
+    print(f"Transcript size: {os.path.getsize(transcript_path)} bytes, {CALLS} calls per variant")
+    for variant in ["full_pipeline_per_call", "cached_segmenter"]:
+        print(json.dumps(run_variant(variant, transcript_path)))
+    os.remove(transcript_path)
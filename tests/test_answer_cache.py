@@ -0,0 +1,64 @@
+import os
+import sys
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.answer_cache import AnswerStore, hashed_embedding, normalize_question, operand_tokens
+
+
+def make_store(directory):
+    store = AnswerStore(str(directory), "hashed-ngrams", hashed_embedding)
+    store.add_many([
+        {"question": "What is the capital city of France?", "answer": "Paris"},
+        {"question": "How many legs does a spider have?", "answer": "Eight"},
+    ])
+    return store
+
+
+def test_normalized_question_is_an_exact_hit(tmp_path):
+    store = make_store(tmp_path)
+    assert normalize_question("[SPEAKER_01]: Um, what is the capital city of France") == "what is the capital city of france"
+    hit = store.lookup("[SPEAKER_01]: Um, what is the capital city of France")
+    assert (hit["answer"], hit["similarity"]) == ("Paris", 1.0)
+
+
+def test_near_duplicate_hits_and_misses(tmp_path):
+    store = make_store(tmp_path)
+    hit = store.lookup("What is the capital city of France, please?")
+    assert hit["answer"] == "Paris" and 0.9 <= hit["similarity"] < 1.0
+    # Similar wording with a different subject is not reused
+    assert store.lookup("What is the capital city of Spain?") is None
+    assert store.lookup("How many legs does an insect have?") is None
+    assert AnswerStore(str(tmp_path / "empty"), "hashed-ngrams", hashed_embedding).lookup("Anything?") is None
+
+
+def test_feedback_outranks_generated_answers(tmp_path):
+    store = make_store(tmp_path)
+    store.add_many([{"question": "what is the capital city of France", "answer": "Paris, on the Seine",
+                     "source": "feedback_revised"}])
+    store.add_many([{"question": "What is the capital city of France?", "answer": "Lyon"}])
+    assert store.lookup("What is the capital city of France?")["answer"] == "Paris, on the Seine"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    make_store(tmp_path)
+    loaded = AnswerStore(str(tmp_path), "hashed-ngrams", hashed_embedding)
+    assert loaded.load()
+    assert loaded.lookup("What is the capital city of France, please?")["answer"] == "Paris"
+    # A store built with another encoder is not reused
+    assert not AnswerStore(str(tmp_path), "other-encoder", hashed_embedding).load()
+
+
+def test_questions_with_other_numbers_are_not_reused(tmp_path):
+    store = make_store(tmp_path)
+    store.add_many([{"question": "What is the derivative of x squared plus 3x?", "answer": "2x+3"}])
+    assert store.lookup("What is the derivative of x squared plus 3x, please?")["answer"] == "2x+3"
+    # Close in wording, but a different problem
+    assert store.lookup("What is the derivative of x squared plus 5x?") is None
+    assert store.lookup("What is the derivative of y squared plus 3y?") is None
+    assert operand_tokens("Is 2 + 3 = 5?") == ["2", "+", "3", "=", "5"]
+    # Punctuation-only differences are normalized away, but operators are not
+    store.add_many([{"question": "What is 2 + 3?", "answer": "5"}])
+    assert store.lookup("What is 2 - 3?") is None
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import types
+
+import pytest
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+pytest.importorskip("google.generativeai")
+
+import agents.answer_generator as answer_generator
+import tools.llm_interface as llm_interface
+from agents.answer_generator import answer_generator_agent, locate_question, stream_full_context_answers
+from tools.answer_cache import AnswerStore, hashed_embedding
+from utils.exceptions import QuotaExceededError
+
+TRANSCRIPT = ("[SPEAKER_00]: Today we review the planets. Which planet is the largest? "
+              "Jupiter is a gas giant. How many moons does Mars have? Mars has two small moons. "
+              "What is the hottest planet? Venus has a thick atmosphere.")
+QUESTIONS = [
+    {"id": "1", "question": "Which planet is the largest?"},
+    {"id": "2", "question": "How many moons does Mars have?"},
+    {"id": "3", "question": "What is the hottest planet?"},
+]
+
+
+@pytest.fixture
+def llm(monkeypatch, tmp_path):
+    """Replaces the LLM with canned answers; the second question's call fails."""
+    monkeypatch.setattr("tools.answer_cache.get_answer_store",
+                        lambda: AnswerStore(str(tmp_path), "hashed-ngrams", hashed_embedding))
+    calls = types.SimpleNamespace(json=[], stream=0)
+
+    def fake_invoke_json(prompt_path, llm_input, response_schema=None):
+        calls.json.append(llm_input["question"])
+        if "moons" in llm_input["question"]:
+            raise RuntimeError("model error")
+        # Answer the first question last, so completion order differs from transcript order
+        time.sleep(0.2 if "largest" in llm_input["question"] else 0.0)
+        return {"question": llm_input["question"], "answer": "answer to " + llm_input["question"]}, "{}"
+
+    def fake_invoke_stream(prompt_path, llm_input, stream_fn=None, response_schema=None, status=None):
+        calls.stream += 1
+        yield '[{"id": "1", "question": "Which planet is the largest?", "answer": "Jupiter"}]'
+
+    monkeypatch.setattr(answer_generator, "invoke_llm_json", fake_invoke_json)
+    monkeypatch.setattr(answer_generator, "invoke_llm_stream", fake_invoke_stream)
+    return calls
+
+
+def test_per_question_answers_keep_order_and_splitter_ids(llm):
+    state = {"transcript": TRANSCRIPT, "questions": QUESTIONS, "answer_mode": "per_question", "language": "en"}
+    answers = answer_generator_agent(state)["answers"]
+    # The failed question is skipped; the others keep their own ids
+    assert [a["qid"] for a in answers] == ["1", "3"]
+    assert [a["answer"] for a in answers] == ["answer to Which planet is the largest?",
+                                              "answer to What is the hottest planet?"]
+    assert sorted(llm.json) == sorted(q["question"] for q in QUESTIONS)
+    assert llm.stream == 0
+
+
+def test_auto_mode_switches_on_transcript_length(llm, monkeypatch):
+    state = {"transcript": TRANSCRIPT, "questions": QUESTIONS, "language": "en"}
+    answers = answer_generator_agent(state)["answers"]
+    assert (llm.stream, llm.json) == (1, [])
+    assert answers == [{"qid": "1", "question": "Which planet is the largest?", "answer": "Jupiter"}]
+
+    monkeypatch.setattr(answer_generator, "PER_QUESTION_MIN_CHARS", len(TRANSCRIPT))
+    answer_generator_agent(state)
+    assert llm.stream == 1 and len(llm.json) == 3
+
+
+def test_locate_question_prefers_the_stem_sentence():
+    sentences = ["Today we review the planets.", "Which planet is the largest?", "A, Mars.", "B, Saturn."]
+    assert locate_question("Which planet is the largest: A) Mars or B) Saturn?", sentences) == 1
+
+
+def cut_off_stream(error):
+    def stream_fn(prompt):
+        yield 'Answers [see below]:\n[{"id": "1", "question": "Which planet is the largest?", "answer": "Jupiter"}, '
+        yield '{"id": "2", "question": "How many moons'
+        raise error
+    return stream_fn
+
+
+def test_stream_cut_off_by_an_error_is_reasked(monkeypatch):
+    reask = [{"id": "1", "question": "Which planet is the largest?", "answer": "Jupiter"},
+             {"id": "2", "question": "How many moons does Mars have?", "answer": "Two"}]
+    monkeypatch.setattr(answer_generator, "invoke_llm_json", lambda *args, **kwargs: (reask, "[]"))
+    metrics = {}
+    answers = list(stream_full_context_answers(TRANSCRIPT, metrics=metrics,
+                                               stream_fn=cut_off_stream(ConnectionError("stream reset"))))
+    assert [a["answer"] for a in answers] == ["Jupiter", "Two"]
+    assert metrics["reasked"] == 1
+
+
+def test_rate_limit_mid_stream_is_raised(monkeypatch):
+    tripped = []
+    monkeypatch.setattr(llm_interface, "get_governor",
+                        lambda: types.SimpleNamespace(record_rate_limited=lambda: tripped.append(True) or 30.0))
+    with pytest.raises(QuotaExceededError) as raised:
+        list(stream_full_context_answers(TRANSCRIPT, stream_fn=cut_off_stream(RuntimeError("429 Resource exhausted"))))
+    assert tripped == [True]
+    assert raised.value.retry_after == 30.0
+    assert isinstance(raised.value.__cause__, RuntimeError)
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.asr_tiers import parse_tier, split_windows, word_error_rate
+
+
+def test_parse_tier():
+    assert parse_tier("base") == ("base", False)
+    assert parse_tier("small-int8") == ("small", True)
+    with pytest.raises(ValueError):
+        parse_tier("huge")
+
+
+def test_windows_cut_at_quiet_points():
+    rate = 100
+    audio = np.ones(rate * 75, dtype=np.float32)
+    audio[rate * 28:rate * 28 + 10] = 0.0  # a pause just before the 30 s mark
+    windows = split_windows(audio, sample_rate=rate, window=30, search=3)
+    assert sum(len(w) for w in windows) == len(audio)
+    assert all(len(w) <= rate * 30 for w in windows)
+    assert abs(len(windows[0]) - rate * 28) <= 10
+
+
+def test_word_error_rate():
+    reference = "[SPEAKER_00]: So, which one is the answer? B."
+    assert word_error_rate(reference, "so which one is the answer b") == 0.0
+    assert word_error_rate(reference, "so which is the answer see") == 2 / 7
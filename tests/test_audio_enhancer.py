@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("scipy")
+
+from tools.audio_enhancer import COMPRESSOR_THRESHOLD, AudioEnhancer
+
+
+def speech_like(seconds=3.0, sample_rate=16000):
+    """A 500 Hz tone that alternates between loud and quiet passages, plus noise."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    loudness = np.where((t % 1.0) < 0.5, 0.8, 0.05)
+    return (loudness * np.sin(2 * np.pi * 500 * t) + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def enhance(samples, block_size):
+    enhancer = AudioEnhancer()
+    blocks = [enhancer.process(samples[i:i + block_size]) for i in range(0, len(samples), block_size)]
+    return np.concatenate(blocks + [enhancer.flush()])
+
+
+@pytest.mark.parametrize("block_size", [160, 1000, 16000, 12345])
+def test_block_wise_output_matches_one_shot(block_size):
+    samples = speech_like()
+    one_shot = enhance(samples, len(samples))
+    block_wise = enhance(samples, block_size)
+    assert len(block_wise) == len(one_shot) == len(samples)
+    assert np.max(np.abs(block_wise - one_shot)) < 1e-5
+
+
+def test_loud_passages_are_compressed():
+    samples = speech_like()
+    enhanced = enhance(samples, len(samples))
+    # Half a second loud, then half a second quiet; skip the attack and release
+    loud, quiet = slice(16000 + 2000, 16000 + 8000), slice(8000 + 6500, 16000)
+    rms = lambda x: float(np.sqrt(np.mean(x ** 2)))
+    # Loud passages lose level, quiet ones pass through the band-pass unchanged
+    assert rms(enhanced[loud]) < 0.8 * rms(samples[loud])
+    assert rms(enhanced[quiet]) == pytest.approx(rms(samples[quiet]), rel=0.1)
+    assert rms(samples[quiet]) < COMPRESSOR_THRESHOLD
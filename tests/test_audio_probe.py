@@ -0,0 +1,87 @@
+import os
+import struct
+import sys
+import wave
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.audio_probe import sniff_audio_header, probe_audio, probe_audio_files
+
+
+def write_wav(path, seconds=2, sample_rate=16000, channels=1):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00\x00" * channels * sample_rate * seconds)
+
+
+def test_sniffs_wav(tmp_path):
+    path = tmp_path / "a.wav"
+    write_wav(path, seconds=2, sample_rate=16000, channels=2)
+    info = sniff_audio_header(str(path))
+    assert info["format"] == "wav"
+    assert info["codec"] == "pcm_s16le"
+    assert info["channels"] == 2
+    assert info["sample_rate"] == 16000
+    assert abs(info["duration"] - 2.0) < 1e-6
+
+
+def test_sniffs_flac(tmp_path):
+    sample_rate, channels, bps, total = 44100, 2, 16, 44100 * 3
+    packed = (sample_rate << 44) | ((channels - 1) << 41) | ((bps - 1) << 36) | total
+    streaminfo = struct.pack(">HH", 4096, 4096) + b"\x00" * 6 + packed.to_bytes(8, "big") + b"\x00" * 16
+    path = tmp_path / "a.flac"
+    path.write_bytes(b"fLaC" + bytes([0x80, 0, 0, 34]) + streaminfo)
+    info = sniff_audio_header(str(path))
+    assert (info["format"], info["codec"], info["channels"], info["sample_rate"]) == ("flac", "flac", 2, 44100)
+    assert abs(info["duration"] - 3.0) < 1e-6
+
+
+def test_sniffs_cbr_mp3(tmp_path):
+    # MPEG1 layer 3, 128 kbit/s, 44.1 kHz, joint stereo, no padding: 417-byte frames
+    header = bytes([0xFF, 0xFB, 0x90, 0x44])
+    frame = header + b"\x00" * (417 - 4)
+    path = tmp_path / "a.mp3"
+    path.write_bytes(frame * 100)
+    info = sniff_audio_header(str(path))
+    assert (info["format"], info["codec"], info["sample_rate"], info["channels"]) == ("mp3", "mp3", 44100, 2)
+    assert abs(info["duration"] - 417 * 100 * 8 / 128000) < 1e-6
+
+
+def test_sniffs_ogg_opus(tmp_path):
+    opus_head = b"OpusHead" + bytes([1, 1]) + struct.pack("<HI", 312, 48000) + b"\x00\x00\x00"
+
+    def page(granule, packet):
+        return b"OggS" + bytes([0, 2]) + struct.pack("<qIII", granule, 1, 0, 0) + bytes([1, len(packet)]) + packet
+
+    path = tmp_path / "a.ogg"
+    path.write_bytes(page(0, opus_head) + b"\x00" * 1000 + page(48000 * 5 + 312, b"\x00"))
+    info = sniff_audio_header(str(path))
+    assert (info["format"], info["codec"], info["channels"]) == ("ogg", "opus", 1)
+    assert abs(info["duration"] - 5.0) < 1e-6
+
+
+def test_unknown_bytes_are_not_sniffed_and_probe_is_cached(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"not audio at all" * 100)
+    assert sniff_audio_header(str(path)) is None
+
+    wav_path = tmp_path / "b.wav"
+    write_wav(wav_path)
+    first = probe_audio(str(wav_path))
+    first["duration"] = None
+    # Callers get copies, so changing one result leaves the cache intact
+    assert probe_audio(str(wav_path))["duration"] == 2.0
+
+
+def test_probe_audio_files_shares_cache_across_threads(tmp_path):
+    paths = []
+    for i in range(32):
+        path = tmp_path / f"{i}.wav"
+        write_wav(path, seconds=1 + i % 3)
+        paths.append(str(path))
+    results = probe_audio_files(paths * 4)
+    assert [results[p]["duration"] for p in paths] == [1.0 + i % 3 for i in range(32)]
@@ -0,0 +1,59 @@
+import os
+import sys
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.choice_parser import choice_question, iter_question_fragments, parse_options
+
+
+def ends_with_question_mark(sentence):
+    return sentence.strip().endswith("?")
+
+
+def parse(sentences):
+    items = list(iter_question_fragments(sentences, ends_with_question_mark))
+    questions = [choice_question(item) for kind, item in items if kind == "question"]
+    context = [item for kind, item in items if kind == "context"]
+    return questions, context
+
+
+def test_options_across_sentences_after_filler_removal():
+    # Sentences as they come out of preprocessing of the evaluation transcript
+    sentences = ['[SPEAKER_00]: , , which of the following is a prime number? ,', 'A, 21. ,', 'B, 29. ,',
+                 'C, 33.', ', , 51. ,', 'which one is the answer?', 'B.']
+    questions, context = parse(sentences)
+    assert questions == [{
+        "id": "1",
+        "question": "which of the following is a prime number: A) 21, B) 29, C) 33, or D) 51?",
+        "options": ["A) 21", "B) 29", "C) 33", "D) 51"],
+        "type": "multiple_choice",
+    }]
+    assert context == ["B."]
+
+
+def test_inline_and_numbered_options():
+    questions, _ = parse(["Which number is even? A) 3 B) 4 and C) 5.",
+                          "Name the phase of steam.", "Option one, gas.", "Option two is liquid."])
+    assert questions[0]["options"] == ["A) 3", "B) 4", "C) 5"]
+    assert questions[1]["question"] == "Name the phase of steam: 1) gas or 2) liquid?"
+
+
+def test_final_option_phrase():
+    style, options = parse_options("And the final one, Venus.", "letter", 3)
+    assert (style, options) == ("letter", [("D", "Venus")])
+    # Labels must continue the list
+    assert parse_options("A, 21.", "letter", 2)[1] == []
+
+
+def test_true_false():
+    questions, _ = parse(["True or false, whales are fish.", "True or false?", "The sun is a star."])
+    assert [q["question"] for q in questions] == ["True or false, whales are fish?", "True or false: The sun is a star?"]
+    assert all(q["type"] == "true_false" and q["options"] == ["True", "False"] for q in questions)
+
+
+def test_open_questions_are_left_to_the_llm():
+    questions, context = parse(["Today we talk about cells.", "Why do cells divide?", "A cell, B cell."])
+    assert questions == [None]
+    assert context == ["Today we talk about cells.", "A cell, B cell."]
@@ -1,24 +1,42 @@
-
 import os
 import sys
 import json
 import time
+import hashlib
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project root to the Python path
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, PROJECT_ROOT)
 
-from jiwer import wer
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
 
 # --- 1. Configuration ---
 EVAL_DATA_DIR = os.path.join(PROJECT_ROOT, "evaluation_data")
 PIPELINE_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "outputs")
-# Load the sentence transformer model for semantic similarity
-print("Loading sentence transformer model...")
-model = SentenceTransformer('all-MiniLM-L6-v2')
-print("Model loaded.")
+REPORT_PATH = os.path.join(PIPELINE_OUTPUT_DIR, "evaluation_report.json")
+GT_EMBEDDING_CACHE = os.path.join(PROJECT_ROOT, "cache", "eval_gt_embeddings.npz")
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+EVAL_WORKERS = 4
+
+_model = None
+
+
+def get_model():
+    """Loads the sentence transformer model for semantic similarity on first use."""
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        print("Loading sentence transformer model...")
+        _model = SentenceTransformer(EMBEDDING_MODEL)
+        print("Model loaded.")
+    return _model
+
+
+def list_audio_files():
+    return sorted(f for f in os.listdir(EVAL_DATA_DIR) if f.endswith(('.wav', '.mp3')))
 
 
 def get_ground_truth(audio_filename):
@@ -37,107 +55,185 @@ def get_ground_truth(audio_filename):
         print(f"Error: Ground truth file not found for {audio_filename}. {e}")
         return None, None
 
-def evaluate_pipeline_run(audio_filename):
+
+def run_pipeline(audio_filename):
     """
-    Evaluates a single run of the pipeline for a given audio file.
+    Runs the pipeline on one file in a subprocess and returns its output
+    document and total latency, or (None, latency) on failure.
     """
-    print(f"--- Evaluating: {audio_filename} ---")
-    
-    # --- 2. Load Ground Truth ---
-    gt_transcript, gt_answers = get_ground_truth(audio_filename)
-    if gt_transcript is None:
-        return
-
-    # --- 3. Run the Pipeline ---
-    # The pipeline's main() function is designed to be called from the command line.
-    # We will use subprocess to execute it.
-    print("Running pipeline via subprocess...")
-    pipeline_start_time = time.time()
-    
-    try:
-        # Construct the command to run the pipeline script
-        command = [
-            sys.executable, # Use the same python interpreter that is running this script
-            os.path.join(PROJECT_ROOT, 'orchestration', 'pipeline.py'),
-            os.path.join(EVAL_DATA_DIR, audio_filename)
-        ]
-        
-        # We need to set the environment variables for the subprocess, including PYTHONPATH
-        process_env = os.environ.copy()
-        base_name = os.path.splitext(audio_filename)[0]
-        process_env["JOB_ID"] = f"eval_{base_name}"
-        process_env["AUDIO_HASH"] = "testhash"
-        process_env["PYTHONPATH"] = PROJECT_ROOT + os.pathsep + process_env.get('PYTHONPATH', '')
-
-        result = subprocess.run(command, capture_output=True, text=True, check=True, env=process_env)
-        
-        # The pipeline saves output to a file, so we don't get it directly.
-        # We will load the generated output file in the next step.
-        print("--- Pipeline STDOUT ---")
-        print(result.stdout)
-        print("--- Pipeline STDERR ---")
-        print(result.stderr)
-        print("-----------------------")
-
-    except subprocess.CalledProcessError as e:
+    base_name = os.path.splitext(audio_filename)[0]
+    command = [
+        sys.executable, # Use the same python interpreter that is running this script
+        os.path.join(PROJECT_ROOT, 'orchestration', 'pipeline.py'),
+        os.path.join(EVAL_DATA_DIR, audio_filename)
+    ]
+    # The output filename is determined by the JOB_ID and AUDIO_HASH env vars
+    process_env = os.environ.copy()
+    process_env["JOB_ID"] = f"eval_{base_name}"
+    process_env["AUDIO_HASH"] = "testhash"
+    process_env["PYTHONPATH"] = PROJECT_ROOT + os.pathsep + process_env.get('PYTHONPATH', '')
+
+    # Each run answers from an empty answer store of its own, so cached
+    # answers to the evaluation questions cannot inflate the scores
+    with tempfile.TemporaryDirectory(prefix="eval_answer_store_") as store_dir:
+        process_env["A2A_ANSWER_STORE_DIR"] = store_dir
+        start = time.time()
+        result = subprocess.run(command, capture_output=True, text=True, env=process_env, cwd=PROJECT_ROOT)
+        latency = time.time() - start
+    if result.returncode != 0:
         print(f"ERROR: Pipeline execution failed for {audio_filename}")
-        print(f"STDOUT: {e.stdout}")
-        print(f"STDERR: {e.stderr}")
-        return
-
-    total_latency = time.time() - pipeline_start_time
-    
-    # The output filename is now determined by the JOB_ID and AUDIO_HASH env vars
-    output_filename = f"eval_{base_name}_testhash"
-    output_filepath = os.path.join(PIPELINE_OUTPUT_DIR, f"{output_filename}.json")
-    
+        print(f"STDOUT: {result.stdout}")
+        print(f"STDERR: {result.stderr}")
+        return None, latency
+
+    output_filepath = os.path.join(PIPELINE_OUTPUT_DIR, f"eval_{base_name}_testhash.json")
     try:
         with open(output_filepath, 'r') as f:
-            generated_output = json.load(f)
+            return json.load(f), latency
     except FileNotFoundError:
         print(f"ERROR: Output file not found at {output_filepath}. Did the pipeline run?")
-        return
-
-    # --- 4. Calculate Metrics ---
-    metrics = {}
-
-    # Latency and Cost (from pipeline instrumentation)
-    metrics['total_latency'] = total_latency
-    # metrics['agent_timings'] = timings
-    # metrics['total_tokens'] = token_counts
-
-    # Transcription Quality (WER)
-    generated_transcript = generated_output.get('transcript', '')
-    metrics['wer'] = wer(gt_transcript, generated_transcript)
-
-    # Answer Quality (Semantic Similarity)
-    generated_qna = generated_output.get('answers', [])
-    gt_qna = gt_answers.get('answers', [])
-    if generated_qna and gt_qna:
-        # For simplicity, comparing the first answer. A real implementation would loop through all.
-        gen_answer = generated_qna[0]['answer']
-        gt_answer = gt_qna[0]['answer']
-        embedding1 = model.encode(gen_answer, convert_to_tensor=True)
-        embedding2 = model.encode(gt_answer, convert_to_tensor=True)
-        similarity = util.pytorch_cos_sim(embedding1, embedding2).item()
-        metrics['answer_similarity'] = similarity
-
-    # --- 5. Report Results ---
-    print("\n--- Results ---")
-    print(f"Transcription WER: {metrics.get('wer', 'N/A'):.2f}")
-    print(f"Answer Similarity: {metrics.get('answer_similarity', 'N/A'):.2f}")
-    print(f"Total Latency: {metrics.get('total_latency', 'N/A'):.2f}s")
-    print(f"Total Tokens Used: {metrics.get('total_tokens', 'N/A')}")
-    print("NOTE: Metrics are placeholders. Uncomment code to enable real calculations.")
-    print("-----------------")
+        return None, latency
+
+
+def encode_ground_truth(texts):
+    """
+    Embeds ground-truth answers, reusing embeddings cached on disk by text hash.
+    """
+    keys = [hashlib.sha256(f"{EMBEDDING_MODEL}:{t}".encode("utf-8")).hexdigest() for t in texts]
+    cache = {}
+    if os.path.exists(GT_EMBEDDING_CACHE):
+        with np.load(GT_EMBEDDING_CACHE) as data:
+            cache = {k: data[k] for k in data.files}
+    missing = [i for i, k in enumerate(keys) if k not in cache]
+    if missing:
+        vectors = get_model().encode([texts[i] for i in missing], batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+        for i, vector in zip(missing, vectors):
+            cache[keys[i]] = vector
+        os.makedirs(os.path.dirname(GT_EMBEDDING_CACHE), exist_ok=True)
+        np.savez(GT_EMBEDDING_CACHE, **cache)
+    return np.array([cache[k] for k in keys]) if keys else np.zeros((0, 0))
+
+
+def match_answers(similarity):
+    """
+    Optimal one-to-one assignment of generated to ground-truth answers that
+    maximizes total similarity. Returns a list of (generated, truth) index pairs.
+    """
+    if similarity.size == 0:
+        return []
+    try:
+        from scipy.optimize import linear_sum_assignment
+        rows, cols = linear_sum_assignment(-similarity)
+        return list(zip(rows.tolist(), cols.tolist()))
+    except ImportError:
+        # Greedy fallback: repeatedly take the best remaining pair
+        pairs = []
+        sim = similarity.copy()
+        for _ in range(min(sim.shape)):
+            i, j = np.unravel_index(np.argmax(sim), sim.shape)
+            pairs.append((int(i), int(j)))
+            sim[i, :] = -np.inf
+            sim[:, j] = -np.inf
+        return pairs
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None}
+    return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95))}
+
+
+def evaluate(audio_files, workers=EVAL_WORKERS):
+    """
+    Runs the pipeline over the evaluation files in parallel and returns the
+    JSON report: per-file WER and matched answer similarity, plus p50/p95
+    latency per stage.
+    """
+    from jiwer import wer
+
+    ground_truth = {f: get_ground_truth(f) for f in audio_files}
+    audio_files = [f for f in audio_files if ground_truth[f][0] is not None]
+
+    print(f"Running pipeline on {len(audio_files)} files with {workers} workers...")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        runs = dict(zip(audio_files, executor.map(run_pipeline, audio_files)))
+
+    # Batch-encode every answer in one call per side
+    generated = {f: [a.get('answer', '') for a in (runs[f][0] or {}).get('answers', [])] for f in audio_files}
+    truth = {f: [a.get('answer', '') for a in ground_truth[f][1].get('answers', [])] for f in audio_files}
+    all_generated = [a for f in audio_files for a in generated[f]]
+    all_truth = [a for f in audio_files for a in truth[f]]
+    gen_vectors = get_model().encode(all_generated, batch_size=64, convert_to_numpy=True, normalize_embeddings=True) if all_generated else np.zeros((0, 0))
+    gt_vectors = encode_ground_truth(all_truth)
+
+    files = {}
+    stage_latencies = {"total": []}
+    gen_offset = gt_offset = 0
+    for f in audio_files:
+        output, latency = runs[f]
+        n_gen, n_gt = len(generated[f]), len(truth[f])
+        metrics = {"total_latency": latency}
+        stage_latencies["total"].append(latency)
+        if output is None:
+            metrics["error"] = "pipeline failed"
+        else:
+            metrics['wer'] = wer(ground_truth[f][0], output.get('transcript', ''))
+            for stage, seconds in (output.get('timings') or {}).items():
+                stage_latencies.setdefault(stage, []).append(seconds)
+            metrics['stage_timings'] = output.get('timings') or {}
+            if n_gen and n_gt:
+                similarity = gen_vectors[gen_offset:gen_offset + n_gen] @ gt_vectors[gt_offset:gt_offset + n_gt].T
+                pairs = match_answers(similarity)
+                scores = [float(similarity[i, j]) for i, j in pairs]
+                metrics['answer_similarity'] = float(np.mean(scores))
+                metrics['matched_answers'] = [{"generated": i, "ground_truth": j, "similarity": s} for (i, j), s in zip(pairs, scores)]
+            metrics['answer_recall'] = (len(metrics.get('matched_answers', [])) / n_gt) if n_gt else None
+        gen_offset += n_gen
+        gt_offset += n_gt
+        files[f] = metrics
+
+    def mean(key):
+        values = [m[key] for m in files.values() if m.get(key) is not None]
+        return float(np.mean(values)) if values else None
+
+    return {
+        "files": files,
+        "summary": {
+            "evaluated": len(files),
+            "failed": sum(1 for m in files.values() if "error" in m),
+            "mean_wer": mean('wer'),
+            "mean_answer_similarity": mean('answer_similarity'),
+            "latency": {stage: percentiles(values) for stage, values in stage_latencies.items()},
+        },
+    }
+
+
+def write_report(report, path=REPORT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Evaluation report saved to {path}")
+
+
+def test_evaluation_report():
+    import pytest
+    pytest.importorskip("jiwer")
+    pytest.importorskip("sentence_transformers")
+    audio_files = list_audio_files()
+    if not audio_files:
+        pytest.skip("No audio files in evaluation_data")
+    report = evaluate(audio_files)
+    write_report(report)
+    assert report["summary"]["evaluated"] > 0
 
 
 if __name__ == "__main__":
     # Find all audio files in the evaluation directory
-    audio_files = [f for f in os.listdir(EVAL_DATA_DIR) if f.endswith(('.wav', '.mp3'))]
-    
+    audio_files = list_audio_files()
+
     if not audio_files:
         print(f"No audio files found in {EVAL_DATA_DIR}. Please add audio and ground truth files to begin.")
     else:
-        for audio_file in audio_files:
-            evaluate_pipeline_run(audio_file)
+        report = evaluate(audio_files)
+        write_report(report)
+        print(json.dumps(report["summary"], indent=4))
@@ -0,0 +1,78 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from backend.scheduler import FairScheduler
+from utils.exceptions import CapacityExceededError
+
+
+def blocked_scheduler(**kwargs):
+    """A one-slot scheduler whose slot is held until the returned event is set."""
+    scheduler = FairScheduler(max_concurrent=1, **kwargs)
+    release = threading.Event()
+    scheduler.submit("blocker", "x", 10, lambda: release.wait(5) and False)
+    return scheduler, release
+
+
+def test_users_share_fairly_and_short_audio_goes_first():
+    scheduler, release = blocked_scheduler(max_queued_per_user=10)
+    order, done = [], threading.Event()
+
+    def job(name):
+        def run():
+            order.append(name)
+            if len(order) == 5:
+                done.set()
+            return True
+        return run
+
+    for i in range(3):
+        scheduler.submit(f"a{i}", "alice", 600, job(f"a{i}"))
+    scheduler.submit("b0", "bob", 600, job("b0"))
+    scheduler.submit("c0", "carol", 60, job("c0"))
+    release.set()
+    assert done.wait(5)
+    assert order == ["c0", "a0", "b0", "a1", "a2"]
+
+
+def test_saturation_raises_with_retry_after():
+    scheduler, release = blocked_scheduler(max_queued=2)
+    scheduler.submit("a", "alice", 100, lambda: True)
+    scheduler.submit("b", "bob", 100, lambda: True)
+    with pytest.raises(CapacityExceededError) as error:
+        scheduler.submit("c", "carol", 100, lambda: True)
+    # Two queued jobs of 100 s at the default rate, plus what is left of the blocker
+    assert 200 <= error.value.retry_after <= 210
+    release.set()
+
+
+def test_per_user_queue_limit():
+    scheduler, release = blocked_scheduler(max_queued_per_user=1)
+    scheduler.submit("a0", "alice", 100, lambda: True)
+    with pytest.raises(CapacityExceededError):
+        scheduler.check_admission("alice")
+    scheduler.check_admission("bob")
+    # Requeued jobs bypass admission control
+    scheduler.submit("a1", "alice", 100, lambda: True, admit=False)
+    assert scheduler.status()["queued_by_user"] == {"alice": 2}
+    release.set()
+
+
+def test_claimed_slots_count_against_capacity():
+    scheduler = FairScheduler(max_concurrent=1)
+    scheduler.claim("live-1", "alice")
+    with pytest.raises(CapacityExceededError):
+        scheduler.claim("live-2", "bob")
+    done = threading.Event()
+    scheduler.submit("job", "bob", 60, lambda: done.set() or True)
+    assert not done.wait(0.1)
+    scheduler.release("live-1")
+    assert done.wait(5)
+    # Alice is charged for the time her session held the slot
+    assert scheduler.last_finish["alice"] > 0
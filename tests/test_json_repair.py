@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.json_repair import extract_string_field, loads_tolerant, matches_schema
+from tools.json_stream import iter_json_array_items
+
+ANSWER_LIST_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"id": {"type": "STRING"}, "question": {"type": "STRING"}, "answer": {"type": "STRING"}},
+        "required": ["id", "question", "answer"],
+    },
+}
+
+
+def test_repairs_common_llm_slips():
+    output = ("Here you go:\n```json\n[{'id': '1', question: 'Is 29 prime?', \"answer\": \"Yes.\nIt is\", "
+              "'checked': True, 'note': None,},]\n```")
+    assert loads_tolerant(output, list) == [
+        {"id": "1", "question": "Is 29 prime?", "answer": "Yes.\nIt is", "checked": True, "note": None}
+    ]
+
+
+def test_brackets_in_prose_are_skipped():
+    assert loads_tolerant('Here [see below]:\n[{"question": "q", "answer": "a"}]', list) == [{"question": "q", "answer": "a"}]
+    assert loads_tolerant("See [1].\n[{'question': 'q', 'answer': 'a',}]", list) == [{"question": "q", "answer": "a"}]
+
+
+def test_expected_shape_is_coerced():
+    assert loads_tolerant('{"question": "q", "answer": "a"}', list) == [{"question": "q", "answer": "a"}]
+    assert loads_tolerant('[{"question": "q", "answer": "a"}]', dict) == {"question": "q", "answer": "a"}
+    with pytest.raises(ValueError):
+        loads_tolerant('"just text"', dict)
+
+
+def test_missing_content_is_not_invented():
+    with pytest.raises(ValueError):
+        loads_tolerant('[{"question": "q", "answer": "cut o', list)
+    with pytest.raises(ValueError):
+        loads_tolerant('{"question": "q", "answer": }', dict)
+
+
+def test_failed_items_are_reported_for_reasking():
+    output = ('[{"id": "1", "question": "q1", "answer": "a1"}, {"id": "2", "question": "q2"}, '
+              '{"id": "3", "question": "q3", "answer": }, {"id": "4", "question": "q4", "answer": "trunc')
+    failed = []
+    items = list(iter_json_array_items([output], failed=failed))
+    assert [matches_schema(item, ANSWER_LIST_SCHEMA["items"]) for item in items] == [True, False]
+    assert [extract_string_field(text, "question") for text in failed] == ["q3", "q4"]
+    assert extract_string_field("{'question': 'it\\'s', 'answer': }", "question") == "it's"
+
+
+def test_stream_parser_handles_single_quoted_strings():
+    failed = []
+    chunks = ["[{'question': 'Which of [A, B]', ", "'answer': 'B, it\\'s prime'}, {'bad': }]"]
+    assert list(iter_json_array_items(chunks, failed=failed)) == [{"question": "Which of [A, B]", "answer": "B, it's prime"}]
+    assert failed == ["{'bad': }"]
+
+
+def test_matches_schema():
+    item = ANSWER_LIST_SCHEMA["items"]
+    assert matches_schema({"id": "1", "question": "q", "answer": "a"}, item)
+    assert not matches_schema({"id": "1", "question": "q", "answer": ""}, item)
+    assert not matches_schema({"id": 1, "question": "q", "answer": "a"}, item)
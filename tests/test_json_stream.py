@@ -0,0 +1,52 @@
+import os
+import sys
+import json
+import time
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.json_stream import JSONArrayStreamParser, iter_json_array_items
+
+ANSWERS = [
+    {"id": "1", "question": "Which of [A, B] is prime?", "answer": "B) 29, the \"prime\" one."},
+    {"id": "2", "question": "What is {x} squared?", "answer": "x^2\\n"},
+    {"id": "3", "question": "Nested?", "answer": {"steps": [1, [2, 3]]}},
+]
+LLM_OUTPUT = "Here are the answers:\n```json\n" + json.dumps(ANSWERS, indent=2) + "\n```\n"
+
+
+def local_stream(text, chunk_size, delay=0.0):
+    """Stand-in for a streaming LLM response."""
+    for i in range(0, len(text), chunk_size):
+        if delay:
+            time.sleep(delay)
+        yield text[i:i + chunk_size]
+
+
+def test_items_parse_for_any_chunking():
+    for chunk_size in (1, 2, 7, 64, len(LLM_OUTPUT)):
+        assert list(iter_json_array_items(local_stream(LLM_OUTPUT, chunk_size))) == ANSWERS
+
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"b": 2}, 1, "a,]", ') == [{"b": 2}, 1, "a,]"]
+    assert parser.feed('{"bad": }, 4] trailing [5]') == [4]
+
+
+def test_first_item_arrives_before_stream_ends():
+    metrics = {}
+    seen_at = []
+    start = time.perf_counter()
+    for _ in iter_json_array_items(local_stream(LLM_OUTPUT, 16, delay=0.005), metrics):
+        seen_at.append(time.perf_counter() - start)
+    assert len(seen_at) == len(ANSWERS)
+    assert metrics["time_to_first_item"] < metrics["time_to_last_chunk"] / 2
+    assert seen_at[0] < seen_at[-1]
+
+
+def test_brackets_in_prose_do_not_start_the_array():
+    output = 'Here [see below]:\n[\n  {"id": "1", "answer": "x"}]'
+    for chunk_size in (1, 3, len(output)):
+        assert list(iter_json_array_items(local_stream(output, chunk_size))) == [{"id": "1", "answer": "x"}]
+    assert list(iter_json_array_items(["Options [A] and [B]: ", "[ ]"])) == []
@@ -0,0 +1,101 @@
+import os
+import sys
+import shutil
+import time
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import numpy as np
+import pytest
+
+from orchestration import live
+from orchestration.live import LiveSession, LIVE_SAMPLE_RATE
+
+# (start, end, text) of a scripted lecture, in seconds of audio
+SCRIPT = [
+    (0.5, 2.0, "Today we study prime numbers."),
+    (2.5, 6.0, "Which of the following is a prime number?"),
+    (6.2, 8.0, "Is it 21 or 29?"),
+    (8.5, 10.0, "Take a minute to think about it."),
+    # Silence longer than the window
+    (24.5, 26.0, "The answer is 29."),
+]
+
+
+class ScriptedTranscriber:
+    """Stand-in for Whisper that returns the scripted segments inside the window."""
+
+    def __init__(self):
+        self.session = None
+        self.window_lengths = []
+
+    def __call__(self, audio, language):
+        start = self.session.buffer_start / LIVE_SAMPLE_RATE
+        end = start + len(audio) / LIVE_SAMPLE_RATE
+        self.window_lengths.append(end - start)
+        return [{"start": a - start, "end": b - start, "text": text}
+                for a, b, text in SCRIPT if a >= start - 1e-6 and b <= end]
+
+
+@pytest.fixture(autouse=True)
+def classifier_in_tmp(tmp_path, monkeypatch):
+    import tools.question_classifier as question_classifier
+    monkeypatch.setattr(question_classifier, "MODEL_PATH", str(tmp_path / "question_classifier.json"))
+
+
+@pytest.fixture(autouse=True)
+def small_wordlist(monkeypatch):
+    import tools.profanity_filter as profanity_filter
+    monkeypatch.setattr(profanity_filter, "_MATCHER", profanity_filter.ProfanityMatcher(["shit"]))
+
+
+def test_answers_arrive_while_audio_is_still_streaming(monkeypatch):
+    monkeypatch.setattr(live, "WINDOW_SECONDS", 10.0)
+    events = []
+    transcriber = ScriptedTranscriber()
+    session = LiveSession(events.append, transcribe=transcriber,
+                          answer_fn=lambda window: {"question": window["question"], "answer": "29"})
+    transcriber.session = session
+
+    chunk = np.zeros(LIVE_SAMPLE_RATE // 4, dtype="<i2").tobytes()
+    answered_during_stream = False
+    for _ in range(30 * 4):
+        session.feed(chunk)
+        time.sleep(0.001)
+        answered_during_stream |= any(e["type"] == "answer" for e in events)
+    summary = session.close()
+
+    sentences = [e["text"] for e in events if e["type"] == "sentence"]
+    assert sentences == [text for _, _, text in SCRIPT]
+    questions = [e["question"] for e in events if e["type"] == "question"]
+    assert "Which of the following is a prime number?" in questions
+    assert answered_during_stream
+    assert summary["answers"] == len(questions) and summary["latency_p95"] < summary["latency_target"]
+    # The rolling window stays bounded through the silence
+    assert max(transcriber.window_lengths) <= 10.0 + live.STEP_SECONDS
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_replay_is_paced_to_real_time():
+    from tools.live_replay import iter_paced_chunks
+    sample = os.path.join(PROJECT_ROOT, "tests", "sample_audio.wav")
+    start = time.perf_counter()
+    audio_seconds = sum(len(chunk) / 2 / LIVE_SAMPLE_RATE for chunk in iter_paced_chunks(sample, speed=20.0))
+    elapsed = time.perf_counter() - start
+    assert elapsed >= (audio_seconds - 0.25) / 20.0 * 0.9
+
+
+def test_offensive_sentences_are_dropped_before_question_detection():
+    events = []
+    asked = []
+    session = LiveSession(events.append, transcribe=lambda audio, language: [],
+                          answer_fn=lambda window: asked.append(window) or {"answer": "no"})
+    session.feed_samples(np.zeros(LIVE_SAMPLE_RATE, dtype=np.float32))
+    session._add_text("What the sh1t is this? Which number is prime?", 3.0, flush=True)
+    summary = session.close()
+    assert [e["text"] for e in events if e["type"] == "sentence"] == ["Which number is prime?"]
+    assert [e["type"] for e in events].count("profanity") == 1
+    assert all("sh1t" not in window["context"] for window in asked)
+    assert summary["rejected_sentences"] == 1
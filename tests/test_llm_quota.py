@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+
+from tools import llm_quota
+from tools.llm_quota import QuotaGovernor
+from utils.exceptions import QuotaExceededError
+
+
+def take_all(db_path):
+    governor = QuotaGovernor(db_path, requests_per_minute=0.001, burst=5)
+    taken = 0
+    while True:
+        try:
+            governor.acquire(max_wait=0)
+        except QuotaExceededError:
+            return taken
+        taken += 1
+
+
+def test_bucket_is_shared_across_processes(tmp_path):
+    db_path = str(tmp_path / "quota.sqlite")
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        taken = list(executor.map(take_all, [db_path] * 4))
+    assert sum(taken) == 5
+
+
+def test_rate_limit_opens_breaker_for_every_caller(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_quota, "BREAKER_BASE_SECONDS", 0.2)
+    db_path = str(tmp_path / "quota.sqlite")
+    first, second = QuotaGovernor(db_path, requests_per_minute=600, burst=5), QuotaGovernor(db_path, requests_per_minute=600, burst=5)
+    responses = iter([RuntimeError("429 Resource has been exhausted (e.g. check quota)."), "ok"])
+
+    def flaky():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    start = time.monotonic()
+    assert first.call(flaky, max_wait=5) == "ok"
+    assert time.monotonic() - start >= 0.2
+
+    second.record_rate_limited()
+    assert second.status()["breaker_open"]
+    with pytest.raises(QuotaExceededError) as excinfo:
+        first.acquire(max_wait=0)
+    assert excinfo.value.retry_after > 0
+
+    with pytest.raises(ValueError):
+        first.call(lambda: (_ for _ in ()).throw(ValueError("bad prompt")), max_wait=5)
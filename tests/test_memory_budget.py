@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import tracemalloc
+
+import numpy as np
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from orchestration.instrumentation import memory_node, set_memory_tracing, track_memory
+from orchestration.resources import estimate_memory_mb, plan_memory_modes
+from tools.asr_tiers import split_windows, stream_windows
+
+HOUR = {"duration": 3600.0, "sample_rate": 44100, "channels": 2}
+
+
+def test_no_budget_keeps_whole_file_modes():
+    plan = plan_memory_modes(HOUR, None)
+    assert plan["asr_stream"] is False
+    assert plan["diarization_mode"] is None
+
+
+def test_tight_budget_switches_to_chunked_modes():
+    estimates = estimate_memory_mb(HOUR)
+    budget = min(estimates.values()) - 1
+    plan = plan_memory_modes(HOUR, budget)
+    assert plan["asr_stream"] is True
+    assert plan["diarization_mode"] == "windowed"
+    assert plan["diarization_workers"] >= 1
+
+
+def test_int8_tier_has_smaller_estimate():
+    assert estimate_memory_mb(HOUR, "small-int8")["asr"] < estimate_memory_mb(HOUR, "small")["asr"]
+
+
+def test_stream_windows_matches_split_windows():
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(16000 * 95).astype(np.float32)
+    blocks = [audio[i:i + 16000 * 7] for i in range(0, len(audio), 16000 * 7)]
+    streamed = list(stream_windows(blocks))
+    assert np.array_equal(np.concatenate(streamed), audio)
+    assert all(len(w) <= 16000 * 30 for w in streamed)
+    assert len(streamed) == len(split_windows(audio))
+
+
+def test_track_memory_records_peak():
+    memory = {}
+    set_memory_tracing(True)
+    try:
+        with track_memory(memory, "stage"):
+            block = bytearray(32 * 1024 * 1024)
+            del block
+    finally:
+        set_memory_tracing(False)
+    entry = memory["stage"]
+    assert entry["peak_rss_mb"] >= entry["rss_start_mb"]
+    assert entry["python_peak_mb"] >= 32
+    assert entry["top_allocations"]
+    assert entry["python_peak_shared"] is False
+
+
+def test_concurrent_track_memory_shares_tracing():
+    memories = [{}, {}]
+    entered = threading.Barrier(2)
+    # The first block finishes while the second is still running
+    first_done = threading.Event()
+    still_tracing = []
+
+    def run(index):
+        with track_memory(memories[index], "stage"):
+            entered.wait()
+            if index == 1:
+                first_done.wait()
+                still_tracing.append(tracemalloc.is_tracing())
+        if index == 0:
+            first_done.set()
+
+    set_memory_tracing(True)
+    try:
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        set_memory_tracing(False)
+    assert still_tracing == [True]
+    assert not tracemalloc.is_tracing()
+    for memory in memories:
+        assert "top_allocations" in memory["stage"]
+        assert memory["stage"]["python_peak_shared"] is True
+
+
+def test_memory_node_reports_stage():
+    node = memory_node("generator", lambda state: {"answers": []})
+    result = node({})
+    assert result["answers"] == []
+    assert set(result["memory"]["generator"]) == {"rss_start_mb", "rss_end_mb", "peak_rss_mb"}
@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import zlib
+import re
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+
+from orchestration.pdf_writer import StreamingPDFWriter, CHARS_PER_LINE, LINES_PER_PAGE
+
+RESULT = {
+    "transcript": "[SPEAKER_00]: Which of the following is a prime number?\n" * 200,
+    "questions": [{"id": "q1", "question": "Which of the following is a prime number?", "options": ["A" * 300, "B"]}],
+    "answers": [{"qid": "q1", "question": "Which of the following is a prime number?", "answer": "29"}],
+}
+
+
+def test_streaming_pdf_is_well_formed(tmp_path):
+    path = tmp_path / "out.pdf"
+    with open(path, "wb") as f, StreamingPDFWriter(f) as pdf:
+        pdf.heading("Transcript")
+        pdf.paragraph("x" * (CHARS_PER_LINE * 3) + " (parens) and \\ backslash")
+        for i in range(LINES_PER_PAGE):
+            pdf.paragraph(f"line {i}")
+    data = path.read_bytes()
+    assert data.startswith(b"%PDF-1.4") and data.rstrip().endswith(b"%%EOF")
+
+    # Every xref entry points at the start of its object
+    xref_offset = int(re.search(rb"startxref\n(\d+)", data).group(1))
+    entries = data[xref_offset:].split(b"\n")[3:]
+    for object_id, entry in enumerate(entries[:int(re.search(rb"/Size (\d+)", data).group(1)) - 1], start=1):
+        offset = int(entry[:10])
+        assert data[offset:].startswith(b"%d 0 obj" % object_id)
+
+    streams = [zlib.decompress(m) for m in re.findall(rb"stream\n(.*?)\nendstream", data, re.S)]
+    assert len(re.findall(rb"/Type /Page ", data)) == len(streams) >= 2
+    # Long words are hard-wrapped to the line width
+    assert b"(" + b"x" * CHARS_PER_LINE + b") Tj" in streams[0]
+    assert b"\\(parens\\)" in streams[0]
+
+
+def test_render_outputs_writes_all_formats(tmp_path):
+    pytest.importorskip("jsonschema")
+    from orchestration.output_utils import render_outputs
+
+    paths = render_outputs(RESULT, str(tmp_path / "job"), ["json", "text", "pdf", "json"])
+    assert sorted(paths) == ["json", "pdf", "text"]
+    with open(paths["json"]) as f:
+        content = f.read()
+    assert json.loads(content) == RESULT
+    assert "\n" not in content.strip()
+    assert "Answer: 29" in open(paths["text"]).read()
+    assert open(paths["pdf"], "rb").read().startswith(b"%PDF")
+    # No temporary files are left behind
+    assert sorted(os.listdir(tmp_path)) == ["job.json", "job.pdf", "job.txt"]
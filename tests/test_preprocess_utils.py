@@ -0,0 +1,56 @@
+import os
+import sys
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+
+pytest.importorskip("emoji")
+pytest.importorskip("sympy")
+
+from tools.preprocess_utils import (
+    normalize_unicode, annotate_emojis, annotate_math_symbols, remove_filler_words,
+    preprocess_stream, preprocess_transcript,
+)
+from tools.math_utils import normalize_math_phrases
+
+SEGMENTS = [
+    "[SPEAKER_00]: So, like, which of the following is a prime number? Uh, A, 21.",
+    "[SPEAKER_00]: Uh, and then B, 29. Uh, and C,",
+    "33. And the final one, uh, 51. So, which one is the answer?",
+    "[SPEAKER_01]: B. I love math 😀 and x squared plus y equals π!",
+    "[SPEAKER_00]: Café is spelled with an accent. What is x to the power of 3",
+]
+
+
+def batch_preprocess(text):
+    # The original sequence of full-string passes in question_splitter_agent
+    text = normalize_unicode(text)
+    text = annotate_emojis(text)
+    text = annotate_math_symbols(text)
+    text, math_found = normalize_math_phrases(text)
+    return remove_filler_words(text), math_found
+
+
+def test_stream_matches_batch_preprocessing():
+    expected, expected_math = batch_preprocess("\n".join(SEGMENTS))
+    flags = {}
+    chunks = list(preprocess_stream(SEGMENTS, flags=flags))
+    assert "".join(chunks) == expected
+    assert flags["math_found"] == expected_math
+    assert preprocess_transcript("\n".join(SEGMENTS)) == (expected, expected_math)
+
+
+def test_stream_yields_before_input_is_exhausted():
+    consumed = []
+
+    def pieces():
+        for segment in SEGMENTS:
+            consumed.append(segment)
+            yield segment
+
+    first_chunk = next(preprocess_stream(pieces()))
+    assert "prime number" in first_chunk
+    assert len(consumed) == 1
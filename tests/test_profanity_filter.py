@@ -0,0 +1,65 @@
+import os
+import re
+import sys
+import random
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.profanity_filter import ProfanityMatcher, normalize_text
+
+WORDS = ["damn", "hell", "shit", "ass", "son of a bitch", "he", "she", "hers"]
+
+
+def naive_matches(text):
+    """
+    Every whole-word occurrence, found one word at a time: the word in the
+    normalized text, bounded by non-alphanumerics in the original text.
+    """
+    normalized = normalize_text(text)
+    found = set()
+    for word in WORDS:
+        for m in re.finditer(re.escape(word), normalized):
+            start, end = m.start(), m.end()
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                found.add((start, end))
+    return found
+
+
+def test_leetspeak_and_whole_words():
+    matcher = ProfanityMatcher(WORDS)
+    assert matcher.contains("Well, sh1t.")
+    assert matcher.contains("what the H3LL")
+    assert matcher.contains("you $on of a b1tch")
+    assert not matcher.contains("Hello class, pass the assignment to the ushers.")
+
+
+def test_punctuation_after_a_word_is_a_boundary():
+    matcher = ProfanityMatcher(["shit", "fuck", "hell"])
+    assert matcher.contains("This is shit!")
+    assert matcher.contains("what the fuck!")
+    assert matcher.contains("go to hell!")
+    assert matcher.contains("(hell|shit)")
+    assert matcher.contains("sh!t happens")
+    assert not matcher.contains("hell1sh")
+
+
+def test_numbers_are_not_read_as_leetspeak():
+    matcher = ProfanityMatcher(["boob", "tit", "ass", "shit"])
+    assert normalize_text("8008 and 7!7") == "8008 and 7!7"
+    assert not matcher.contains("Page 8008 shows 7!7 and 455 + 7 = 462.")
+    assert not matcher.contains("The code was 5417, then 7!7.")
+    # A token with a letter is still normalized
+    assert matcher.contains("b008 and t!7")
+    assert matcher.contains("a55")
+
+
+def test_matches_agree_with_per_word_search():
+    matcher = ProfanityMatcher(WORDS)
+    vocabulary = ["the", "class", "he", "she", "hers", "ushers", "damn", "d4mn", "shell", "hell", "hell!", "ass", "@ss", "ass+",
+                  "son", "of", "a", "bitch", "sh!t", "!"]
+    rng = random.Random(7)
+    for _ in range(200):
+        text = " ".join(rng.choice(vocabulary) for _ in range(12))
+        assert set(matcher.iter_matches(text)) == naive_matches(text), text
@@ -0,0 +1,48 @@
+import os
+import sys
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.prompt_compressor import compress_transcript
+
+TRANSCRIPT = "\n".join([
+    "[SPEAKER_00]: Um, so today, uh, we we will look at derivatives.",
+    "[SPEAKER_00]: The derivative of x<SUPERSCRIPT TWO> is 2x. I love math <grinning_face>.",
+    "[SPEAKER_01]: What is, what is the derivative of sin x? Is x < y or y > z?",
+    "[SPEAKER_00]: The derivative of x<SUPERSCRIPT TWO> is 2x. It is cos x, you know.",
+])
+
+
+def test_safe_passes_keep_content():
+    stats = {}
+    compressed = compress_transcript(TRANSCRIPT, stats=stats)
+    assert compressed == "\n".join([
+        "[SPEAKER_00]: so today, we will look at derivatives. The derivative of x² is 2x. I love math.",
+        "[SPEAKER_01]: What is the derivative of sin x? Is x < y or y > z?",
+        "[SPEAKER_00]: It is cos x.",
+    ])
+    assert stats["tokens_after"] < stats["tokens_before"]
+    assert "truncated" not in stats
+
+
+def test_budget_drops_statements_before_questions():
+    stats = {}
+    compressed = compress_transcript(TRANSCRIPT, token_budget=30, stats=stats)
+    assert stats["truncated"] and stats["tokens_after"] <= 30
+    assert "What is the derivative of sin x?" in compressed
+    assert "I love math" not in compressed
+
+
+def test_repeated_question_stems_keep_their_options():
+    transcript = ("[SPEAKER_00]: Which of the following is a prime number? A, 21. B, 29. "
+                  "Now the next one. Which of the following is a prime number? A, 4. B, 7.")
+    compressed = compress_transcript(transcript)
+    assert compressed.count("Which of the following is a prime number?") == 2
+    assert compressed.index("A, 4.") > compressed.rindex("Which of the following")
+
+
+def test_emphatic_repeats_are_kept():
+    assert compress_transcript("[SPEAKER_00]: No no no, that is wrong.") == "[SPEAKER_00]: No no no, that is wrong."
+    assert compress_transcript("[SPEAKER_00]: So we we will see.") == "[SPEAKER_00]: So we will see."
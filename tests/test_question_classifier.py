@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import tools.question_classifier as question_classifier
+from tools.question_classifier import SEED_QUESTIONS, SEED_STATEMENTS, is_likely_question, select_threshold, train
+
+
+@pytest.fixture
+def seed_model(monkeypatch):
+    examples = [(s, 1) for s in SEED_QUESTIONS] + [(s, 0) for s in SEED_STATEMENTS]
+    monkeypatch.setattr(question_classifier, "_MODEL", train(examples))
+
+
+def test_question_mark_always_passes(seed_model):
+    assert is_likely_question("[SPEAKER_00]: So, the final one?")
+    assert is_likely_question("It is, right?", threshold=1.0)
+
+
+def test_seed_sentences_are_separated(seed_model):
+    assert all(is_likely_question(s) for s in SEED_QUESTIONS)
+    assert sum(is_likely_question(s) for s in SEED_STATEMENTS) <= len(SEED_STATEMENTS) // 4
+
+
+def test_unseen_questions_without_question_mark(seed_model):
+    assert is_likely_question("What is the derivative of cos x")
+    assert is_likely_question("Which of the following is an even number")
+    assert not is_likely_question("Let me write that on the board again")
+
+
+def test_select_threshold_reaches_target_recall():
+    probabilities = [0.9, 0.8, 0.3, 0.1, 0.7, 0.05]
+    labels = [1, 1, 1, 1, 0, 0]
+    assert select_threshold(probabilities, labels, 0.75) == 0.3
+    assert select_threshold(probabilities, labels, 1.0) == 0.1
+
+
+def test_concurrent_first_use_trains_once(tmp_path, monkeypatch):
+    model_path = str(tmp_path / "question_classifier.json")
+    examples = [(s, 1) for s in SEED_QUESTIONS] + [(s, 0) for s in SEED_STATEMENTS]
+    calls = []
+
+    def fake_train(_examples):
+        calls.append(1)
+        return train(examples, epochs=1)
+
+    monkeypatch.setattr(question_classifier, "MODEL_PATH", model_path)
+    monkeypatch.setattr(question_classifier, "_MODEL", None)
+    monkeypatch.setattr(question_classifier, "train", fake_train)
+    monkeypatch.setattr(question_classifier, "load_training_examples", lambda: examples)
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(question_classifier.get_model())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(model is models[0] for model in models)
+    assert os.listdir(tmp_path) == ["question_classifier.json"]
@@ -0,0 +1,54 @@
+import os
+import sys
+import types
+
+import pytest
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("emoji")
+
+import agents.question_splitter as question_splitter
+from agents.question_splitter import QuestionStream, finish_questions, stream_questions
+
+SEGMENTS = [
+    "[SPEAKER_00]: Which planet is the largest? A, Mars. B, Saturn.",
+    "[SPEAKER_00]: C, Venus. So which one is it?",
+    "[SPEAKER_01]: True or false, the sun is a star.",
+]
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    # Keep the zero-shot topic model out of unit tests
+    monkeypatch.setitem(sys.modules, "tools.sensitive_topic_utils",
+                        types.SimpleNamespace(detect_sensitive_topics=lambda text: []))
+    calls = []
+
+    def fake_invoke(prompt_path, llm_input, response_schema=None):
+        calls.append(llm_input)
+        return [{"id": "1", "question": llm_input["transcript"]}], "[]"
+    monkeypatch.setattr(question_splitter, "invoke_llm_json", fake_invoke)
+    return calls
+
+
+def test_background_stream_matches_batch_extraction(no_llm):
+    stream = QuestionStream("en")
+    for segment in SEGMENTS:
+        stream.put(segment)
+    questions, stats = stream.close()
+    progress = {}
+    assert (questions, stats) == finish_questions(list(stream_questions(SEGMENTS, "en", progress)), progress)
+    assert [q["type"] for q in questions] == ["multiple_choice", "true_false"]
+    assert stats["llm_calls"] == 0
+
+
+def test_cancelled_stream_stops(no_llm):
+    stream = QuestionStream("en")
+    stream.cancel()
+    stream.thread.join(timeout=5)
+    assert not stream.thread.is_alive()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import threading
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from orchestration.resources import HostSlots, ProcessThreadPools, ResourceScheduler, thread_budget
+
+
+def test_heavy_stages_are_capped(tmp_path):
+    scheduler = ResourceScheduler(profiles={"asr": (True, 3), "generator": (False, 1)},
+                                  slots=HostSlots(count=2, directory=str(tmp_path)))
+    running, peak, budgets = [0], [0], []
+    lock = threading.Lock()
+
+    def stage():
+        with scheduler.stage("asr") as threads:
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                budgets.append((threads, thread_budget()))
+            time.sleep(0.1)
+            with lock:
+                running[0] -= 1
+
+    workers = [threading.Thread(target=stage) for _ in range(5)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert peak[0] == 2
+    assert budgets == [(3, 3)] * 5
+    assert scheduler.slots.in_use() == 0
+
+
+def test_light_stages_skip_slots(tmp_path):
+    slots = HostSlots(count=1, directory=str(tmp_path))
+    scheduler = ResourceScheduler(profiles={"asr": (True, 2)}, slots=slots)
+    stats = {}
+    with scheduler.stage("asr", stats):
+        assert slots.in_use() == 1
+        # Unknown stages are light: they run while the only slot is held
+        with scheduler.stage("profanity_checker") as threads:
+            assert threads == 1
+    assert "asr_slot_wait" in stats
+    assert slots.in_use() == 0
+
+
+def test_process_pools_follow_the_largest_running_stage(tmp_path):
+    sizes = []
+    pools = ProcessThreadPools(apply=lambda threads, original: sizes.append(threads))
+    scheduler = ResourceScheduler(profiles={"asr": (True, 4)}, slots=HostSlots(count=1, directory=str(tmp_path)),
+                                  pools=pools)
+    heavy_started, light_done = threading.Event(), threading.Event()
+
+    def heavy_job():
+        with scheduler.stage("asr"):
+            heavy_started.set()
+            light_done.wait()
+
+    job = threading.Thread(target=heavy_job)
+    job.start()
+    heavy_started.wait()
+    # Another job's light stage does not shrink the pools under the heavy one
+    with scheduler.stage("profanity_checker") as threads:
+        assert threads == 1
+    light_done.set()
+    job.join()
+    assert sizes == [4, None]
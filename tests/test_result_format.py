@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+
+from orchestration.result_format import (
+    encode_result, ResultReader, ResultFormatError, load_result, read_section,
+    SERIALIZER_JSON, COMPRESSOR_ZLIB,
+)
+
+RESULT = {
+    "transcript": "[SPEAKER_00]: What is the derivative of x squared?\n" * 500,
+    "questions": [{"id": "q1", "question": "What is the derivative of x squared?"}],
+    "answers": [{"qid": "q1", "question": "What is the derivative of x squared?", "answer": "2x"}],
+    "math_results": {"derivative": "2 x"},
+    "language": "en",
+    "timings": {"asr": 1.5},
+}
+
+
+@pytest.mark.parametrize("codec", [{}, {"serializer": SERIALIZER_JSON, "compressor": COMPRESSOR_ZLIB}])
+def test_round_trip(tmp_path, codec):
+    path = tmp_path / "job.a2a"
+    path.write_bytes(encode_result(RESULT, **codec))
+    assert load_result(str(path)) == RESULT
+    assert load_result(str(path), sections=["answers"]) == {"answers": RESULT["answers"]}
+    assert read_section(str(path), "missing", []) == []
+
+
+def test_sections_are_decoded_independently(tmp_path):
+    path = tmp_path / "job.a2a"
+    data = bytearray(encode_result(RESULT))
+    path.write_bytes(bytes(data))
+    with ResultReader(str(path)) as reader:
+        offset, size, _ = reader.table["transcript"]
+    # Corrupting the transcript must not affect reading the answers
+    data[offset:offset + size] = b"\0" * size
+    path.write_bytes(bytes(data))
+    with ResultReader(str(path)) as reader:
+        assert reader["answers"] == RESULT["answers"]
+        with pytest.raises(Exception):
+            reader["transcript"]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "job.json"
+    path.write_text(json.dumps(RESULT))
+    with pytest.raises(ResultFormatError):
+        ResultReader(str(path))
@@ -0,0 +1,48 @@
+import os
+import sys
+import types
+
+import pytest
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import tools.sentence_segmenter as sentence_segmenter
+from tools.sentence_segmenter import MULTIPROCESS_MIN_CHUNKS, chunk_text, segment_chunks, segment_sentences
+
+TRANSCRIPT = "[SPEAKER_00]: Which planet is the largest\n[SPEAKER_01]: Jupiter. It is a gas giant!\n\n[SPEAKER_00]: Right."
+
+
+def test_chunk_text_keeps_speaker_turns():
+    assert chunk_text(TRANSCRIPT) == [
+        "[SPEAKER_00]: Which planet is the largest\n[SPEAKER_01]: Jupiter. It is a gas giant!\n[SPEAKER_00]: Right."
+    ]
+
+
+def test_chunk_text_cuts_only_at_boundaries():
+    text = " ".join(f"Sentence number {i} ends here." for i in range(50))
+    chunks = chunk_text(text, chunk_chars=100)
+    assert len(chunks) > 1
+    assert all(len(c) <= 100 and c.endswith(".") for c in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_segment_sentences_ends_sentences_at_line_breaks():
+    pytest.importorskip("spacy")
+    assert segment_sentences(TRANSCRIPT) == [
+        "[SPEAKER_00]: Which planet is the largest", "[SPEAKER_01]: Jupiter.", "It is a gas giant!", "[SPEAKER_00]: Right.",
+    ]
+
+
+def test_worker_processes_follow_the_thread_count(monkeypatch):
+    calls = []
+    fake_nlp = types.SimpleNamespace(pipe=lambda chunks, batch_size, n_process: calls.append(n_process) or [])
+    monkeypatch.setattr(sentence_segmenter, "get_segmenter", lambda language: fake_nlp)
+    many = ["A sentence."] * MULTIPROCESS_MIN_CHUNKS
+    segment_chunks(many, threads=8)
+    segment_chunks(many, threads=2)
+    segment_chunks(many)
+    segment_chunks(many[:2], threads=8)
+    segment_chunks(many, n_process=3, threads=8)
+    assert calls == [4, 2, 1, 1, 3]
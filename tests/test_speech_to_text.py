@@ -0,0 +1,83 @@
+import os
+import sys
+import types
+import wave
+
+import pytest
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("dotenv")
+
+import tools.speech_to_text as speech_to_text
+from tools.speech_to_text import encode_for_upload, new_upload_stats, transcribe_audio
+from utils.exceptions import CorruptAudioError
+
+ENCODED_BYTES = 1234
+
+
+def write_wav(path, seconds=3, sample_rate=16000):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00\x00" * sample_rate * seconds)
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    """Records ffmpeg commands and writes a fake encoded file; `stderr` is reported back."""
+    fake = types.SimpleNamespace(commands=[], stderr="")
+
+    def run(cmd, capture_output=True, text=True, check=True):
+        fake.commands.append(cmd)
+        with open(cmd[-1], "wb") as f:
+            f.write(b"\x00" * ENCODED_BYTES)
+        return types.SimpleNamespace(returncode=0, stdout="", stderr=fake.stderr)
+    monkeypatch.setattr(speech_to_text.subprocess, "run", run)
+    return fake
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    uploaded = []
+    monkeypatch.setattr(speech_to_text.genai, "upload_file", lambda path: uploaded.append(path) or types.SimpleNamespace(name="f"))
+    monkeypatch.setattr(speech_to_text.genai, "delete_file", lambda name: None)
+    monkeypatch.setattr(speech_to_text.genai, "GenerativeModel", lambda name: types.SimpleNamespace(generate_content=None))
+    monkeypatch.setattr(speech_to_text, "get_governor",
+                        lambda: types.SimpleNamespace(call=lambda fn, *args: types.SimpleNamespace(text="hello")))
+    return uploaded
+
+
+@pytest.mark.parametrize("codec,ext,encoder", [("flac", ".flac", "flac"), ("opus", ".ogg", "libopus")])
+def test_encode_for_upload_uses_the_speech_profile(ffmpeg, tmp_path, codec, ext, encoder):
+    path = encode_for_upload("in.mp3", str(tmp_path), start_time=1.5, end_time=4.0, codec=codec)
+    cmd = ffmpeg.commands[0]
+    assert path.endswith(ext) and cmd[-1] == path
+    assert cmd[cmd.index("-c:a") + 1] == encoder
+    assert cmd[cmd.index("-ac") + 1] == "1" and cmd[cmd.index("-ar") + 1] == "16000"
+    # Seek before the input, cut length after it
+    assert cmd.index("-ss") < cmd.index("-i") < cmd.index("-t")
+    assert cmd[cmd.index("-t") + 1] == "2.5"
+
+
+def test_decode_errors_raise_corrupt_audio(ffmpeg, tmp_path):
+    ffmpeg.stderr = "Invalid data found when processing input"
+    with pytest.raises(CorruptAudioError):
+        encode_for_upload("in.mp3", str(tmp_path))
+
+
+def test_upload_stats_count_segments_and_full_files(ffmpeg, gemini, tmp_path):
+    audio = tmp_path / "lecture.wav"
+    write_wav(audio, seconds=3)
+    stats = new_upload_stats()
+    assert transcribe_audio(str(audio), start_time=0.5, end_time=2.0, upload_stats=stats) == "hello"
+    assert transcribe_audio(str(audio), upload_stats=stats) == "hello"
+    assert stats["uploads"] == 2
+    assert stats["uploaded_bytes"] == 2 * ENCODED_BYTES
+    # The full-file upload counts the probed duration
+    assert stats["audio_seconds"] == pytest.approx(1.5 + 3.0)
+    assert "-ss" not in ffmpeg.commands[1]
@@ -0,0 +1,66 @@
+import io
+import os
+import sys
+import time
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.storage import StorageManager
+
+
+def make_storage(tmp_path, monkeypatch, budget):
+    monkeypatch.chdir(tmp_path)
+    return StorageManager(db_path=os.path.join("cache", "storage.sqlite"),
+                          budgets={"uploads": budget, "outputs": budget}, grace_seconds=0)
+
+
+def write(path, size, age):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    os.utime(path, (time.time() - age, time.time() - age))
+
+
+def test_duplicate_uploads_are_hardlinked(tmp_path, monkeypatch):
+    storage = make_storage(tmp_path, monkeypatch, budget=10_000)
+    data = os.urandom(4000)
+    _, first = storage.store_upload(io.BytesIO(data), "uploads/a_lecture.wav")
+    _, second = storage.store_upload(io.BytesIO(data), "uploads/b_lecture.wav")
+    assert (first, second) == (False, True)
+    assert os.stat("uploads/a_lecture.wav").st_ino == os.stat("uploads/b_lecture.wav").st_ino
+    report = storage.report()
+    assert report["directories"]["uploads"]["bytes"] == 4000
+    assert report["dedup_bytes_saved"] == 4000
+
+
+def test_lru_eviction_respects_pins(tmp_path, monkeypatch):
+    storage = make_storage(tmp_path, monkeypatch, budget=3000)
+    for name, age in (("old", 300), ("pinned", 200), ("used", 100), ("new", 0)):
+        write(f"outputs/{name}.a2a", 1000, age)
+    storage.record(*(f"outputs/{name}.a2a" for name in ("old", "pinned", "used", "new")))
+    storage.touch("outputs/used.a2a")
+    with storage.pinned("job-1", ["outputs/pinned"]):
+        result = storage.evict("outputs")
+        assert sorted(os.listdir("outputs")) == ["new.a2a", "pinned.a2a", "used.a2a"]
+        assert result["evicted_files"] == 1 and result["bytes"] == 3000
+        # "used" was touched after "new" was written, so "new" goes next
+        storage.budgets["outputs"] = 2000
+        storage.evict("outputs")
+        assert sorted(os.listdir("outputs")) == ["pinned.a2a", "used.a2a"]
+    # Unpinned, the oldest file is evicted first
+    storage.budgets["outputs"] = 1000
+    storage.evict("outputs")
+    assert os.listdir("outputs") == ["used.a2a"]
+    assert storage.report()["directories"]["outputs"]["evicted_files"] == 3
+
+
+def test_eviction_skips_unrecorded_files(tmp_path, monkeypatch):
+    storage = make_storage(tmp_path, monkeypatch, budget=1000)
+    write("outputs/tracked.py", 1000, 300)
+    write("outputs/job.a2a", 1000, 0)
+    storage.record("outputs/job.a2a")
+    result = storage.evict("outputs")
+    assert os.listdir("outputs") == ["tracked.py"]
+    assert result["evicted_files"] == 1 and result["bytes"] == 1000
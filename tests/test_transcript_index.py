@@ -0,0 +1,62 @@
+import os
+import sys
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.token_utils import estimate_tokens
+from tools.transcript_index import TranscriptIndex
+
+
+def passage(position, text):
+    return {"kind": "sentence", "position": position, "text": text}
+
+
+PASSAGES = [
+    passage(0, "Photosynthesis turns light into chemical energy in the chloroplast."),
+    passage(1, "The mitochondria release energy from glucose."),
+    passage(2, "Chlorophyll absorbs red and blue light, and chlorophyll reflects green light."),
+    passage(3, "Next week we cover cell division."),
+]
+
+
+def test_bm25_ranks_matching_passages_first():
+    index = TranscriptIndex(PASSAGES)
+    results = index.search("Why is chlorophyll green?")
+    assert [p["position"] for p in results] == [2]
+    scores = index.bm25_scores("light energy")
+    assert scores[3] == 0
+    assert min(scores[0], scores[2]) > scores[1] > 0
+    # Unmatched queries retrieve nothing
+    assert index.search("quantum tunnelling") == []
+
+
+def test_token_budget_stops_before_overflow():
+    index = TranscriptIndex(PASSAGES)
+    unlimited = index.search("light energy")
+    assert len(unlimited) == 3
+    budget = estimate_tokens(unlimited[0]["text"]) + 1
+    limited = index.search("light energy", token_budget=budget)
+    assert sum(estimate_tokens(p["text"]) for p in limited) <= budget
+    assert limited[0]["text"] == unlimited[0]["text"]
+    assert len(limited) < len(unlimited)
+
+
+def test_speaker_turns_are_indexed_and_preferred_over_their_sentences():
+    transcript = "[SPEAKER_00]: Chlorophyll is green. It reflects green light.\n[SPEAKER_01]: Why?"
+    index = TranscriptIndex.from_transcript(transcript)
+    kinds = [p["kind"] for p in index.passages]
+    assert kinds.count("turn") == 2 and kinds.count("sentence") >= 3
+    top = index.search("green light")[0]
+    assert top["kind"] == "turn" and top["speaker"] == "SPEAKER_00"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = TranscriptIndex(PASSAGES)
+    path = str(tmp_path / "job.index.pkl")
+    index.save(path)
+    loaded = TranscriptIndex.load(path)
+    assert loaded.passages == PASSAGES
+    assert loaded.search("Why is chlorophyll green?") == index.search("Why is chlorophyll green?")
+    assert loaded.context_for("light energy") == index.context_for("light energy")
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import numpy as np
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.windowed_diarization import (
+    cluster_speakers, diarization_error_rate, match_by_overlap, merge_short_turns, plan_windows, stitch_windows
+)
+
+VOICES = {"alice": np.array([1.0, 0.1, 0.0]), "bob": np.array([0.0, 1.0, 0.2])}
+
+
+def turn(speaker, start, end):
+    return {"speaker": speaker, "start": start, "end": end}
+
+
+def windows_of(reference, plan):
+    """Diarization as each window would see it, with window-local labels."""
+    results = []
+    for w, (start, end) in enumerate(plan):
+        local = {}
+        turns = []
+        for t in reference:
+            if t["end"] > start and t["start"] < end:
+                label = local.setdefault(t["speaker"], f"SPEAKER_0{(len(local) + w) % 2}")
+                turns.append(turn(label, max(t["start"], start), min(t["end"], end)))
+        embeddings = {label: VOICES[name] + 0.05 * w for name, label in local.items()}
+        results.append({"start": start, "end": end, "turns": turns, "embeddings": embeddings})
+    return results
+
+
+REFERENCE = [turn("alice", 0, 140), turn("bob", 140, 260), turn("alice", 260, 420), turn("bob", 420, 600)]
+
+
+def test_plan_windows_covers_duration_with_overlap():
+    plan = plan_windows(700, window=300, overlap=30)
+    assert plan == [(0.0, 300), (270, 570), (540, 700)]
+    assert plan_windows(120, window=300) == [(0.0, 120)]
+
+
+def test_windows_stitch_back_to_reference():
+    results = windows_of(REFERENCE, plan_windows(600, window=200, overlap=20))
+    stitched = merge_short_turns(stitch_windows(results, cluster_speakers(results)))
+    assert len({t["speaker"] for t in stitched}) == 2
+    assert len(stitched) == len(REFERENCE)
+    assert diarization_error_rate(REFERENCE, stitched)["der"] < 0.001
+
+    # Without embeddings only speakers heard in an overlap can be linked
+    mapping = match_by_overlap(results)
+    assert mapping[(0, "SPEAKER_01")] == mapping[(1, "SPEAKER_01")]
+    assert mapping[(2, "SPEAKER_01")] == mapping[(3, "SPEAKER_01")]
+
+
+def test_same_window_speakers_never_merge():
+    results = [{"start": 0, "end": 10, "turns": [], "embeddings": {"A": VOICES["alice"], "B": VOICES["alice"]}}]
+    assert len(set(cluster_speakers(results).values())) == 2
+
+
+def test_merge_short_turns():
+    turns = [turn("A", 0, 5), turn("A", 5.3, 9), turn("B", 9, 9.4), turn("A", 9.4, 15), turn("B", 15, 20)]
+    assert merge_short_turns(turns, 1.0) == [turn("A", 0, 15), turn("B", 15, 20)]
+
+
+def test_der_counts_confusion_and_misses():
+    hypothesis = [turn("x", 0, 140), turn("y", 140, 420), turn("x", 420, 600)]
+    report = diarization_error_rate(REFERENCE, hypothesis)
+    # Best mapping is alice -> y, bob -> x: 0-140 and 140-260 are confused
+    assert abs(report["der"] - 260 / 600) < 0.001
+    assert diarization_error_rate(REFERENCE, [])["der"] == 1.0
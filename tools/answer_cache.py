@@ -0,0 +1,260 @@
+import glob
+import json
+import os
+import re
+import tempfile
+import threading
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+# On-disk store of answered questions: metadata as JSON and one normalized
+# embedding row per entry in a NumPy matrix, searched by brute-force cosine.
+STORE_DIR = os.path.join("cache", "answer_store")
+# An explicit store directory (e.g. an empty one for evaluation runs) is used
+# as is, without seeding it from past outputs and feedback
+STORE_DIR_OVERRIDE = os.getenv("A2A_ANSWER_STORE_DIR")
+FEEDBACK_DIR = "feedback"
+OUTPUTS_DIR = "outputs"
+MATCH_THRESHOLD = 0.9
+HASHED_DIMENSIONS = 4096
+
+# Revised feedback beats a verified answer, which beats an unreviewed one
+SOURCE_PRIORITY = {"feedback_revised": 2, "feedback_verified": 1, "generated": 0}
+FILLER_WORDS = {"uh", "um", "like", "so", "okay", "well"}
+# Numbers (with attached variables, e.g. "3x"), math symbols and one-letter
+# variables; a stored answer is only reused when these match exactly
+OPERAND_PATTERN = re.compile(r"\d+(?:[.,]\d+)*[a-z]*|[+*/^=<>%√π]|(?<![a-z])-|-(?![a-z])|\b(?![ai]\b)[a-z]\b")
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalizes question text for matching: lowercase, no speaker tags,
+    punctuation or filler words, single spaces.
+    """
+    text = re.sub(r"\[[^\]]*\]:?", " ", text.lower())
+    words = [w for w in re.findall(r"\w+", text) if w not in FILLER_WORDS]
+    return " ".join(words)
+
+
+def operand_tokens(text: str) -> List[str]:
+    """
+    The numeric and symbolic tokens of a question, in order. Questions that
+    differ only in these look alike to the embedding but need other answers.
+    """
+    text = re.sub(r"\[[^\]]*\]:?", " ", text.lower())
+    return OPERAND_PATTERN.findall(text)
+
+
+def hashed_embedding(texts: List[str]) -> np.ndarray:
+    """
+    Dependency-free embedding: hashed word unigrams, bigrams and character
+    trigrams. Used when sentence-transformers is not installed.
+    """
+    matrix = np.zeros((len(texts), HASHED_DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = normalize_question(text).split()
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        joined = " ".join(words)
+        grams += [joined[i:i + 3] for i in range(len(joined) - 2)]
+        for gram in grams:
+            matrix[row, zlib.crc32(gram.encode("utf-8")) % HASHED_DIMENSIONS] += 1.0
+    return matrix
+
+
+def default_encoder():
+    """
+    Returns (name, encoder): sentence-transformers when available, the hashed
+    embedding otherwise.
+    """
+    from tools.transcript_index import sentence_transformer_encoder
+    encoder = sentence_transformer_encoder()
+    if encoder is not None:
+        return "all-MiniLM-L6-v2", encoder
+    return "hashed-ngrams", hashed_embedding
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _atomic_write(path: str, write):
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class AnswerStore:
+    """
+    Cross-job store of answered questions. Near-duplicate questions are
+    matched by cosine similarity so repeated exam and homework questions
+    can be answered without an LLM call. Safe to share between threads.
+    """
+
+    def __init__(self, store_dir: str = STORE_DIR, encoder_name: str = None, encoder=None):
+        if encoder is None:
+            encoder_name, encoder = default_encoder()
+        self.store_dir = store_dir
+        self.encoder_name = encoder_name
+        self.encoder = encoder
+        self.entries = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.by_normalized = {}
+        self.lock = threading.RLock()
+
+    @property
+    def entries_path(self):
+        return os.path.join(self.store_dir, "entries.json")
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.store_dir, "vectors.npy")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        return _normalize_rows(np.asarray(self.encoder([normalize_question(t) for t in texts]), dtype=np.float32))
+
+    def _reindex(self):
+        self.by_normalized = {}
+        for i, entry in enumerate(self.entries):
+            best = self.by_normalized.get(entry["normalized"])
+            if best is None or SOURCE_PRIORITY[entry["source"]] >= SOURCE_PRIORITY[self.entries[best]["source"]]:
+                self.by_normalized[entry["normalized"]] = i
+
+    def load(self) -> bool:
+        """
+        Loads the store from disk. Returns False if there is no store yet or it
+        was built with a different encoder.
+        """
+        if not os.path.exists(self.entries_path) or not os.path.exists(self.vectors_path):
+            return False
+        with open(self.entries_path, "r") as f:
+            data = json.load(f)
+        if data.get("encoder") != self.encoder_name:
+            return False
+        self.entries = data["entries"]
+        self.vectors = np.load(self.vectors_path)
+        self._reindex()
+        return True
+
+    def save(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        payload = json.dumps({"encoder": self.encoder_name, "entries": self.entries}).encode("utf-8")
+        _atomic_write(self.entries_path, lambda f: f.write(payload))
+        _atomic_write(self.vectors_path, lambda f: np.save(f, self.vectors))
+
+    def add_many(self, items: List[dict], save: bool = True):
+        """
+        Adds {"question", "answer", "source"} items. An item replaces an existing
+        entry for the same normalized question unless that entry has a higher
+        priority source.
+        """
+        with self.lock:
+            self._add_many(items)
+            if save:
+                self.save()
+
+    def _add_many(self, items: List[dict]):
+        new_questions = []
+        for item in items:
+            if not item.get("question") or not item.get("answer"):
+                continue
+            entry = {
+                "question": item["question"],
+                "normalized": normalize_question(item["question"]),
+                "answer": item["answer"],
+                "source": item.get("source", "generated"),
+            }
+            existing = self.by_normalized.get(entry["normalized"])
+            if existing is not None:
+                if SOURCE_PRIORITY[self.entries[existing]["source"]] > SOURCE_PRIORITY[entry["source"]]:
+                    continue
+                self.entries[existing] = entry
+                continue
+            self.by_normalized[entry["normalized"]] = len(self.entries)
+            self.entries.append(entry)
+            new_questions.append(entry["question"])
+        if new_questions:
+            vectors = self._embed(new_questions)
+            self.vectors = vectors if self.vectors.size == 0 else np.vstack([self.vectors, vectors])
+
+    def lookup(self, question: str, threshold: float = MATCH_THRESHOLD) -> Optional[dict]:
+        """
+        Returns the stored answer for a near-duplicate question, preferring
+        revised feedback, then verified answers, then the closest match.
+        Only questions with exactly the same numbers and symbols match.
+        Returns None when nothing scores above `threshold`.
+        """
+        with self.lock:
+            if not self.entries:
+                return None
+            operands = operand_tokens(question)
+            normalized = normalize_question(question)
+            if normalized in self.by_normalized:
+                entry = self.entries[self.by_normalized[normalized]]
+                if operand_tokens(entry["question"]) == operands:
+                    return dict(entry, similarity=1.0)
+            similarities = self.vectors @ self._embed([question])[0]
+            candidates = [i for i in np.flatnonzero(similarities >= threshold)
+                          if operand_tokens(self.entries[i]["question"]) == operands]
+            if not candidates:
+                return None
+            best = max(candidates, key=lambda i: (SOURCE_PRIORITY[self.entries[i]["source"]], similarities[i]))
+            return dict(self.entries[best], similarity=float(similarities[best]))
+
+
+def feedback_items(feedback_dir: str = FEEDBACK_DIR) -> List[dict]:
+    """
+    Reads the human feedback saved by --feedback as store items.
+    """
+    items = []
+    for path in sorted(glob.glob(os.path.join(feedback_dir, "*.json"))):
+        with open(path, "r") as f:
+            for entry in json.load(f):
+                if entry.get("feedback_type") == "r" and entry.get("revised_answer"):
+                    items.append({"question": entry["question"], "answer": entry["revised_answer"], "source": "feedback_revised"})
+                elif entry.get("feedback_type") == "c":
+                    items.append({"question": entry["question"], "answer": entry["original_answer"], "source": "feedback_verified"})
+    return items
+
+
+def output_items(outputs_dir: str = OUTPUTS_DIR) -> List[dict]:
+    """
+    Reads previously generated answers from JSON outputs as store items.
+    """
+    items = []
+    for path in sorted(glob.glob(os.path.join(outputs_dir, "*.json"))):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for a in data.get("answers", []) if isinstance(data, dict) else []:
+            items.append({"question": a.get("question"), "answer": a.get("answer"), "source": "generated"})
+    return items
+
+
+def get_answer_store() -> AnswerStore:
+    """
+    Returns the process-wide answer store, seeding it from past outputs and
+    feedback the first time it is created, unless A2A_ANSWER_STORE_DIR is set.
+    """
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            store = AnswerStore(STORE_DIR_OVERRIDE or STORE_DIR)
+            if not store.load() and not STORE_DIR_OVERRIDE:
+                store.add_many(output_items() + feedback_items())
+            _STORE = store
+        return _STORE
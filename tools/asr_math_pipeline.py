@@ -1,16 +1,97 @@
 import os
+import threading
 import google.generativeai as genai
 import tempfile
 import whisper
+from tools.llm_quota import get_governor
+from typing import Iterable
+from tools.asr_tiers import (
+    DEFAULT_TIER, DEFAULT_BATCH_SIZE, WHISPER_SAMPLE_RATE, WINDOW_SECONDS, parse_tier, split_windows, stream_windows
+)
 
 # ASR: Automatic Speech Recognition using OpenAI Whisper
 
-def transcribe_audio_whisper(audio_path: str, model_size: str = "base") -> str:
+# Loaded models by (size, quantized), kept warm for the life of the process
+_WHISPER_MODELS = {}
+_WHISPER_LOCK = threading.Lock()
+
+def quantize_whisper_model(model):
+    """
+    int8 dynamic quantization of the Linear layers, for CPU inference.
+    Whisper's Linear subclass only adds a dtype cast, which is a no-op in
+    fp32, so its layers are retyped to nn.Linear to be picked up.
+    """
+    import torch
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def load_whisper_model(model_size: str = "base", quantize: bool = False):
+    """
+    Returns a Whisper model, loading it only on first use.
+    """
+    key = (model_size, quantize)
+    with _WHISPER_LOCK:
+        if key not in _WHISPER_MODELS:
+            if quantize:
+                _WHISPER_MODELS[key] = quantize_whisper_model(whisper.load_model(model_size, device="cpu"))
+            else:
+                _WHISPER_MODELS[key] = whisper.load_model(model_size)
+        return _WHISPER_MODELS[key]
+
+def transcribe_windows_batched(model, windows: Iterable, language: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> str:
+    """
+    Decodes consecutive ~30 second windows of audio, `batch_size` windows
+    per forward pass. Windows are consumed lazily, so a streamed source is
+    never held in memory whole. Unlike `model.transcribe`, windows are
+    independent: no text is carried over from one window to the next.
+    """
+    import torch
+    n_mels = getattr(model.dims, "n_mels", 80)
+    options = None
+    texts = []
+    batch = []
+
+    def decode(batch):
+        mels = torch.stack(batch).to(model.device)
+        texts.extend(result.text.strip() for result in whisper.decode(model, mels, options))
+
+    for window in windows:
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(window)), n_mels)
+        if options is None:
+            if language is None:
+                _, probs = model.detect_language(mel.to(model.device))
+                language = max(probs, key=probs.get)
+            options = whisper.DecodingOptions(language=language, fp16=model.device.type == "cuda", without_timestamps=True)
+        batch.append(mel)
+        if len(batch) == batch_size:
+            decode(batch)
+            batch = []
+    if batch:
+        decode(batch)
+    return " ".join(text for text in texts if text)
+
+def transcribe_audio_whisper(audio_path: str, tier: str = DEFAULT_TIER, batch_size: int = DEFAULT_BATCH_SIZE,
+                             language: str = None, stream: bool = False) -> str:
     """
-    Transcribe audio to text using OpenAI Whisper.
+    Transcribe audio to text using OpenAI Whisper. `tier` selects the model
+    size and optional int8 quantization (see tools/asr_tiers.py); a
+    `batch_size` above 1 decodes that many 30 second windows per pass.
+    `stream` decodes the file window by window instead of loading it whole,
+    for recordings too long to fit in memory.
     """
-    model = whisper.load_model(model_size)
-    result = model.transcribe(audio_path)
+    size, quantize = parse_tier(tier)
+    model = load_whisper_model(size, quantize)
+    if stream:
+        from tools.audio_enhancer import iter_pcm_blocks
+        blocks = iter_pcm_blocks(audio_path, WHISPER_SAMPLE_RATE, WINDOW_SECONDS)
+        return transcribe_windows_batched(model, stream_windows(blocks), language, max(batch_size, 1))
+    if batch_size > 1:
+        return transcribe_windows_batched(model, split_windows(whisper.load_audio(audio_path)), language, batch_size)
+    # Quantized models only run on the CPU, in fp32
+    options = {"fp16": False} if quantize else {}
+    result = model.transcribe(audio_path, language=language, **options)
     return result["text"]
 
 # Math Normalizer using Gemini LLM
@@ -27,7 +108,7 @@ def normalize_math_llm(text: str, api_key: str = None) -> str:
         "Use standard math notation, parentheses, exponents, and symbols as appropriate. "
         "If the text is not mathematical, return it unchanged.\n\nText: " + text
     )
-    response = model.generate_content(prompt)
+    response = get_governor().call(model.generate_content, prompt)
     return response.text.strip()
 
 # SymPy integration is in tools/math_utils.py
@@ -0,0 +1,89 @@
+import os
+import re
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# Whisper tiers for CPU workers. A tier is a model size with an optional
+# "-int8" suffix for the dynamically quantized variant, e.g. "small-int8".
+WHISPER_SIZES = ["tiny", "base", "small", "medium", "large"]
+WHISPER_TIERS = WHISPER_SIZES + [f"{size}-int8" for size in WHISPER_SIZES]
+DEFAULT_TIER = os.getenv("WHISPER_TIER", "base")
+# 30-second windows decoded together in one forward pass
+DEFAULT_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "1"))
+
+WHISPER_SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30.0
+# Each window ends at the quietest point of its last CUT_SEARCH_SECONDS, so
+# cuts fall between words rather than through them
+CUT_SEARCH_SECONDS = 3.0
+CUT_FRAME_SECONDS = 0.02
+
+
+def parse_tier(tier: str) -> Tuple[str, bool]:
+    """Returns (model size, quantized) for a tier name."""
+    if tier not in WHISPER_TIERS:
+        raise ValueError(f"Unknown Whisper tier: {tier}. Choose one of: {', '.join(WHISPER_TIERS)}")
+    size, _, suffix = tier.partition("-")
+    return size, suffix == "int8"
+
+
+def split_windows(audio: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE,
+                  window: float = WINDOW_SECONDS, search: float = CUT_SEARCH_SECONDS) -> List[np.ndarray]:
+    """
+    Splits audio into consecutive windows of at most `window` seconds, each
+    cut at the lowest-energy frame near its end.
+    """
+    window_samples = int(window * sample_rate)
+    search_samples = int(search * sample_rate)
+    frame = max(1, int(CUT_FRAME_SECONDS * sample_rate))
+    windows = []
+    start = 0
+    while len(audio) - start > window_samples:
+        tail = audio[start + window_samples - search_samples:start + window_samples]
+        frames = len(tail) // frame
+        energy = np.square(tail[:frames * frame].reshape(frames, frame)).mean(axis=1)
+        cut = start + window_samples - search_samples + (int(np.argmin(energy)) + 1) * frame
+        windows.append(audio[start:cut])
+        start = cut
+    if start < len(audio):
+        windows.append(audio[start:])
+    return windows
+
+
+def stream_windows(blocks: Iterable[np.ndarray], sample_rate: int = WHISPER_SAMPLE_RATE,
+                   window: float = WINDOW_SECONDS) -> Iterator[np.ndarray]:
+    """
+    `split_windows` over audio arriving in blocks: only the current window
+    and one block are held in memory.
+    """
+    carry = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        carry = np.concatenate([carry, block])
+        windows = split_windows(carry, sample_rate, window)
+        if not windows:
+            continue
+        yield from windows[:-1]
+        carry = windows[-1]
+    if len(carry):
+        yield carry
+
+
+def normalize_words(text: str) -> List[str]:
+    """Lower-cased words without speaker labels or punctuation."""
+    text = re.sub(r"\[[^\]]*\]:?", " ", text.lower())
+    return re.findall(r"[\w']+", text)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
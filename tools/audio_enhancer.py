@@ -1,22 +1,165 @@
 import os
 import subprocess
 import shutil
+import wave
 
-def enhance_audio(input_path: str) -> str:
+try:
+    import numpy as np
+    from scipy.signal import butter, lfilter, sosfilt
+except ImportError:  # In-process enhancement is optional; ffmpeg remains the fallback
+    np = None
+
+# Parameters of the enhancement chain, mirroring the ffmpeg filter
+# "highpass=f=200,lowpass=f=3000,acompressor" (acompressor defaults).
+ENHANCE_SAMPLE_RATE = 16000
+ENHANCE_BLOCK_SECONDS = 10
+HIGHPASS_HZ = 200
+LOWPASS_HZ = 3000
+COMPRESSOR_THRESHOLD = 0.125
+COMPRESSOR_RATIO = 2.0
+COMPRESSOR_ATTACK_MS = 20
+COMPRESSOR_RELEASE_MS = 250
+COMPRESSOR_FRAME_MS = 10
+
+
+class AudioEnhancer:
     """
-    Enhances an audio file using ffmpeg to reduce noise and normalize volume.
-    Returns the path to the enhanced audio file.
+    In-process version of the ffmpeg enhancement chain for float32 PCM blocks.
+    Filter and compressor state carry over between calls to `process`, so a
+    long recording can be enhanced block by block in bounded memory, with the
+    same output as enhancing it in one call. Samples of an incomplete
+    compressor frame are held until the next block, or until `flush`.
     """
-    if not shutil.which("ffmpeg"):
-        print("ffmpeg not found. Please install ffmpeg and ensure it's in your PATH.")
-        return input_path
 
-    output_dir = "outputs"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    filename, ext = os.path.splitext(os.path.basename(input_path))
-    output_path = os.path.join(output_dir, f"{filename}_enhanced{ext}")
+    def __init__(self, sample_rate: int = ENHANCE_SAMPLE_RATE):
+        if np is None:
+            raise RuntimeError("numpy and scipy are required for in-process audio enhancement.")
+        self.sample_rate = sample_rate
+        self.sos = np.vstack([
+            butter(2, HIGHPASS_HZ, btype="highpass", fs=sample_rate, output="sos"),
+            butter(2, LOWPASS_HZ, btype="lowpass", fs=sample_rate, output="sos"),
+        ])
+        self.zi = np.zeros((self.sos.shape[0], 2))
+        self.frame_size = max(1, int(sample_rate * COMPRESSOR_FRAME_MS / 1000))
+        self.attack_coef = np.exp(-COMPRESSOR_FRAME_MS / COMPRESSOR_ATTACK_MS)
+        self.release_coef = np.exp(-COMPRESSOR_FRAME_MS / COMPRESSOR_RELEASE_MS)
+        self.peak = 0.0
+        self.envelope = 0.0
+        self.last_gain = 1.0
+        self.pending = np.zeros(0)
+
+    def _compressor_gains(self, levels):
+        """
+        Computes one gain per compressor frame from the frames' RMS levels
+        with a decoupled peak detector: a peak hold that decays at the
+        release rate, smoothed at the attack rate. Both steps are vectorized.
+        """
+        # Peak hold: peak[t] = max over s <= t of level[s] * release^(t - s),
+        # as a running maximum in the log domain (frame 0 is the carried peak)
+        steps = np.arange(1, len(levels) + 1) * np.log(self.release_coef)
+        with np.errstate(divide="ignore"):
+            log_levels = np.concatenate([[np.log(self.peak)], np.log(levels) - steps])
+        peaks = np.exp(np.maximum.accumulate(log_levels)[1:] + steps)
+        self.peak = peaks[-1]
+
+        envelope, _ = lfilter([1.0 - self.attack_coef], [1.0, -self.attack_coef], peaks,
+                              zi=[self.attack_coef * self.envelope])
+        self.envelope = envelope[-1]
+
+        gains = np.ones(len(levels))
+        loud = envelope > COMPRESSOR_THRESHOLD
+        gains[loud] = (COMPRESSOR_THRESHOLD * (envelope[loud] / COMPRESSOR_THRESHOLD) ** (1.0 / COMPRESSOR_RATIO)) / envelope[loud]
+        return gains
+
+    def _compress(self, samples, n_frames):
+        """Applies the compressor to `n_frames` frames of filtered samples (the last may be partial)."""
+        padded = np.zeros(n_frames * self.frame_size)
+        padded[:len(samples)] = samples
+        frames = padded.reshape(n_frames, self.frame_size)
+        counts = np.full(n_frames, self.frame_size)
+        counts[-1] = len(samples) - (n_frames - 1) * self.frame_size
+        gains = self._compressor_gains(np.sqrt(np.sum(frames ** 2, axis=1) / counts))
+        # Ramp from the previous frame's gain to each frame's gain to avoid zipper noise
+        previous = np.concatenate([[self.last_gain], gains[:-1]])
+        ramp = np.arange(1, self.frame_size + 1) / self.frame_size
+        sample_gains = (previous[:, None] + (gains - previous)[:, None] * ramp).ravel()[:len(samples)]
+        self.last_gain = gains[-1]
+        return np.clip(samples * sample_gains, -1.0, 1.0).astype(np.float32)
+
+    def process(self, block):
+        """
+        Enhances one block of mono float32 samples in [-1, 1] and returns the
+        enhanced samples of the compressor frames completed so far.
+        """
+        filtered, self.zi = sosfilt(self.sos, block, zi=self.zi)
+        samples = np.concatenate([self.pending, filtered])
+        n_frames = len(samples) // self.frame_size
+        self.pending = samples[n_frames * self.frame_size:]
+        if n_frames == 0:
+            return np.zeros(0, dtype=np.float32)
+        return self._compress(samples[:n_frames * self.frame_size], n_frames)
+
+    def flush(self):
+        """Returns the enhanced held-back samples at the end of the recording."""
+        samples, self.pending = self.pending, np.zeros(0)
+        if len(samples) == 0:
+            return np.zeros(0, dtype=np.float32)
+        return self._compress(samples, 1)
+
+
+def iter_pcm_blocks(input_path: str, sample_rate: int = ENHANCE_SAMPLE_RATE, block_seconds: float = ENHANCE_BLOCK_SECONDS):
+    """
+    Decodes an audio file once with ffmpeg and yields mono float32 blocks.
+    Only one block is held in memory at a time.
+    """
+    command = [
+        "ffmpeg",
+        "-v", "error",
+        "-i", input_path,
+        "-f", "s16le",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    block_bytes = int(sample_rate * block_seconds) * 2
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            raw = process.stdout.read(block_bytes)
+            if not raw:
+                break
+            raw = raw[:len(raw) - len(raw) % 2]
+            yield np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read().decode(errors="replace")
+        process.stderr.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {input_path}: {stderr.strip()}")
 
+
+def enhance_audio_in_process(input_path: str, output_path: str, sample_rate: int = ENHANCE_SAMPLE_RATE) -> str:
+    """
+    Streams the enhanced samples block by block into a 16-bit PCM WAV file,
+    which diarization and transcription read as lossless PCM instead of
+    decoding a re-encoded copy.
+    """
+    enhancer = AudioEnhancer(sample_rate)
+    with wave.open(output_path, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        for block in iter_pcm_blocks(input_path, sample_rate):
+            out.writeframes((enhancer.process(block) * 32767.0).astype("<i2").tobytes())
+        out.writeframes((enhancer.flush() * 32767.0).astype("<i2").tobytes())
+    return output_path
+
+
+def enhance_audio_ffmpeg(input_path: str, output_path: str) -> str:
+    """
+    Enhances an audio file with the ffmpeg filter chain.
+    Returns the input path unchanged if ffmpeg fails.
+    """
     # ffmpeg command with filters for noise reduction and normalization
     command = [
         "ffmpeg",
@@ -35,3 +178,30 @@ def enhance_audio(input_path: str) -> str:
         return input_path
 
     return output_path
+
+
+def enhance_audio(input_path: str, in_process: bool = True) -> str:
+    """
+    Enhances an audio file to reduce noise and normalize volume.
+    Uses the in-process engine when numpy/scipy are available and falls back
+    to the ffmpeg filter chain otherwise. Returns the path to the enhanced audio file.
+    """
+    if not shutil.which("ffmpeg"):
+        print("ffmpeg not found. Please install ffmpeg and ensure it's in your PATH.")
+        return input_path
+
+    output_dir = "outputs"
+    os.makedirs(output_dir, exist_ok=True)
+
+    filename, ext = os.path.splitext(os.path.basename(input_path))
+
+    if in_process and np is not None:
+        output_path = os.path.join(output_dir, f"{filename}_enhanced.wav")
+        try:
+            return enhance_audio_in_process(input_path, output_path)
+        except Exception as e:
+            print(f"In-process enhancement failed, falling back to ffmpeg filters: {e}")
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+    return enhance_audio_ffmpeg(input_path, os.path.join(output_dir, f"{filename}_enhanced{ext}"))
@@ -0,0 +1,392 @@
+import hashlib
+import os
+import struct
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# How much of the file the sniffers look at
+HEADER_READ_BYTES = 64 * 1024
+TAIL_READ_BYTES = 64 * 1024
+MAX_MP4_MOOV_BYTES = 16 * 1024 * 1024
+PROBE_CACHE_SIZE = 4096
+
+_PROBE_CACHE = OrderedDict()
+# probe_audio_files probes on worker threads
+_PROBE_CACHE_LOCK = threading.Lock()
+
+MP3_BITRATES = {
+    # (mpeg version 1, layer 3) and (mpeg version 2/2.5, layer 3), kbit/s
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],   # MPEG 1
+    2: [22050, 24000, 16000],   # MPEG 2
+    0: [11025, 12000, 8000],    # MPEG 2.5
+}
+WAV_CODECS = {
+    (1, 8): "pcm_u8",
+    (1, 16): "pcm_s16le",
+    (1, 24): "pcm_s24le",
+    (1, 32): "pcm_s32le",
+    (3, 32): "pcm_f32le",
+    (3, 64): "pcm_f64le",
+    (6, 8): "pcm_alaw",
+    (7, 8): "pcm_mulaw",
+}
+MP4_CODECS = {b"mp4a": "aac", b"Opus": "opus", b"fLaC": "flac", b"alac": "alac", b".mp3": "mp3"}
+
+
+def _probe_result(format_name, codec, channels=None, sample_rate=None, duration=None, source="sniff"):
+    return {
+        "format": format_name,
+        "codec": codec,
+        "channels": channels,
+        "sample_rate": sample_rate,
+        "duration": duration,
+        "source": source,
+    }
+
+
+def _sniff_wav(f, head, file_size):
+    if head[:4] not in (b"RIFF", b"RF64") or head[8:12] != b"WAVE":
+        return None
+    fmt = None
+    data_size = None
+    offset = 12
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = f.read(min(chunk_size, 40))
+        elif chunk_id == b"data":
+            data_size = min(chunk_size, file_size - offset - 8)
+            break
+        offset += 8 + chunk_size + (chunk_size & 1)
+    if fmt is None or len(fmt) < 16:
+        return None
+    audio_format, channels, sample_rate, byte_rate, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if audio_format == 0xFFFE and len(fmt) >= 26:
+        # WAVE_FORMAT_EXTENSIBLE: the real format tag leads the sub-format GUID
+        audio_format = struct.unpack("<H", fmt[24:26])[0]
+    codec = WAV_CODECS.get((audio_format, bits), f"wav_format_{audio_format}")
+    duration = data_size / byte_rate if data_size is not None and byte_rate else None
+    return _probe_result("wav", codec, channels, sample_rate, duration)
+
+
+def _id3v2_size(head):
+    if head[:3] != b"ID3" or len(head) < 10:
+        return 0
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _sniff_mp3(f, head, file_size):
+    offset = _id3v2_size(head)
+    if offset:
+        f.seek(offset)
+        head = f.read(HEADER_READ_BYTES)
+        base = offset
+    else:
+        base = 0
+    # Find the first plausible MPEG audio frame header
+    for i in range(min(len(head) - 4, 8192)):
+        if head[i] != 0xFF or (head[i + 1] & 0xE0) != 0xE0:
+            continue
+        b1, b2, b3 = head[i + 1], head[i + 2], head[i + 3]
+        version_bits = (b1 >> 3) & 0x03
+        layer_bits = (b1 >> 1) & 0x03
+        bitrate_index = b2 >> 4
+        rate_index = (b2 >> 2) & 0x03
+        if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        sample_rate = MP3_SAMPLE_RATES[version_bits][rate_index]
+        channels = 1 if (b3 >> 6) == 3 else 2
+        codec = {1: "mp3", 2: "mp2", 3: "mp1"}[layer_bits]
+        if layer_bits != 1:
+            return _probe_result("mp3", codec, channels, sample_rate, None)
+        bitrate = MP3_BITRATES[1 if version_bits == 3 else 2][bitrate_index] * 1000
+        samples_per_frame = 1152 if version_bits == 3 else 576
+        # Require a second frame header where the first frame ends, so random
+        # bytes that happen to look like a sync word are not accepted
+        frame_length = samples_per_frame // 8 * bitrate // sample_rate + ((b2 >> 1) & 0x01)
+        next_frame = i + frame_length
+        if next_frame + 1 < len(head) and (head[next_frame] != 0xFF or (head[next_frame + 1] & 0xE0) != 0xE0):
+            continue
+        # A Xing/Info (or VBRI) header carries the exact frame count for VBR files
+        frame = head[i:i + 200]
+        for tag in (b"Xing", b"Info"):
+            pos = frame.find(tag)
+            if pos != -1 and len(frame) >= pos + 12:
+                flags = struct.unpack(">I", frame[pos + 4:pos + 8])[0]
+                if flags & 0x1:
+                    frames = struct.unpack(">I", frame[pos + 8:pos + 12])[0]
+                    return _probe_result("mp3", codec, channels, sample_rate, frames * samples_per_frame / sample_rate)
+        pos = frame.find(b"VBRI")
+        if pos != -1 and len(frame) >= pos + 18:
+            frames = struct.unpack(">I", frame[pos + 14:pos + 18])[0]
+            return _probe_result("mp3", codec, channels, sample_rate, frames * samples_per_frame / sample_rate)
+        audio_bytes = file_size - base - i
+        duration = audio_bytes * 8 / bitrate if bitrate else None
+        return _probe_result("mp3", codec, channels, sample_rate, duration)
+    return None
+
+
+def _parse_flac_streaminfo(block):
+    if len(block) < 18:
+        return None
+    packed = int.from_bytes(block[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x07) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    duration = total_samples / sample_rate if sample_rate and total_samples else None
+    return channels, sample_rate, duration
+
+
+def _sniff_flac(f, head, file_size):
+    offset = _id3v2_size(head)
+    if head[offset:offset + 4] != b"fLaC":
+        return None
+    block_header = head[offset + 4:offset + 8]
+    if len(block_header) < 4 or (block_header[0] & 0x7F) != 0:
+        return None
+    info = _parse_flac_streaminfo(head[offset + 8:offset + 8 + 34])
+    if info is None:
+        return None
+    return _probe_result("flac", "flac", *info)
+
+
+def _last_ogg_granule(f, file_size):
+    f.seek(max(0, file_size - TAIL_READ_BYTES))
+    tail = f.read(TAIL_READ_BYTES)
+    pos = tail.rfind(b"OggS")
+    if pos == -1 or len(tail) < pos + 14:
+        return None
+    return struct.unpack("<q", tail[pos + 6:pos + 14])[0]
+
+
+def _sniff_ogg(f, head, file_size):
+    if head[:4] != b"OggS" or len(head) < 27:
+        return None
+    segments = head[26]
+    packet = head[27 + segments:27 + segments + 64]
+    granule = _last_ogg_granule(f, file_size)
+    if packet[:8] == b"OpusHead" and len(packet) >= 16:
+        channels = packet[9]
+        pre_skip = struct.unpack("<H", packet[10:12])[0]
+        input_rate = struct.unpack("<I", packet[12:16])[0]
+        duration = (granule - pre_skip) / 48000 if granule and granule > 0 else None
+        return _probe_result("ogg", "opus", channels, input_rate or 48000, duration)
+    if packet[:7] == b"\x01vorbis" and len(packet) >= 16:
+        channels = packet[11]
+        sample_rate = struct.unpack("<I", packet[12:16])[0]
+        duration = granule / sample_rate if granule and granule > 0 and sample_rate else None
+        return _probe_result("ogg", "vorbis", channels, sample_rate, duration)
+    if packet[:5] == b"\x7fFLAC" and len(packet) >= 13 + 34:
+        info = _parse_flac_streaminfo(packet[17:17 + 34])
+        if info is None:
+            return None
+        return _probe_result("ogg", "flac", *info)
+    return None
+
+
+def _iter_boxes(data, start=0, end=None):
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+        header = 8
+        if size == 1 and offset + 16 <= end:
+            size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _find_box(data, path, start=0, end=None):
+    for box_type, body_start, body_end in _iter_boxes(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return body_start, body_end
+            return _find_box(data, path[1:], body_start, body_end)
+    return None
+
+
+def _read_mp4_moov(f, file_size):
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(16)
+        if len(header) < 8:
+            return None
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1 and len(header) == 16:
+            size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size:
+            return None
+        if box_type == b"moov":
+            if size > MAX_MP4_MOOV_BYTES:
+                return None
+            f.seek(offset)
+            return f.read(size)
+        offset += size
+    return None
+
+
+def _sniff_mp4(f, head, file_size):
+    if head[4:8] != b"ftyp":
+        return None
+    moov = _read_mp4_moov(f, file_size)
+    if moov is None:
+        return None
+    has_video = False
+    audio = None
+    for box_type, start, end in _iter_boxes(moov, 8):
+        if box_type != b"trak":
+            continue
+        hdlr = _find_box(moov, [b"mdia", b"hdlr"], start, end)
+        if hdlr is None:
+            continue
+        handler = moov[hdlr[0] + 8:hdlr[0] + 12]
+        if handler == b"vide":
+            has_video = True
+        if handler != b"soun" or audio is not None:
+            continue
+        mdhd = _find_box(moov, [b"mdia", b"mdhd"], start, end)
+        stsd = _find_box(moov, [b"mdia", b"minf", b"stbl", b"stsd"], start, end)
+        if mdhd is None or stsd is None:
+            continue
+        version = moov[mdhd[0]]
+        if version == 1:
+            timescale, duration = struct.unpack(">IQ", moov[mdhd[0] + 20:mdhd[0] + 32])
+        else:
+            timescale, duration = struct.unpack(">II", moov[mdhd[0] + 12:mdhd[0] + 20])
+        entry = stsd[0] + 8
+        entry_type = moov[entry + 4:entry + 8]
+        channels = struct.unpack(">H", moov[entry + 24:entry + 26])[0]
+        sample_rate = struct.unpack(">I", moov[entry + 32:entry + 36])[0] >> 16
+        audio = (MP4_CODECS.get(entry_type, entry_type.decode("latin-1").strip()), channels, sample_rate,
+                 duration / timescale if timescale else None)
+    if audio is None:
+        return None
+    return _probe_result("mp4" if has_video else "m4a", *audio)
+
+
+SNIFFERS = [_sniff_wav, _sniff_flac, _sniff_ogg, _sniff_mp4, _sniff_mp3]
+
+
+def sniff_audio_header(audio_file_path: str) -> Optional[dict]:
+    """
+    Identifies WAV, MP3, FLAC, Ogg (Opus/Vorbis/FLAC) and MP4/M4A files from
+    their headers. Returns format, codec, channels, sample rate and duration,
+    or None when the container is not recognized.
+    """
+    file_size = os.path.getsize(audio_file_path)
+    with open(audio_file_path, "rb") as f:
+        head = f.read(HEADER_READ_BYTES)
+        for sniffer in SNIFFERS:
+            try:
+                result = sniffer(f, head, file_size)
+            except (struct.error, IndexError, KeyError, ZeroDivisionError):
+                result = None
+            if result is not None:
+                return result
+    return None
+
+
+def ffprobe_audio(audio_file_path: str) -> dict:
+    """
+    Probes an audio file with ffprobe. Raises subprocess.CalledProcessError if
+    ffprobe cannot read the file.
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name,channels,sample_rate:format=format_name,duration",
+        "-of", "default=noprint_wrappers=1",
+        audio_file_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    fields = dict(line.split("=", 1) for line in result.stdout.strip().split("\n") if "=" in line)
+
+    def number(key, cast):
+        try:
+            return cast(fields[key])
+        except (KeyError, ValueError):
+            return None
+
+    return _probe_result(
+        fields.get("format_name"),
+        fields.get("codec_name"),
+        number("channels", int),
+        number("sample_rate", int),
+        number("duration", float),
+        source="ffprobe",
+    )
+
+
+def content_key(audio_file_path: str) -> str:
+    """
+    Cheap content hash for the probe cache: file size plus the head and tail
+    bytes, which hold everything the sniffers read.
+    """
+    file_size = os.path.getsize(audio_file_path)
+    digest = hashlib.sha256(str(file_size).encode())
+    with open(audio_file_path, "rb") as f:
+        digest.update(f.read(HEADER_READ_BYTES))
+        if file_size > HEADER_READ_BYTES:
+            f.seek(max(HEADER_READ_BYTES, file_size - TAIL_READ_BYTES))
+            digest.update(f.read(TAIL_READ_BYTES))
+    return digest.hexdigest()
+
+
+def probe_audio(audio_file_path: str) -> Optional[dict]:
+    """
+    Returns stream information for an audio file, using the header sniffers
+    first and ffprobe only when they cannot tell. Results are cached by
+    content hash, and each caller gets its own copy. Returns None if neither
+    can read the file.
+    """
+    key = content_key(audio_file_path)
+    with _PROBE_CACHE_LOCK:
+        if key in _PROBE_CACHE:
+            _PROBE_CACHE.move_to_end(key)
+            return dict(_PROBE_CACHE[key])
+
+    info = sniff_audio_header(audio_file_path)
+    if info is None:
+        try:
+            info = ffprobe_audio(audio_file_path)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+
+    with _PROBE_CACHE_LOCK:
+        _PROBE_CACHE[key] = info
+        _PROBE_CACHE.move_to_end(key)
+        if len(_PROBE_CACHE) > PROBE_CACHE_SIZE:
+            _PROBE_CACHE.popitem(last=False)
+    return dict(info)
+
+
+def probe_audio_files(paths, max_workers: int = 8) -> dict:
+    """
+    Probes many files concurrently. Returns a mapping of path to probe result.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(paths, executor.map(probe_audio, paths)))
@@ -0,0 +1,201 @@
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Deterministic parsing of spoken multiple-choice and true/false questions.
+# A question stem is followed by option sentences ("A, 21." "B) 29 and C) 33."
+# "Option 1 is ...", "and the final one, 51"), possibly spread over several
+# sentences, and often by a re-prompt ("Which one is the answer?"). Questions
+# the parser resolves become {question, options, type} objects without an
+# LLM call; everything else is left to the LLM.
+SPEAKER_LABEL = re.compile(r"^\s*\[[^\]]*\]:?\s*")
+EDGE_PUNCTUATION = " \t,;:.-"
+# "A." "B)" "C," "(d)" "d)" - a bare lower-case letter is too often an article
+LETTER_LABEL = re.compile(
+    r"(?:^|(?<=[\s,;]))(?:(?:and|or|then|option|choice)\s+)*"
+    r"(?:\(([A-Ea-e])\)|([A-E])[.,):]|([a-e])\))\s*"
+)
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5}
+NUMBER_LABEL = re.compile(
+    r"(?:^|(?<=[\s,;]))(?:(?:and|or|then)\s+)*"
+    r"(?:(?:option|choice|number)\s+(\d|one|two|three|four|five)\b(?:\s+is\b)?[.,):]?|\(?(\d)[.)])\s*",
+    re.IGNORECASE,
+)
+FINAL_OPTION = re.compile(r"^(?:(?:and|then)\s+)*(?:the\s+)?(?:final|last)\s+(?:one|option|choice)(?:\s+is)?[\s,:]*", re.IGNORECASE)
+NUMERIC_VALUE = re.compile(r"^-?\d+(?:[.,]\d+)?%?$")
+TRUE_FALSE = re.compile(r"\btrue\s+or\s+false\b", re.IGNORECASE)
+BARE_TRUE_FALSE = re.compile(r"^true\s+or\s+false\W*$", re.IGNORECASE)
+# Re-prompts after the options that add nothing to the question
+FOLLOWUP = re.compile(
+    r"^(?:so\s+|and\s+|now\s+)*(?:(?:which|what)\s+(?:one|option|choice|letter|answer)\b"
+    r"|(?:which|what)\s+is\s+(?:it|the\s+(?:right|correct)\s+(?:one|answer|option))\b)",
+    re.IGNORECASE,
+)
+TRAILING_CONJUNCTION = re.compile(r"[\s,;]+(?:and|or)$", re.IGNORECASE)
+MAX_OPTION_WORDS = 12
+MAX_FINAL_OPTION_WORDS = 4
+
+
+def clean_sentence(sentence: str) -> str:
+    """Drops the speaker label and stray punctuation left by filler removal."""
+    return SPEAKER_LABEL.sub("", sentence).strip(EDGE_PUNCTUATION)
+
+
+def _option_value(text: str) -> str:
+    return TRAILING_CONJUNCTION.sub("", text.strip(EDGE_PUNCTUATION)).strip(EDGE_PUNCTUATION)
+
+
+def _labelled_options(text: str, pattern: re.Pattern, label_of: Callable[[re.Match], str],
+                      expected: List[str]) -> List[Tuple[str, str]]:
+    """
+    (label, value) pairs of a sentence made only of consecutive labelled
+    options whose labels continue `expected`.
+    """
+    matches = list(pattern.finditer(text))
+    if not matches or matches[0].start() != 0:
+        return []
+    options = []
+    for i, match in enumerate(matches):
+        if i >= len(expected) or label_of(match) != expected[i]:
+            return []
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        value = _option_value(text[match.end():end])
+        if not value or len(value.split()) > MAX_OPTION_WORDS:
+            return []
+        options.append((label_of(match), value))
+    return options
+
+
+def _letter(match: re.Match) -> str:
+    return next(group for group in match.groups() if group).upper()
+
+
+def _number(match: re.Match) -> str:
+    word = (match.group(1) or match.group(2)).lower()
+    return str(NUMBER_WORDS.get(word, word))
+
+
+def parse_options(sentence: str, style: Optional[str] = None, count: int = 0) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """
+    Parses the options in one sentence, continuing a list of `count`
+    options of `style` ("letter" or "number"; None for a new list).
+    Returns (style, [(label, value), ...]), with no options if the sentence
+    is not a continuation of the list.
+    """
+    text = clean_sentence(sentence)
+    if not text or text.endswith("?"):
+        return style, []
+    if style in (None, "letter"):
+        expected = [chr(ord("A") + count + i) for i in range(5 - count)]
+        options = _labelled_options(text, LETTER_LABEL, _letter, expected)
+        if options:
+            return "letter", options
+    if style in (None, "number"):
+        expected = [str(count + 1 + i) for i in range(9)]
+        options = _labelled_options(text, NUMBER_LABEL, _number, expected)
+        if options:
+            return "number", options
+    if style is not None and count >= 2:
+        # An unlabelled last option: "and the final one, 51" or a bare "51"
+        final = FINAL_OPTION.match(text)
+        value = _option_value(text[final.end():] if final else text)
+        if value and (NUMERIC_VALUE.match(value) or (final and len(value.split()) <= MAX_FINAL_OPTION_WORDS)):
+            label = chr(ord("A") + count) if style == "letter" else str(count + 1)
+            return style, [(label, value)]
+    return style, []
+
+
+def is_true_false(sentence: str) -> bool:
+    return bool(TRUE_FALSE.search(sentence))
+
+
+def is_choice_followup(sentence: str) -> bool:
+    """True for re-prompts such as "So, which one is the answer?"."""
+    return bool(FOLLOWUP.match(clean_sentence(sentence)))
+
+
+def new_fragment(stem: str) -> Dict:
+    """A question fragment, with the options already listed in the stem sentence after its "?"."""
+    fragment = {"text": stem, "stem": clean_sentence(stem), "style": None, "options": []}
+    question, mark, rest = fragment["stem"].partition("?")
+    if mark and rest.strip():
+        style, options = parse_options(rest.rstrip("?"))
+        if options:
+            fragment.update(stem=question + mark, style=style, options=options)
+    return fragment
+
+
+def add_sentence(fragment: Dict, sentence: str) -> bool:
+    """
+    Adds a sentence following a question stem to the fragment if it belongs
+    to it: options, a re-prompt after the options, or the statement after a
+    bare "True or false?". Returns False if the question has ended.
+    """
+    style, options = parse_options(sentence, fragment["style"], len(fragment["options"]))
+    if options:
+        fragment["style"] = style
+        fragment["options"].extend(options)
+        fragment["text"] += " " + sentence
+        return True
+    if fragment["options"] and is_choice_followup(sentence):
+        fragment["text"] += " " + sentence
+        return True
+    if BARE_TRUE_FALSE.match(fragment["stem"]) and clean_sentence(sentence):
+        fragment["stem"] = f"{fragment['stem'].rstrip('?.:, ')}: {clean_sentence(sentence)}"
+        fragment["text"] += " " + sentence
+        return True
+    return False
+
+
+def choice_question(fragment: Dict, qid: str = "1") -> Optional[Dict]:
+    """
+    The structured question for a fragment, or None if it is neither a
+    multiple-choice question with at least two options nor a true/false
+    question.
+    """
+    stem = fragment["stem"]
+    if len(fragment["options"]) >= 2:
+        options = [f"{label}) {value}" for label, value in fragment["options"]]
+        listed = ", ".join(options[:-1]) + (", or " if len(options) > 2 else " or ") + options[-1]
+        return {"id": qid, "question": f"{stem.rstrip('?.:, ')}: {listed}?", "options": options, "type": "multiple_choice"}
+    if is_true_false(stem) and not BARE_TRUE_FALSE.match(stem):
+        question = stem if stem.endswith("?") else stem.rstrip(".:, ") + "?"
+        return {"id": qid, "question": question, "options": ["True", "False"], "type": "true_false"}
+    return None
+
+
+def iter_question_fragments(sentences: Iterable[str], is_question: Callable[[str], bool]) -> Iterator[Tuple[str, object]]:
+    """
+    Groups a stream of sentences into ("context", sentence) and ("question",
+    fragment) items. A question starts at a sentence `is_question` accepts,
+    at a true/false prompt, or at a sentence that lists options or comes
+    just before an option list the classifier missed; it takes in the option sentences that follow.
+    Each sentence is held back by at most one sentence.
+    """
+    held = None
+    pending = None
+    for sentence in sentences:
+        if pending is not None:
+            if add_sentence(pending, sentence):
+                continue
+            yield "question", pending
+            pending = None
+        if held is not None:
+            style, options = parse_options(sentence)
+            if options:
+                pending = new_fragment(held)
+                pending["style"] = style
+                pending["options"].extend(options)
+                pending["text"] += " " + sentence
+                held = None
+                continue
+            yield "context", held
+            held = None
+        fragment = new_fragment(sentence)
+        if fragment["options"] or is_question(sentence) or is_true_false(sentence):
+            pending = fragment
+        else:
+            held = sentence
+    if pending is not None:
+        yield "question", pending
+    if held is not None:
+        yield "context", held
@@ -0,0 +1,161 @@
+import json
+import re
+from typing import Any, Optional
+
+# Tolerant parsing of LLM JSON output. Syntax slips that leave the content
+# intact are repaired locally: markdown fences and prose around the value,
+# single-quoted strings, Python literals, unquoted keys, trailing commas and
+# raw newlines inside strings. Missing content is never invented: a
+# truncated or incomplete value is reported as failed, so the caller can
+# re-ask for just that item.
+FENCE = re.compile(r"```(?:json|JSON)?")
+LITERALS = {"True": "true", "False": "false", "None": "null", "true": "true", "false": "false", "null": "null"}
+NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+WORD = re.compile(r"[A-Za-z_][\w-]*")
+# An array of objects (or an empty one), as opposed to a bracket in prose
+ARRAY_START = re.compile(r"\[\s*[{\]]")
+SCHEMA_TYPES = {
+    "OBJECT": dict, "ARRAY": list, "STRING": str, "BOOLEAN": bool,
+    "INTEGER": int, "NUMBER": (int, float),
+}
+
+
+def _start(text: str, expected: Optional[type] = None) -> int:
+    """
+    Index of the first '[' or '{', preferring the expected one. An expected
+    list starts at the first '[' followed by '{' or ']' if there is one.
+    """
+    if expected is list:
+        match = ARRAY_START.search(text)
+        if match:
+            return match.start()
+    preferred = {list: "[", dict: "{"}.get(expected)
+    if preferred and preferred in text:
+        return text.index(preferred)
+    positions = [i for i in (text.find(c) for c in "[{") if i >= 0]
+    if not positions:
+        raise ValueError("No JSON value found in LLM output")
+    return min(positions)
+
+
+def repair_json(text: str, expected: Optional[type] = None) -> str:
+    """
+    Rewrites the first JSON value in `text` as strict JSON. Raises
+    ValueError if the value is truncated or cannot be repaired.
+    """
+    text = FENCE.sub("", text)
+    i = _start(text, expected)
+    out = []
+    stack = []
+    while i < len(text):
+        char = text[i]
+        if char in "\"'":
+            # Re-emit the string double-quoted with control characters escaped
+            quote = char
+            chars = []
+            i += 1
+            while i < len(text) and text[i] != quote:
+                c = text[i]
+                if c == "\\" and i + 1 < len(text):
+                    nxt = text[i + 1]
+                    chars.append("'" if nxt == "'" else c + nxt)
+                    i += 2
+                    continue
+                chars.append({'"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"}.get(c, c))
+                i += 1
+            if i >= len(text):
+                raise ValueError("Unterminated string in LLM output")
+            out.append('"' + "".join(chars) + '"')
+            i += 1
+            continue
+        if char in "[{":
+            stack.append("]" if char == "[" else "}")
+            out.append(char)
+        elif char in "]}":
+            if not stack:
+                raise ValueError("Unbalanced brackets in LLM output")
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            out.append(stack.pop())
+            if not stack:
+                return "".join(out)
+        elif char == "-" or char.isdigit() or char == ".":
+            match = NUMBER.match(text, i)
+            if not match:
+                raise ValueError(f"Invalid number in LLM output at {i}")
+            out.append(match.group())
+            i = match.end()
+            continue
+        elif char.isalpha() or char == "_":
+            word = WORD.match(text, i).group()
+            rest = text[i + len(word):].lstrip()
+            if rest.startswith(":"):
+                out.append(json.dumps(word))
+            elif word in LITERALS:
+                out.append(LITERALS[word])
+            else:
+                raise ValueError(f"Unexpected word in LLM output: {word}")
+            i += len(word)
+            continue
+        elif char == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = len(text) if end < 0 else end
+            continue
+        else:
+            out.append(char)
+        i += 1
+    raise ValueError("Truncated JSON in LLM output")
+
+
+def loads_tolerant(text: str, expected: Optional[type] = None) -> Any:
+    """
+    Parses the JSON value in LLM output, repairing it if needed. A single
+    object where a list was expected is wrapped, and a one-element list
+    where an object was expected is unwrapped. Raises ValueError otherwise.
+    """
+    try:
+        start = _start(text, expected)
+        value, _ = json.JSONDecoder().raw_decode(text, start)
+    except json.JSONDecodeError:
+        value = json.loads(repair_json(text, expected))
+    if expected is list and isinstance(value, dict):
+        value = [value]
+    elif expected is dict and isinstance(value, list) and len(value) == 1 and isinstance(value[0], dict):
+        value = value[0]
+    if expected is not None and not isinstance(value, expected):
+        raise ValueError(f"Expected a JSON {expected.__name__}, got {type(value).__name__}")
+    return value
+
+
+def matches_schema(value: Any, schema: dict) -> bool:
+    """
+    Checks a value against the subset of OpenAPI schemas used for
+    constrained generation: type, properties, required and items.
+    """
+    expected = SCHEMA_TYPES.get(str(schema.get("type", "")).upper())
+    if expected is not None and (not isinstance(value, expected) or (expected is not bool and isinstance(value, bool))):
+        return False
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value or value[key] in (None, ""):
+                return False
+        return all(matches_schema(value[key], sub) for key, sub in schema.get("properties", {}).items() if key in value)
+    if isinstance(value, list) and "items" in schema:
+        return all(matches_schema(item, schema["items"]) for item in value)
+    return True
+
+
+def extract_string_field(text: str, name: str) -> Optional[str]:
+    """The value of a string field in malformed or truncated JSON text, if it is complete."""
+    match = re.search(r"[\"']?%s[\"']?\s*:\s*([\"'])((?:(?!\1)[^\\]|\\.)*)\1" % re.escape(name), text)
+    if match is None:
+        return None
+    quote, value = match.groups()
+    if quote == "'":
+        value = value.replace("\\'", "'").replace('"', '\\"')
+    try:
+        return json.loads('"' + value + '"')
+    except json.JSONDecodeError:
+        return value
@@ -0,0 +1,126 @@
+import json
+import time
+from typing import Iterable, Iterator, List, Optional
+from tools.json_repair import loads_tolerant
+
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser for a JSON array arriving in text chunks, such as
+    streamed LLM output. Each top-level element is returned as soon as its
+    closing brace or bracket arrives. Text before the array (prose,
+    markdown fences) is skipped; the array starts at the first '[' that is
+    followed by '{' or ']', so brackets in prose are not taken for it.
+    Malformed elements are repaired with `loads_tolerant` where possible;
+    the raw text of the rest is appended to `failed`.
+    """
+
+    def __init__(self, failed: Optional[list] = None):
+        self.started = False
+        # A '[' was seen and the next non-space character decides if it opens the array
+        self.opening = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.quote = '"'
+        self.escaped = False
+        self.item = []
+        self.failed = failed
+
+    def feed(self, chunk: str) -> List:
+        """Consumes a chunk and returns the elements completed by it."""
+        items = []
+        for char in chunk:
+            if self.finished:
+                break
+            if not self.started:
+                if self.opening and char.isspace():
+                    continue
+                if not (self.opening and char in "{]"):
+                    self.opening = char == "["
+                    continue
+                self.started = True
+                self.depth = 1
+            if self.in_string:
+                self.item.append(char)
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == self.quote:
+                    self.in_string = False
+                continue
+            if char in "\"'":
+                # Single-quoted strings are repaired when the element is parsed
+                self.in_string = True
+                self.quote = char
+            elif char in "[{":
+                self.depth += 1
+            elif char in "]}":
+                self.depth -= 1
+                if self.depth == 0:
+                    # End of the array; a trailing scalar element is still pending
+                    self.finished = True
+                    items.extend(self._flush())
+                    break
+            elif char == "," and self.depth == 1:
+                items.extend(self._flush())
+                continue
+            self.item.append(char)
+            if self.depth == 1 and char in "]}":
+                items.extend(self._flush())
+        return items
+
+    def _flush(self) -> List:
+        text = "".join(self.item).strip()
+        self.item = []
+        if not text:
+            return []
+        try:
+            return [json.loads(text)]
+        except json.JSONDecodeError:
+            pass
+        try:
+            return [loads_tolerant(text)]
+        except ValueError:
+            # Skip a malformed element instead of losing the rest of the array
+            print(f"Skipping malformed JSON element in LLM output: {text[:80]}")
+            if self.failed is not None:
+                self.failed.append(text)
+            return []
+
+    def close(self) -> List:
+        """
+        Ends the input. An element cut off by the end of the output is
+        reported as failed rather than guessed at.
+        """
+        text = "".join(self.item).strip()
+        self.item = []
+        if self.started and not self.finished and text:
+            print(f"LLM output ended inside a JSON element: {text[:80]}")
+            if self.failed is not None:
+                self.failed.append(text)
+        return []
+
+
+def iter_json_array_items(chunks: Iterable[str], metrics: Optional[dict] = None, raw: Optional[list] = None,
+                          failed: Optional[list] = None) -> Iterator:
+    """
+    Yields the elements of a streamed JSON array as they complete. If given,
+    `metrics` receives "time_to_first_item" and "time_to_last_chunk" in
+    seconds, `raw` collects the chunks so callers can fall back to the
+    full text when no array was found, and `failed` collects the text of
+    elements that could not be parsed or repaired.
+    """
+    parser = JSONArrayStreamParser(failed)
+    start = time.perf_counter()
+    for chunk in chunks:
+        if raw is not None:
+            raw.append(chunk)
+        for item in parser.feed(chunk):
+            if metrics is not None and "time_to_first_item" not in metrics:
+                metrics["time_to_first_item"] = time.perf_counter() - start
+            yield item
+    parser.close()
+    if metrics is not None:
+        metrics["time_to_last_chunk"] = time.perf_counter() - start
@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Allow running as a script from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from tools.audio_enhancer import iter_pcm_blocks
+from orchestration.live import LIVE_SAMPLE_RATE, LATENCY_TARGET_SECONDS
+
+# Replays a recorded lecture into live mode at real-time speed and reports the
+# end-to-end latency from the end of each spoken question to its answer.
+CHUNK_SECONDS = 0.25
+
+
+def iter_paced_chunks(audio_path: str, chunk_seconds: float = CHUNK_SECONDS, speed: float = 1.0):
+    """
+    Yields s16le PCM chunks no faster than they would be spoken, scaled by
+    `speed`.
+    """
+    start = time.perf_counter()
+    sent_seconds = 0.0
+    for block in iter_pcm_blocks(audio_path, LIVE_SAMPLE_RATE, chunk_seconds):
+        delay = start + sent_seconds / speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield (np.clip(block, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        sent_seconds += len(block) / LIVE_SAMPLE_RATE
+
+
+def print_event(event: dict):
+    if event["type"] == "answer":
+        flag = "" if event["within_target"] else "  (over target)"
+        print(f"[{event['latency']:.2f}s] Q{event['id']}: {event['question']}\n        A: {event['answer']}{flag}")
+    elif event["type"] == "question":
+        print(f"  question at {event['end']:.1f}s: {event['question']}")
+    elif event["type"] == "error":
+        print(f"  answer {event['id']} failed: {event['error']}")
+
+
+def replay_in_process(audio_path: str, language: str, speed: float, latency_target: float) -> dict:
+    from orchestration.live import LiveSession
+    session = LiveSession(print_event, language=language, latency_target=latency_target)
+    for chunk in iter_paced_chunks(audio_path, speed=speed):
+        session.feed(chunk)
+    return session.close()
+
+
+async def replay_over_websocket(audio_path: str, url: str, speed: float) -> dict:
+    import websockets
+
+    async with websockets.connect(url, max_size=None) as websocket:
+        async def send_audio():
+            loop = asyncio.get_running_loop()
+            chunks = iter_paced_chunks(audio_path, speed=speed)
+            while True:
+                # Pacing sleeps run off the event loop so events keep flowing
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                await websocket.send(chunk)
+            await websocket.send("end")
+
+        sender = asyncio.create_task(send_audio())
+        summary = None
+        async for message in websocket:
+            event = json.loads(message)
+            if event["type"] == "summary":
+                summary = event
+                break
+            print_event(event)
+        await sender
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded lecture through live mode at real-time speed.")
+    parser.add_argument("audio_file", help="Recorded lecture to replay.")
+    parser.add_argument("--url", help="WebSocket URL of a running backend, e.g. ws://localhost:8000/api/live?language=en. Runs in-process if omitted.")
+    parser.add_argument("--language", default="en", help="Language of the lecture.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed relative to real time.")
+    parser.add_argument("--latency-target", type=float, default=LATENCY_TARGET_SECONDS, help="End-to-end latency target in seconds.")
+    args = parser.parse_args()
+
+    if args.url:
+        summary = asyncio.run(replay_over_websocket(args.audio_file, args.url, args.speed))
+    else:
+        summary = replay_in_process(args.audio_file, args.language, args.speed, args.latency_target)
+    print(json.dumps(summary, indent=4))
+    if summary and summary["answers"] and summary["latency_p95"] > summary["latency_target"]:
+        print(f"p95 latency {summary['latency_p95']:.2f}s is over the {summary['latency_target']:.1f}s target.")
+        sys.exit(1)
@@ -1,27 +1,128 @@
 import os
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
 import google.generativeai as genai
 from dotenv import load_dotenv
+from tools.llm_quota import get_governor, is_rate_limit_error
+from tools.json_repair import loads_tolerant, matches_schema
+from utils.exceptions import QuotaExceededError
 
 load_dotenv()
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-def invoke_llm(prompt_path: str, llm_input: dict) -> str:
+# Re-asks of a prompt whose JSON output could not be parsed or repaired
+JSON_REASKS = 1
+
+def generation_config(response_schema: Optional[dict] = None):
     """
-    Invokes the Gemini API with a prompt and input.
+    Generation settings; with a schema, the model is asked for JSON output
+    constrained to it. SDK versions without schema support get JSON mode
+    only, or plain text.
     """
-    print(f"Invoking LLM with prompt: {prompt_path}")
+    if response_schema is None:
+        return genai.types.GenerationConfig(temperature=0.2)
+    try:
+        return genai.types.GenerationConfig(temperature=0.2, response_mime_type="application/json",
+                                            response_schema=response_schema)
+    except TypeError:
+        pass
+    try:
+        return genai.types.GenerationConfig(temperature=0.2, response_mime_type="application/json")
+    except TypeError:
+        return genai.types.GenerationConfig(temperature=0.2)
+
+def render_prompt(prompt_path: str, llm_input: dict) -> str:
     with open(prompt_path, "r", encoding="utf-8") as f:
         prompt_template = f.read()
-    
-    prompt = prompt_template.format(**llm_input)
+    return prompt_template.format(**llm_input)
+
+def invoke_llm(prompt_path: str, llm_input: dict, response_schema: Optional[dict] = None) -> str:
+    """
+    Invokes the Gemini API with a prompt and input, optionally constraining
+    the output to a JSON schema.
+    """
+    print(f"Invoking LLM with prompt: {prompt_path}")
+    prompt = render_prompt(prompt_path, llm_input)
     
     try:
         model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(
+        response = get_governor().call(
+            model.generate_content,
             prompt,
-            generation_config=genai.types.GenerationConfig(temperature=0.2)
+            generation_config=generation_config(response_schema)
         )
         return response.text
+    except QuotaExceededError:
+        # Let the job be requeued rather than continue with empty output
+        raise
     except Exception as e:
         print(f"Error invoking LLM: {e}")
         return "[]"
+
+def invoke_llm_json(prompt_path: str, llm_input: dict, response_schema: dict,
+                    reasks: int = JSON_REASKS) -> Tuple[Optional[Any], str]:
+    """
+    Schema-constrained `invoke_llm` whose output is parsed with local
+    repair. Only if the output still cannot be parsed, or does not match
+    the schema, is the same prompt asked again, up to `reasks` times.
+    Returns (value or None, last raw output).
+    """
+    expected = list if str(response_schema.get("type")).upper() == "ARRAY" else dict
+    output = ""
+    for attempt in range(reasks + 1):
+        output = invoke_llm(prompt_path, llm_input, response_schema)
+        try:
+            value = loads_tolerant(output, expected)
+            if matches_schema(value, response_schema):
+                return value, output
+        except ValueError:
+            pass
+        print(f"Unusable JSON from {prompt_path} (attempt {attempt+1}/{reasks+1}).")
+    return None, output
+
+def gemini_stream(prompt: str, response_schema: Optional[dict] = None) -> Iterator[str]:
+    """Streams the text of a Gemini response chunk by chunk."""
+    model = genai.GenerativeModel('gemini-1.5-flash')
+    response = get_governor().call(
+        model.generate_content,
+        prompt,
+        generation_config=generation_config(response_schema),
+        stream=True
+    )
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # A chunk without text parts (e.g. only finish metadata)
+            continue
+        if text:
+            yield text
+
+def invoke_llm_stream(prompt_path: str, llm_input: dict, stream_fn: Optional[Callable[[str], Iterable[str]]] = None,
+                      response_schema: Optional[dict] = None, status: Optional[dict] = None) -> Iterator[str]:
+    """
+    Streaming form of `invoke_llm`: yields response text as it is generated.
+    `stream_fn(prompt)` replaces the Gemini call, e.g. with a local stand-in.
+    Quota errors are raised; a rate-limit error that arrives mid-stream trips
+    the shared circuit breaker and is raised as QuotaExceededError. Other errors end the stream
+    early and set status["truncated"], so the caller can re-ask for the
+    rest of the output.
+    """
+    print(f"Invoking streaming LLM with prompt: {prompt_path}")
+    prompt = render_prompt(prompt_path, llm_input)
+    try:
+        if stream_fn is not None:
+            yield from stream_fn(prompt)
+        else:
+            yield from gemini_stream(prompt, response_schema)
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        if is_rate_limit_error(e):
+            # Only the opening call goes through the governor's retries; the
+            # job is requeued instead of re-running with a partial answer
+            cooldown = get_governor().record_rate_limited()
+            raise QuotaExceededError(f"LLM rate limited mid-stream; retry in {cooldown:.0f}s.",
+                                     retry_after=cooldown) from e
+        print(f"Error invoking LLM, output truncated: {e}")
+        if status is not None:
+            status["truncated"] = True
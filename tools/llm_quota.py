@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from utils.exceptions import QuotaExceededError
+
+# Token bucket shared by every pipeline process and backend worker. The
+# bucket and circuit-breaker state live in one SQLite row; `BEGIN IMMEDIATE`
+# takes the database write lock, so refill-and-take is atomic across processes.
+QUOTA_DB_PATH = os.getenv("LLM_QUOTA_DB", os.path.join("cache", "llm_quota.sqlite"))
+REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "15"))
+BURST = float(os.getenv("LLM_BURST", "5"))
+# How long a call may pause for quota before the job is handed back for requeueing
+MAX_WAIT_SECONDS = float(os.getenv("LLM_MAX_WAIT_SECONDS", "120"))
+# Circuit breaker: cooldown after a rate-limit response, doubled per consecutive one
+BREAKER_BASE_SECONDS = 10.0
+BREAKER_MAX_SECONDS = 600.0
+
+_GOVERNOR = None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    True for quota and rate-limit errors from the Gemini client (HTTP 429 /
+    RESOURCE_EXHAUSTED), falling back to the message for other wrappers.
+    """
+    try:
+        from google.api_core import exceptions as google_exceptions
+        if isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+            return True
+    except ImportError:
+        pass
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return any(s in message for s in ("quota", "rate limit", "resource_exhausted", "429"))
+
+
+class QuotaGovernor:
+    """
+    Cross-process LLM request budget: a token bucket refilled at
+    `requests_per_minute`, plus a circuit breaker that stops all callers for
+    a cooldown after the API answers with a rate-limit error.
+    """
+
+    def __init__(self, db_path: str = QUOTA_DB_PATH, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 burst: float = BURST, max_wait: float = MAX_WAIT_SECONDS, name: str = "gemini"):
+        self.db_path = db_path
+        self.capacity = burst
+        self.refill_per_second = requests_per_minute / 60.0
+        self.max_wait = max_wait
+        self.name = name
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS quota ("
+                "name TEXT PRIMARY KEY, tokens REAL, updated REAL, failures INTEGER, "
+                "open_until REAL, waits INTEGER, wait_seconds REAL, calls INTEGER, rate_limited INTEGER)"
+            )
+            db.execute(
+                "INSERT OR IGNORE INTO quota VALUES (?, ?, ?, 0, 0, 0, 0, 0, 0)",
+                (self.name, self.capacity, time.time()),
+            )
+
+    @contextmanager
+    def _transaction(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        finally:
+            db.close()
+
+    def _row(self, db):
+        tokens, updated, failures, open_until = db.execute(
+            "SELECT tokens, updated, failures, open_until FROM quota WHERE name = ?", (self.name,)
+        ).fetchone()
+        now = time.time()
+        tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+        return now, tokens, failures, open_until
+
+    def _try_take(self, cost: float) -> float:
+        """Takes `cost` tokens if available. Returns 0, or the seconds to wait before retrying."""
+        with self._transaction() as db:
+            now, tokens, _, open_until = self._row(db)
+            if open_until > now:
+                wait = open_until - now
+            elif tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / self.refill_per_second
+            db.execute("UPDATE quota SET tokens = ?, updated = ? WHERE name = ?", (tokens, now, self.name))
+            return wait
+
+    def acquire(self, cost: float = 1.0, max_wait: Optional[float] = None) -> float:
+        """
+        Blocks until `cost` requests are available and returns the time spent
+        waiting. Raises QuotaExceededError instead of waiting longer than
+        `max_wait` seconds in total.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        waited = 0.0
+        while True:
+            wait = self._try_take(cost)
+            if wait <= 0:
+                if waited:
+                    with self._transaction() as db:
+                        db.execute("UPDATE quota SET waits = waits + 1, wait_seconds = wait_seconds + ? WHERE name = ?", (waited, self.name))
+                return waited
+            if waited + wait > max_wait:
+                raise QuotaExceededError(f"LLM quota exhausted; retry in {wait:.0f}s.", retry_after=wait)
+            time.sleep(wait)
+            waited += wait
+
+    def record_success(self):
+        with self._transaction() as db:
+            db.execute("UPDATE quota SET failures = 0, calls = calls + 1 WHERE name = ?", (self.name,))
+
+    def record_rate_limited(self, retry_after: Optional[float] = None) -> float:
+        """
+        Opens the circuit breaker after a rate-limit response: every process
+        stops calling until the cooldown passes. Returns the cooldown.
+        """
+        with self._transaction() as db:
+            now, _, failures, open_until = self._row(db)
+            cooldown = min(BREAKER_BASE_SECONDS * 2 ** failures, BREAKER_MAX_SECONDS)
+            if retry_after:
+                cooldown = max(cooldown, retry_after)
+            db.execute(
+                "UPDATE quota SET tokens = 0, updated = ?, failures = failures + 1, open_until = ?, "
+                "calls = calls + 1, rate_limited = rate_limited + 1 WHERE name = ?",
+                (now, max(open_until, now + cooldown), self.name),
+            )
+            return cooldown
+
+    def call(self, fn, *args, cost: float = 1.0, max_wait: Optional[float] = None, **kwargs):
+        """
+        Calls `fn` once the budget allows it. Rate-limit errors trip the
+        breaker and the call is retried after the cooldown; once the total
+        pause would exceed `max_wait`, QuotaExceededError is raised so the job
+        can be requeued instead of failing.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        start = time.monotonic()
+        while True:
+            self.acquire(cost, max_wait=max(max_wait - (time.monotonic() - start), 0))
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                cooldown = self.record_rate_limited()
+                print(f"LLM rate limited; pausing all workers for {cooldown:.0f}s.")
+                continue
+            self.record_success()
+            return result
+
+    def status(self) -> dict:
+        """Current budget, breaker state and wait statistics."""
+        with self._transaction() as db:
+            now, tokens, failures, open_until = self._row(db)
+            waits, wait_seconds, calls, rate_limited = db.execute(
+                "SELECT waits, wait_seconds, calls, rate_limited FROM quota WHERE name = ?", (self.name,)
+            ).fetchone()
+        breaker_open = open_until > now
+        if breaker_open:
+            retry_after = open_until - now
+        else:
+            retry_after = max(0.0, (1.0 - tokens) / self.refill_per_second)
+        return {
+            "name": self.name,
+            "tokens_available": round(tokens, 3),
+            "capacity": self.capacity,
+            "requests_per_minute": self.refill_per_second * 60,
+            "breaker_open": breaker_open,
+            "consecutive_rate_limits": failures,
+            "retry_after_seconds": round(retry_after, 3),
+            "calls": calls,
+            "rate_limited_calls": rate_limited,
+            "waits": waits,
+            "total_wait_seconds": round(wait_seconds, 3),
+        }
+
+
+def get_governor() -> QuotaGovernor:
+    """Returns the process-wide governor over the shared quota database."""
+    global _GOVERNOR
+    if _GOVERNOR is None:
+        _GOVERNOR = QuotaGovernor()
+    return _GOVERNOR
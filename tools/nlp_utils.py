@@ -1,5 +1,6 @@
 import re
 import google.generativeai as genai
+from tools.llm_quota import get_governor
 
 # Language-specific question words
 QUESTION_WORDS = {
@@ -15,7 +16,7 @@ def detect_language(text: str) -> str:
     Returns the language code (e.g., 'en', 'es').
     """
     model = genai.GenerativeModel('gemini-1.5-flash')
-    response = model.generate_content(f"Detect the language of the following text. Respond with only the two-letter ISO 639-1 language code. Text: {text}")
+    response = get_governor().call(model.generate_content, f"Detect the language of the following text. Respond with only the two-letter ISO 639-1 language code. Text: {text}")
     return response.text.strip().lower()
 
 def split_into_sentences(text: str) -> list[str]:
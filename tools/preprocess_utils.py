@@ -1,7 +1,13 @@
 import unicodedata
 import emoji
 import re
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
+from tools.math_utils import normalize_math_phrases
+
+MATH_SYMBOL_PATTERN = re.compile(r"[\u2200-\u22FF\u2190-\u21FF\u25A0-\u25FF\u2070-\u209F\u00B1\u2212\u00D7\u00F7\u03C0\u03A0\u03A3\u03B1-\u03C9]")
+FILLER_PATTERN = re.compile(r"\b(uh|um|like|and then|so|the final one|and|uh,)\b", re.IGNORECASE)
+# A chunk may end after sentence-final punctuation followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"[.?!]\s")
 
 def normalize_unicode(text: str) -> str:
     """Normalize unicode characters to NFC form."""
@@ -17,7 +23,7 @@ def annotate_emojis(text: str) -> str:
 
 def extract_math_symbols(text: str) -> List[str]:
     """Extract common math symbols from the text."""
-    math_symbols = re.findall(r"[\u2200-\u22FF\u2190-\u21FF\u25A0-\u25FF\u2070-\u209F\u00B1\u2212\u00D7\u00F7\u03C0\u03A0\u03A3\u03B1-\u03C9]", text)
+    math_symbols = MATH_SYMBOL_PATTERN.findall(text)
     return math_symbols
 
 def annotate_math_symbols(text: str) -> str:
@@ -25,7 +31,86 @@ def annotate_math_symbols(text: str) -> str:
     def repl(match):
         char = match.group(0)
         try:
-            return f"<{unicodedata.name(char)}>",
+            return f"<{unicodedata.name(char)}>"
         except ValueError:
             return char
-    return re.sub(r"[\u2200-\u22FF\u2190-\u21FF\u25A0-\u25FF\u2070-\u209F\u00B1\u2212\u00D7\u00F7\u03C0\u03A0\u03A3\u03B1-\u03C9]", repl, text)
+    return MATH_SYMBOL_PATTERN.sub(repl, text)
+
+def remove_filler_words(text: str) -> str:
+    """Remove filler words for cleaner processing."""
+    return FILLER_PATTERN.sub("", text)
+
+# --- Streaming pipeline ---
+# Each step consumes and yields sentence-sized chunks, so preprocessing can
+# start on the first transcript segments while later ones are still being
+# transcribed. Joining the output of `preprocess_stream(pieces, sep)` gives
+# the same text as `preprocess_transcript(sep.join(pieces))`.
+
+def iter_sentence_chunks(pieces: Iterable[str], separator: str = "\n") -> Iterator[str]:
+    """
+    Re-chunks text pieces (e.g. ASR segments) so every yielded chunk ends at a
+    sentence boundary. The pieces are joined with `separator`; an unfinished
+    sentence is held back until the next piece or the end of the stream.
+    """
+    buffer = ""
+    first = True
+    for piece in pieces:
+        buffer += piece if first else separator + piece
+        first = False
+        cut = None
+        for match in SENTENCE_BOUNDARY.finditer(buffer):
+            cut = match.end()
+        if cut is not None:
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    if buffer:
+        yield buffer
+
+def iter_normalized_unicode(chunks: Iterable[str]) -> Iterator[str]:
+    for chunk in chunks:
+        yield normalize_unicode(chunk)
+
+def iter_annotated_emojis(chunks: Iterable[str]) -> Iterator[str]:
+    for chunk in chunks:
+        yield annotate_emojis(chunk)
+
+def iter_annotated_math_symbols(chunks: Iterable[str]) -> Iterator[str]:
+    for chunk in chunks:
+        yield annotate_math_symbols(chunk)
+
+def iter_normalized_math_phrases(chunks: Iterable[str], flags: dict) -> Iterator[str]:
+    """Normalizes math phrases and sets flags["math_found"] once math is detected."""
+    for chunk in chunks:
+        chunk, math_found = normalize_math_phrases(chunk)
+        if math_found:
+            flags["math_found"] = True
+        yield chunk
+
+def iter_without_filler_words(chunks: Iterable[str]) -> Iterator[str]:
+    for chunk in chunks:
+        yield remove_filler_words(chunk)
+
+def preprocess_stream(pieces: Iterable[str], separator: str = "\n", flags: Optional[dict] = None) -> Iterator[str]:
+    """
+    Chains the preprocessing steps over a stream of transcript pieces and
+    yields cleaned, sentence-complete chunks. If given, `flags` receives
+    "math_found".
+    """
+    if flags is None:
+        flags = {}
+    flags.setdefault("math_found", False)
+    chunks = iter_sentence_chunks(pieces, separator)
+    chunks = iter_normalized_unicode(chunks)
+    chunks = iter_annotated_emojis(chunks)
+    chunks = iter_annotated_math_symbols(chunks)
+    chunks = iter_normalized_math_phrases(chunks, flags)
+    return iter_without_filler_words(chunks)
+
+def preprocess_transcript(text: str) -> Tuple[str, bool]:
+    """
+    Batch form of `preprocess_stream`. Returns the cleaned text and whether
+    math was detected.
+    """
+    flags = {}
+    cleaned = "".join(preprocess_stream([text], flags=flags))
+    return cleaned, flags["math_found"]
@@ -1,7 +1,121 @@
-from better_profanity import profanity
+import os
+import re
+import threading
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+
+# Profanity matching with one Aho-Corasick automaton over the whole word
+# list: a single pass over the text finds every listed word, instead of one
+# scan per word and variant. Leetspeak is handled by normalizing the text
+# ("sh1t", "$hit" -> "shit") rather than by expanding the word list. Only
+# tokens with at least one letter are normalized, so numbers such as "8008"
+# or "7!7" are never read as words.
+LEET_MAP = str.maketrans({
+    "0": "o", "1": "i", "!": "i", "3": "e", "4": "a", "@": "a",
+    "5": "s", "$": "s", "7": "t", "8": "b", "9": "g", "+": "t", "|": "l",
+})
+# Word list shipped with better_profanity, unless PROFANITY_WORDLIST points elsewhere
+WORDLIST_PATH = os.getenv("PROFANITY_WORDLIST")
+
+TOKEN_PATTERN = re.compile(r"\S+")
+
+_MATCHER = None
+_MATCHER_LOCK = threading.Lock()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lower-cases and undoes leetspeak substitutions in tokens that contain a
+    letter, keeping the length.
+    """
+    return TOKEN_PATTERN.sub(
+        lambda m: m.group().translate(LEET_MAP) if any(c.isalpha() for c in m.group()) else m.group(),
+        text.lower(),
+    )
+
+
+def load_wordlist(path: Optional[str] = WORDLIST_PATH) -> List[str]:
+    if path is None:
+        import better_profanity
+        path = os.path.join(os.path.dirname(better_profanity.__file__), "profanity_wordlist.txt")
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class ProfanityMatcher:
+    """
+    Aho-Corasick automaton over a word list. Matches are whole words of the
+    normalized text, like better_profanity.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for word in words:
+            self._add(normalize_text(word))
+        self._link()
+
+    def _add(self, word: str):
+        state = 0
+        for char in word:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state] += (len(word),)
+
+    def _link(self):
+        """Breadth-first fail links; each state also reports its suffixes' words."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] += self.output[self.fail[child]]
+                queue.append(child)
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int]]:
+        """
+        Yields (start, end) of each listed word found in `text`. Words are
+        matched in the normalized text, but word boundaries are checked in
+        the original, so "hell!" is not read as "helli".
+        """
+        normalized = normalize_text(text)
+        # A few characters change length when lower-cased (e.g. "İ")
+        original = text if len(text) == len(normalized) else normalized
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for i, char in enumerate(normalized):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length in output[state]:
+                start, end = i - length + 1, i + 1
+                if (start == 0 or not original[start - 1].isalnum()) and \
+                        (end == len(original) or not original[end].isalnum()):
+                    yield start, end
+
+    def contains(self, text: str) -> bool:
+        return next(iter(self.iter_matches(text)), None) is not None
+
+
+def get_matcher() -> ProfanityMatcher:
+    """Returns the process-wide matcher, compiling the word list on first use."""
+    global _MATCHER
+    with _MATCHER_LOCK:
+        if _MATCHER is None:
+            _MATCHER = ProfanityMatcher(load_wordlist())
+        return _MATCHER
+
 
 def contains_profanity(text: str) -> bool:
     """
     Checks if a text contains profanity.
     """
-    return profanity.contains_profanity(text)
\ No newline at end of file
+    return get_matcher().contains(text)
@@ -0,0 +1,194 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+from tools.token_utils import estimate_tokens
+
+# Default budget for a full-transcript prompt; passes that lose information
+# only run when the transcript is still over budget after the safe ones.
+PROMPT_TOKEN_BUDGET = 24000
+
+SPEAKER_TAG = re.compile(r"^\s*(\[[^\]]+\]):\s*")
+# "<grinning_face>" from annotate_emojis, "<GREEK SMALL LETTER PI>" from annotate_math_symbols
+UNICODE_ANNOTATION = re.compile(r"<([A-Z0-9\-]+(?: [A-Z0-9\-]+)*)>")
+EMOJI_ANNOTATION = re.compile(r"<[a-z0-9]+(?:_[a-z0-9&\-]+)*>")
+# Hesitations only; words like "so" or "like" can carry meaning and are kept
+FILLER = re.compile(r"\b(?:uh+|um+|erm+|hmm+|uh-huh|you know|i mean)\b,?", re.IGNORECASE)
+SENTENCE_SPLIT = re.compile(r"(?<=[.?!])\s+")
+WORD = re.compile(r"\w+")
+# Back-to-back repeats of up to this many words ("what is, what is the")
+MAX_REPEAT_WORDS = 6
+MIN_DUPLICATE_SENTENCE_WORDS = 4
+QUESTION_FOLLOWUP_SENTENCES = 4
+QUESTION_FOLLOWUP_BONUS = 10
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "so", "to", "of", "in", "on", "at", "for", "with", "is", "are",
+    "was", "were", "be", "it", "this", "that", "i", "you", "we", "they", "he", "she", "okay", "ok", "right",
+    "yeah", "yes", "well", "like", "just", "now", "then", "there", "here", "do", "does", "did",
+}
+
+
+def restore_annotations(text: str) -> str:
+    """
+    Turns unicode-name annotations back into their single character and drops
+    emoji annotations, which cost several tokens and rarely matter for answers.
+    """
+    def repl(match):
+        try:
+            return unicodedata.lookup(match.group(1))
+        except KeyError:
+            return match.group(0)
+    return EMOJI_ANNOTATION.sub("", UNICODE_ANNOTATION.sub(repl, text))
+
+
+def collapse_speaker_runs(lines: List[str]) -> List[str]:
+    """Merges consecutive lines of the same speaker under a single tag."""
+    merged = []
+    last_speaker = None
+    for line in lines:
+        if not line.strip():
+            continue
+        match = SPEAKER_TAG.match(line)
+        speaker = match.group(1) if match else None
+        body = line[match.end():] if match else line.strip()
+        if merged and (speaker is None or speaker == last_speaker):
+            merged[-1] = f"{merged[-1]} {body}"
+        else:
+            merged.append(f"{speaker}: {body}" if speaker else body)
+            last_speaker = speaker
+    return merged
+
+
+def remove_fillers(text: str) -> str:
+    text = FILLER.sub("", text)
+    # Tidy the spacing and punctuation left behind ("cos x, ." -> "cos x.")
+    text = re.sub(r"[ \t]+([,.?!])", r"\1", text)
+    text = re.sub(r",+([,.?!])", r"\1", text)
+    return re.sub(r"[ \t]{2,}", " ", text)
+
+
+def remove_repeated_spans(text: str) -> str:
+    """
+    Drops immediate repeats of 1..MAX_REPEAT_WORDS words, keeping the last
+    copy. A single word is only collapsed when it is doubled ("we we"); a
+    longer run ("no no no") is kept as said.
+    """
+    tokens = text.split(" ")
+    words = [WORD.findall(t.lower()) for t in tokens]
+    out = []
+    for i, token in enumerate(tokens):
+        out.append(token)
+        stutter = (i >= 1 and words[i] == words[i - 1]
+                   and (i < 2 or words[i - 2] != words[i])
+                   and (i + 1 >= len(tokens) or words[i + 1] != words[i]))
+        for n in range(MAX_REPEAT_WORDS, 0, -1):
+            if n == 1 and not stutter:
+                continue
+            if len(out) >= 2 * n:
+                first = [WORD.findall(t.lower()) for t in out[-2 * n:-n]]
+                second = [WORD.findall(t.lower()) for t in out[-n:]]
+                if first == second and any(first):
+                    capitalized = out[-2 * n][:1].isupper()
+                    del out[-2 * n:-n]
+                    if capitalized:
+                        out[-n] = out[-n][:1].upper() + out[-n][1:]
+                    break
+    return " ".join(out)
+
+
+def _split_line(line: str):
+    match = SPEAKER_TAG.match(line)
+    prefix = line[:match.end()] if match else ""
+    return prefix, SENTENCE_SPLIT.split(line[len(prefix):])
+
+
+def remove_duplicate_sentences(lines: List[str]) -> List[str]:
+    """
+    Drops later verbatim repeats of sentences of MIN_DUPLICATE_SENTENCE_WORDS
+    words or more. Questions and answer options are kept: a repeated stem
+    usually introduces a new set of options.
+    """
+    from tools.choice_parser import parse_options
+    seen = set()
+    result = []
+    for line in lines:
+        prefix, sentences = _split_line(line)
+        kept = []
+        for sentence in sentences:
+            key = " ".join(WORD.findall(sentence.lower()))
+            if "?" in sentence or parse_options(sentence)[1]:
+                kept.append(sentence)
+                continue
+            if len(key.split()) >= MIN_DUPLICATE_SENTENCE_WORDS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(sentence)
+        if any(s.strip() for s in kept):
+            result.append(prefix + " ".join(kept))
+    return result
+
+
+def _information(sentence: str) -> float:
+    words = [w for w in WORD.findall(sentence.lower()) if w not in STOPWORDS]
+    return len(set(words)) + 2 * sum(1 for w in words if w.isdigit())
+
+
+def drop_low_information(lines: List[str], token_budget: int) -> List[str]:
+    """
+    Removes the least informative non-question sentences, keeping transcript
+    order, until the text fits `token_budget`. Questions are never dropped.
+    """
+    sentences = []
+    for line_no, line in enumerate(lines):
+        prefix, parts = _split_line(line)
+        for part in parts:
+            sentences.append([line_no, prefix, part, True])
+    # Sentences right after a question often hold its answer options
+    scores = {}
+    since_question = QUESTION_FOLLOWUP_SENTENCES + 1
+    for i, sentence in enumerate(sentences):
+        if "?" in sentence[2]:
+            since_question = 0
+            continue
+        since_question += 1
+        bonus = QUESTION_FOLLOWUP_BONUS if since_question <= QUESTION_FOLLOWUP_SENTENCES else 0
+        scores[i] = _information(sentence[2]) + bonus
+    total = estimate_tokens("\n".join(lines))
+    candidates = [sentences[i] for i in sorted(scores, key=scores.get)]
+    for sentence in candidates:
+        if total <= token_budget:
+            break
+        sentence[3] = False
+        total -= estimate_tokens(sentence[2])
+    kept = {}
+    for line_no, prefix, part, keep in sentences:
+        if keep:
+            kept.setdefault(line_no, [prefix]).append(part)
+    return [parts[0] + " ".join(parts[1:]) for _, parts in sorted(kept.items())]
+
+
+def compress_transcript(text: str, token_budget: Optional[int] = None, stats: Optional[dict] = None) -> str:
+    """
+    Compresses a transcript for an LLM prompt. Safe passes always run:
+    annotation cleanup, filler removal, repeated-span and duplicate-sentence
+    removal, and merging same-speaker runs. If `token_budget` is given and
+    the text is still over it, the least informative non-question sentences
+    are dropped. Token counts before and after are added to `stats`, so one
+    dict can total every prompt of a job.
+    """
+    if stats is None:
+        stats = {}
+    stats["tokens_before"] = stats.get("tokens_before", 0) + estimate_tokens(text)
+    text = restore_annotations(text)
+    text = remove_fillers(text)
+    lines = [remove_repeated_spans(line.strip()) for line in text.split("\n")]
+    lines = collapse_speaker_runs(lines)
+    lines = remove_duplicate_sentences(lines)
+    if token_budget is not None and estimate_tokens("\n".join(lines)) > token_budget:
+        lines = drop_low_information(lines, token_budget)
+        stats["truncated"] = True
+    compressed = "\n".join(lines)
+    stats["tokens_after"] = stats.get("tokens_after", 0) + estimate_tokens(compressed)
+    return compressed
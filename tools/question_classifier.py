@@ -0,0 +1,239 @@
+import glob
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import zlib
+from typing import List, Tuple
+
+# Hashed n-gram logistic regression that scores how likely a sentence is a
+# question, so only likely questions are sent to the LLM.
+N_FEATURES = 2 ** 18
+# A missed question is never answered, while a false positive only costs an
+# LLM call, so the threshold is set for high recall: 0.96 recall at 0.57
+# precision in held-out evaluation (tests/bench_question_classifier.py).
+QUESTION_THRESHOLD = 0.2
+TARGET_RECALL = 0.95
+CLASSIFIER_LANGUAGES = ["en"]
+MODEL_PATH = os.path.join("cache", "question_classifier.json")
+EVAL_DATA_DIR = "evaluation_data"
+FEEDBACK_DIR = "feedback"
+
+EPOCHS = 30
+LEARNING_RATE = 0.5
+L2 = 1e-4
+
+# Seed sentences so the model is usable before much feedback has been collected.
+SEED_QUESTIONS = [
+    "What is the derivative of x squared",
+    "Which of the following is a prime number",
+    "Why does the population decrease in winter",
+    "How do we compute the area of a circle",
+    "Can anyone tell me what photosynthesis produces",
+    "Is this statement true or false",
+    "True or false, the sun is a star",
+    "What is the difference between mitosis and meiosis",
+    "Who wrote the declaration of independence",
+    "When did the second world war end",
+    "Where is the mitochondria located in the cell",
+    "Solve for x in two x plus three equals seven",
+    "Find the integral of sine of x",
+    "Explain why the sky is blue",
+    "Name three types of rock",
+    "So which one is the answer",
+    "Does anybody know the capital of France",
+    "What happens if we double the voltage",
+    "Define afforestation",
+    "Calculate the speed of the car after ten seconds",
+]
+SEED_STATEMENTS = [
+    "Today we are going to talk about the water cycle",
+    "The derivative of x squared is two x",
+    "Let me write that on the board",
+    "This is important for the exam",
+    "So the answer is twenty nine",
+    "We will continue next week",
+    "Okay everyone please open your books to page forty",
+    "Photosynthesis produces glucose and oxygen",
+    "The mitochondria is the powerhouse of the cell",
+    "Remember to submit your homework by Friday",
+    "And that is why the sky is blue",
+    "Now I will show you how we do this",
+    "It is going to be on the test",
+    "The population decreases in winter because food is scarce",
+    "We can see that the area grows with the radius",
+    "That is all for today",
+    "If you double the voltage the current doubles",
+    "I think this is the most interesting part",
+    "Let us move on to the next topic",
+    "The final one is fifty one",
+]
+
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+
+def tokenize(sentence: str) -> List[str]:
+    """
+    Lowercases a sentence and splits it into word and question-mark tokens.
+    """
+    return re.findall(r"[a-zà-ÿ0-9']+|\?", sentence.lower())
+
+
+def extract_features(sentence: str) -> List[int]:
+    """
+    Maps a sentence to hashed feature indices: unigrams, bigrams, the first
+    two words and the final token.
+    """
+    # Strip leading speaker tags such as "[SPEAKER_00]:"
+    tokens = tokenize(re.sub(r"^\s*\[[^\]]*\]:?", "", sentence))
+    grams = [f"w={t}" for t in tokens]
+    grams += [f"b={a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    if tokens:
+        grams.append(f"first={tokens[0]}")
+        grams.append(f"last={tokens[-1]}")
+    if len(tokens) > 1:
+        grams.append(f"first2={tokens[0]}_{tokens[1]}")
+    grams.append(f"len={min(len(tokens) // 4, 5)}")
+    return sorted({zlib.crc32(g.encode("utf-8")) % N_FEATURES for g in grams})
+
+
+def _sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    if z > 30:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def train(examples: List[Tuple[str, int]], epochs: int = EPOCHS, seed: int = 0) -> dict:
+    """
+    Trains the logistic regression with SGD on (sentence, label) pairs.
+    Returns the model as a dict of bias and sparse weights.
+    """
+    rng = random.Random(seed)
+    data = [(extract_features(s), label) for s, label in examples]
+    weights = {}
+    bias = 0.0
+    for epoch in range(epochs):
+        rng.shuffle(data)
+        rate = LEARNING_RATE / (1 + epoch * 0.1)
+        for features, label in data:
+            z = bias + sum(weights.get(i, 0.0) for i in features)
+            error = _sigmoid(z) - label
+            bias -= rate * error
+            for i in features:
+                w = weights.get(i, 0.0)
+                weights[i] = w - rate * (error + L2 * w)
+    return {"bias": bias, "weights": {str(i): w for i, w in weights.items() if abs(w) > 1e-6}}
+
+
+def predict_proba(model: dict, sentence: str) -> float:
+    """
+    Returns the probability that a sentence is a question under `model`.
+    """
+    weights = model["weights"]
+    z = model["bias"] + sum(weights.get(str(i), 0.0) for i in extract_features(sentence))
+    return _sigmoid(z)
+
+
+def _split_sentences(text: str) -> List[str]:
+    sentences = re.split(r"(?<=[.?!])\s+", text)
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def load_training_examples(eval_data_dir: str = EVAL_DATA_DIR, feedback_dir: str = FEEDBACK_DIR) -> List[Tuple[str, int]]:
+    """
+    Builds labeled sentences from the seed lists, the questions stored in
+    evaluation_data/ and feedback/, and the evaluation transcripts (sentences
+    ending in '?' are questions, the rest are not).
+    """
+    examples = [(s, 1) for s in SEED_QUESTIONS] + [(s, 0) for s in SEED_STATEMENTS]
+    for path in glob.glob(os.path.join(eval_data_dir, "*.json")):
+        with open(path, "r") as f:
+            data = json.load(f)
+        for a in data.get("answers", []):
+            if a.get("question"):
+                examples.append((a["question"], 1))
+    for path in glob.glob(os.path.join(feedback_dir, "*.json")):
+        with open(path, "r") as f:
+            for entry in json.load(f):
+                if entry.get("question"):
+                    examples.append((entry["question"], 1))
+    for path in glob.glob(os.path.join(eval_data_dir, "*.txt")):
+        with open(path, "r") as f:
+            for sentence in _split_sentences(f.read()):
+                examples.append((sentence, 1 if sentence.endswith("?") else 0))
+    return examples
+
+
+def train_and_save(model_path: str = MODEL_PATH) -> dict:
+    """
+    Trains the classifier on the available data and saves it as JSON.
+    """
+    model = train(load_training_examples())
+    directory = os.path.dirname(model_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Readers in other processes never see a half-written model
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(model, f)
+        os.replace(temp_path, model_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return model
+
+
+def get_model() -> dict:
+    """
+    Returns the cached classifier, loading it from disk or training it on first use.
+    """
+    global _MODEL
+    with _MODEL_LOCK:
+        if _MODEL is None:
+            if os.path.exists(MODEL_PATH):
+                with open(MODEL_PATH, "r") as f:
+                    _MODEL = json.load(f)
+            else:
+                _MODEL = train_and_save(MODEL_PATH)
+        return _MODEL
+
+
+def question_confidence(sentence: str, language: str = "en") -> float:
+    """
+    Returns the classifier's confidence that a sentence is a question. For
+    languages without a trained model, falls back to the keyword heuristic
+    (1.0 or 0.0).
+    """
+    if (language or "en") not in CLASSIFIER_LANGUAGES:
+        from tools.nlp_utils import is_potential_question
+        return 1.0 if is_potential_question(sentence, language) else 0.0
+    return predict_proba(get_model(), sentence)
+
+
+def select_threshold(probabilities: List[float], labels: List[int], target_recall: float = TARGET_RECALL) -> float:
+    """
+    The highest threshold whose recall on (probability, label) pairs is at
+    least `target_recall`.
+    """
+    positives = sorted((p for p, y in zip(probabilities, labels) if y), reverse=True)
+    if not positives:
+        return QUESTION_THRESHOLD
+    needed = max(1, math.ceil(target_recall * len(positives)))
+    return positives[needed - 1]
+
+
+def is_likely_question(sentence: str, language: str = "en", threshold: float = QUESTION_THRESHOLD) -> bool:
+    """
+    Checks whether a sentence is likely enough to be a question to send it
+    to the LLM. Sentences with a question mark always are.
+    """
+    if "?" in sentence:
+        return True
+    return question_confidence(sentence, language) >= threshold
@@ -0,0 +1,103 @@
+import re
+from typing import Iterable, List
+
+# Trained pipelines per language; only their sentence recognizer is used.
+SPACY_MODELS = {
+    "en": "en_core_web_sm",
+    "es": "es_core_news_sm",
+    "fr": "fr_core_news_sm",
+    "de": "de_core_news_sm",
+}
+# Components that are not needed for sentence boundaries
+UNUSED_COMPONENTS = ["tok2vec", "tagger", "parser", "ner", "lemmatizer", "attribute_ruler", "morphologizer"]
+
+# Long transcripts are split into chunks of roughly this many characters
+# before being fed to nlp.pipe.
+CHUNK_CHARS = 5000
+PIPE_BATCH_SIZE = 16
+# Use worker processes only when there are enough chunks to amortize start-up
+MULTIPROCESS_MIN_CHUNKS = 64
+MAX_PROCESSES = 4
+# Chunks are cut at line breaks (speaker turns) and after sentence-final punctuation
+CHUNK_BOUNDARY = re.compile(r"(\s*\n\s*|(?<=[.?!])\s+)")
+
+_SEGMENTERS = {}
+
+
+def load_segmenter(language: str = "en"):
+    """
+    Loads a sentence segmentation pipeline for a language code. Uses the
+    trained `senter` component when the language's model is installed and a
+    rule-based `sentencizer` on a blank pipeline otherwise.
+    """
+    import spacy
+
+    model_name = SPACY_MODELS.get(language)
+    if model_name:
+        try:
+            nlp = spacy.load(model_name, exclude=UNUSED_COMPONENTS)
+            if "senter" in nlp.disabled:
+                nlp.enable_pipe("senter")
+            if "senter" in nlp.pipe_names:
+                return nlp
+        except OSError:
+            print(f"spaCy model {model_name} is not installed; using the rule-based sentencizer.")
+    try:
+        nlp = spacy.blank(language)
+    except (ImportError, KeyError):
+        nlp = spacy.blank("xx")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+def get_segmenter(language: str = "en"):
+    """
+    Returns the cached segmentation pipeline for a language, loading it on first use.
+    """
+    language = (language or "en").lower()
+    if language not in _SEGMENTERS:
+        _SEGMENTERS[language] = load_segmenter(language)
+    return _SEGMENTERS[language]
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """
+    Splits text into chunks of about `chunk_chars` characters, cutting only
+    after sentence-final punctuation or line breaks so no sentence spans two
+    chunks. Line breaks inside a chunk are kept.
+    """
+    parts = CHUNK_BOUNDARY.split(text)
+    chunks = []
+    current = ""
+    for piece, separator in zip(parts[::2], parts[1::2] + [""]):
+        if current.strip() and len(current) + len(piece) > chunk_chars:
+            chunks.append(current.strip())
+            current = ""
+        current += piece + ("\n" if "\n" in separator else separator)
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+
+def segment_chunks(chunks: Iterable[str], language: str = "en", n_process: int = None, threads: int = 1) -> List[str]:
+    """
+    Segments pre-chunked text into sentences with nlp.pipe. A line break
+    always ends a sentence. Without an explicit `n_process`, up to `threads`
+    worker processes are used when there are many chunks.
+    """
+    chunks = list(chunks)
+    nlp = get_segmenter(language)
+    if n_process is None:
+        n_process = min(threads, MAX_PROCESSES) if len(chunks) >= MULTIPROCESS_MIN_CHUNKS else 1
+    sentences = []
+    for doc in nlp.pipe(chunks, batch_size=PIPE_BATCH_SIZE, n_process=max(n_process, 1)):
+        for sent in doc.sents:
+            sentences.extend(line.strip() for line in sent.text.split("\n") if line.strip())
+    return sentences
+
+
+def segment_sentences(text: str, language: str = "en", n_process: int = None, threads: int = 1) -> List[str]:
+    """
+    Splits a transcript into sentences using the cached per-language segmenter.
+    """
+    return segment_chunks(chunk_text(text), language, n_process, threads)
@@ -3,6 +3,8 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 import subprocess
 from utils.exceptions import CorruptAudioError
+from tools.llm_quota import get_governor
+from tools.audio_probe import probe_audio
 import uuid
 import tempfile
 import shutil
@@ -10,48 +12,73 @@ import shutil
 load_dotenv()
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-def transcribe_audio(audio_path: str, language: str = None, start_time: float = None, end_time: float = None) -> str:
+# Compact speech profile used for every upload: ASR only needs 16 kHz mono.
+UPLOAD_SAMPLE_RATE = 16000
+UPLOAD_CHANNELS = 1
+UPLOAD_CODEC = "flac"  # "flac" (lossless) or "opus"
+UPLOAD_OPUS_BITRATE = "24k"
+UPLOAD_FORMATS = {
+    "flac": {"ext": "flac", "args": ["-c:a", "flac", "-compression_level", "8"]},
+    "opus": {"ext": "ogg", "args": ["-c:a", "libopus", "-b:a", UPLOAD_OPUS_BITRATE, "-application", "voip"]},
+}
+
+def new_upload_stats() -> dict:
+    """
+    Returns an empty per-job byte accounting record for `transcribe_audio`.
+    """
+    return {"uploads": 0, "source_bytes": 0, "uploaded_bytes": 0, "audio_seconds": 0.0}
+
+def encode_for_upload(audio_path: str, output_dir: str, start_time: float = None, end_time: float = None, codec: str = UPLOAD_CODEC) -> str:
+    """
+    Cuts (optionally) and transcodes audio to the compact speech profile in a
+    single ffmpeg invocation. The same pass doubles as the corruption check:
+    any decode error reported by ffmpeg raises CorruptAudioError.
+    """
+    profile = UPLOAD_FORMATS[codec]
+    output_path = os.path.join(output_dir, f"{uuid.uuid4()}.{profile['ext']}")
+    output_path = os.path.normpath(output_path).replace("\\", "/")
+    cmd = ["ffmpeg", "-v", "error", "-nostdin"]
+    if start_time is not None:
+        cmd += ["-ss", str(start_time)]
+    cmd += ["-i", audio_path]
+    if start_time is not None and end_time is not None:
+        cmd += ["-t", str(max(end_time - start_time, 0))]
+    cmd += ["-vn", "-ac", str(UPLOAD_CHANNELS), "-ar", str(UPLOAD_SAMPLE_RATE)] + profile["args"] + ["-y", output_path]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise CorruptAudioError(f"ffmpeg failed to encode audio for upload: {e.stderr.strip()}")
+    if result.stderr.strip():
+        raise CorruptAudioError(f"Audio file appears corrupt or unreadable: {result.stderr.strip()}")
+    return output_path
+
+def upload_seconds(audio_path: str, start_time: float = None, end_time: float = None) -> float:
+    """
+    Seconds of audio in an upload: the cut length for a segment, otherwise
+    the probed duration of the file (after `start_time`). 0 if unknown.
+    """
+    if start_time is not None and end_time is not None:
+        return max(end_time - start_time, 0)
+    info = probe_audio(audio_path)
+    duration = info.get("duration") if info else None
+    if not duration:
+        return 0.0
+    return max(duration - (start_time or 0), 0)
+
+def transcribe_audio(audio_path: str, language: str = None, start_time: float = None, end_time: float = None, upload_stats: dict = None) -> str:
     """
     Transcribes an audio file or a segment of an audio file using the Gemini API.
+    The audio is transcoded to a 16 kHz mono speech profile before upload; when
+    `upload_stats` is given, the uploaded bytes are added to it.
     """
-    temp_dir = None
+    temp_dir = tempfile.mkdtemp()
     try:
-        if start_time is not None and end_time is not None:
-            temp_dir = tempfile.mkdtemp()
-            temp_audio_file = os.path.join(temp_dir, f"{uuid.uuid4()}.wav")
-            temp_audio_file = os.path.normpath(temp_audio_file).replace("\\", "/")
-            try:
-                cmd = [
-                    "ffmpeg",
-                    "-i", audio_path,
-                    "-ss", str(start_time),
-                    "-to", str(end_time),
-                    "-c", "copy",
-                    temp_audio_file
-                ]
-                subprocess.run(cmd, capture_output=True, text=True, check=True)
-                audio_path_to_upload = temp_audio_file
-            except subprocess.CalledProcessError as e:
-                raise CorruptAudioError(f"ffmpeg failed to extract audio segment: {e.stderr.strip()}")
-        else:
-            audio_path_to_upload = audio_path
+        audio_path_to_upload = encode_for_upload(audio_path, temp_dir, start_time, end_time)
 
-        # First, perform a corruption check using ffmpeg
-        try:
-            cmd = [
-                "ffmpeg",
-                "-v", "error",
-                "-i", audio_path_to_upload,
-                "-f", "null",
-                "-"
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            if result.stderr:
-                raise CorruptAudioError(f"Audio file appears corrupt or unreadable: {result.stderr.strip()}")
-        except subprocess.CalledProcessError as e:
-            raise CorruptAudioError(f"ffmpeg failed to analyze audio file for corruption: {e.stderr.strip()}")
-        except Exception as e:
-            raise CorruptAudioError(f"An unexpected error occurred during audio corruption check: {e}")
+        if upload_stats is not None:
+            upload_stats["uploads"] += 1
+            upload_stats["uploaded_bytes"] += os.path.getsize(audio_path_to_upload)
+            upload_stats["audio_seconds"] += upload_seconds(audio_path, start_time, end_time)
 
         print(f"Uploading audio file: {audio_path_to_upload}")
         audio_file = genai.upload_file(path=audio_path_to_upload)
@@ -63,13 +90,14 @@ def transcribe_audio(audio_path: str, language: str = None, start_time: float =
             prompt = f"{prompt} The language of the audio is {language}."
 
         print("Transcribing audio file with Gemini...")
-        response = model.generate_content([
-            prompt,
-            audio_file
-        ])
-        
-        # Clean up the uploaded file
-        genai.delete_file(audio_file.name)
+        try:
+            response = get_governor().call(model.generate_content, [
+                prompt,
+                audio_file
+            ])
+        finally:
+            # Clean up the uploaded file, also when the job is paused for quota
+            genai.delete_file(audio_file.name)
 
         return response.text
     finally:
@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+# Size-bounded storage for uploads/, outputs/ and cache/. Uploads are stored
+# by content hash: a duplicate upload becomes a hardlink to the file already
+# on disk. Each directory has a byte budget; when it is exceeded the least
+# recently used files this manager recorded are deleted, except files pinned by in-flight jobs and
+# files modified within GRACE_SECONDS (still being written). Access times,
+# pins and counters live in one SQLite database shared by all processes.
+STORAGE_DB_PATH = os.getenv("STORAGE_DB", os.path.join("cache", "storage.sqlite"))
+MB = 1024 * 1024
+DEFAULT_BUDGETS = {
+    "uploads": int(float(os.getenv("STORAGE_BUDGET_UPLOADS_MB", "5000")) * MB),
+    "outputs": int(float(os.getenv("STORAGE_BUDGET_OUTPUTS_MB", "2000")) * MB),
+    "cache": int(float(os.getenv("STORAGE_BUDGET_CACHE_MB", "2000")) * MB),
+}
+GRACE_SECONDS = 300.0
+# Shared state that is never evicted: the answer store, CPU slot locks and databases
+PROTECTED_PREFIXES = (os.path.join("cache", "answer_store"), os.path.join("cache", "cpu_slots"))
+PROTECTED_SUFFIXES = (".sqlite", ".sqlite-journal", ".sqlite-wal", ".sqlite-shm")
+HASH_CHUNK_BYTES = 1024 * 1024
+
+_STORAGE = None
+_STORAGE_LOCK = threading.Lock()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class StorageManager:
+    """
+    Content-addressed uploads, LRU eviction under per-directory byte
+    budgets, and pins that protect the files of running jobs.
+    """
+
+    def __init__(self, db_path: str = STORAGE_DB_PATH, budgets: Optional[Dict[str, int]] = None,
+                 grace_seconds: float = GRACE_SECONDS):
+        self.db_path = db_path
+        self.budgets = DEFAULT_BUDGETS if budgets is None else budgets
+        self.grace_seconds = grace_seconds
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._transaction() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, hash TEXT, last_access REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS files_hash ON files (hash)")
+            db.execute("CREATE TABLE IF NOT EXISTS pins (job_id TEXT, prefix TEXT, pid INTEGER)")
+            db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value REAL)")
+
+    @contextmanager
+    def _transaction(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normpath(os.path.relpath(path))
+
+    @staticmethod
+    def _count(db, name: str, amount: float = 1):
+        db.execute("INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?",
+                   (name, amount, amount))
+
+    # --- Content-addressed uploads ---
+
+    def store_upload(self, source: BinaryIO, path: str) -> Tuple[str, bool]:
+        """
+        Writes an upload stream to `path`, hashing it on the way. If a file
+        with the same content is already stored, `path` becomes a hardlink to
+        it (or a copy, on filesystems without hardlinks). Returns (path,
+        deduplicated).
+        """
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: source.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+                f.write(chunk)
+        content_hash = digest.hexdigest()
+        with self._transaction() as db:
+            existing = [row[0] for row in db.execute("SELECT path FROM files WHERE hash = ?", (content_hash,))]
+            original = next((p for p in existing if os.path.exists(p)), None)
+            deduplicated = False
+            if original is not None:
+                try:
+                    os.link(original, path)
+                    os.remove(tmp_path)
+                    deduplicated = True
+                    self._count(db, "dedup_hits")
+                    self._count(db, "dedup_bytes_saved", os.path.getsize(path))
+                except OSError:
+                    pass
+            if not deduplicated:
+                os.replace(tmp_path, path)
+            db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (self._key(path), content_hash, time.time()))
+        return path, deduplicated
+
+    # --- Access tracking and pins ---
+
+    def record(self, *paths: str):
+        """
+        Registers files written by jobs as evictable. Until they are touched
+        they are evicted in modification-time order.
+        """
+        with self._transaction() as db:
+            db.executemany("INSERT OR IGNORE INTO files (path) VALUES (?)", [(self._key(path),) for path in paths])
+
+    def touch(self, *paths: str):
+        """Records that files were just used, moving them to the back of the eviction order."""
+        now = time.time()
+        with self._transaction() as db:
+            for path in paths:
+                db.execute("INSERT INTO files (path, last_access) VALUES (?, ?) "
+                           "ON CONFLICT(path) DO UPDATE SET last_access = ?", (self._key(path), now, now))
+
+    def pin(self, job_id: str, prefixes: Iterable[str]):
+        """
+        Protects every file whose path starts with one of `prefixes` until
+        `unpin(job_id)` or until this process exits.
+        """
+        with self._transaction() as db:
+            db.executemany("INSERT INTO pins VALUES (?, ?, ?)",
+                           [(job_id, self._key(prefix), os.getpid()) for prefix in prefixes])
+
+    def unpin(self, job_id: str):
+        with self._transaction() as db:
+            db.execute("DELETE FROM pins WHERE job_id = ?", (job_id,))
+
+    @contextmanager
+    def pinned(self, job_id: str, prefixes: Iterable[str]):
+        self.pin(job_id, prefixes)
+        try:
+            yield
+        finally:
+            self.unpin(job_id)
+
+    def _live_pins(self, db) -> List[str]:
+        prefixes = []
+        for prefix, pid in db.execute("SELECT prefix, pid FROM pins").fetchall():
+            if _pid_alive(pid):
+                prefixes.append(prefix)
+            else:
+                # The pinning process died without unpinning
+                db.execute("DELETE FROM pins WHERE pid = ?", (pid,))
+        return prefixes
+
+    # --- Usage and eviction ---
+
+    @staticmethod
+    def _scan(directory: str) -> List[Tuple[str, os.stat_result]]:
+        files = []
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    files.append((path, os.stat(path)))
+                except FileNotFoundError:
+                    pass
+        return files
+
+    @staticmethod
+    def _usage(files) -> int:
+        """Bytes on disk, counting hardlinked files once."""
+        seen = set()
+        total = 0
+        for _, st in files:
+            if (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_size
+        return total
+
+    def evict(self, directory: str) -> Dict:
+        """
+        Deletes least recently used files until `directory` is within its
+        budget. Only recorded files are deleted; anything else in the
+        directory (tracked sources, trained models) counts towards usage but
+        is left alone.
+        """
+        budget = self.budgets.get(os.path.basename(os.path.normpath(directory)))
+        files = self._scan(directory)
+        usage = self._usage(files)
+        evicted_files = evicted_bytes = 0
+        if budget is None or usage <= budget:
+            return {"directory": directory, "bytes": usage, "budget": budget, "evicted_files": 0, "evicted_bytes": 0}
+
+        now = time.time()
+        with self._transaction() as db:
+            pins = self._live_pins(db)
+            access = dict(db.execute("SELECT path, last_access FROM files").fetchall())
+            candidates = []
+            for path, st in files:
+                key = self._key(path)
+                if key not in access:
+                    continue
+                if key.startswith(PROTECTED_PREFIXES) or key.endswith(PROTECTED_SUFFIXES):
+                    continue
+                if any(key.startswith(p) for p in pins):
+                    continue
+                if now - st.st_mtime < self.grace_seconds:
+                    continue
+                candidates.append((access[key] or st.st_mtime, path, st))
+            candidates.sort()
+            for _, path, st in candidates:
+                if usage <= budget:
+                    break
+                try:
+                    # Only the last link of a deduplicated file frees its bytes
+                    freed = st.st_size if os.stat(path).st_nlink == 1 else 0
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                db.execute("DELETE FROM files WHERE path = ?", (self._key(path),))
+                usage -= freed
+                evicted_files += 1
+                evicted_bytes += freed
+            name = os.path.basename(os.path.normpath(directory))
+            self._count(db, f"{name}.evicted_files", evicted_files)
+            self._count(db, f"{name}.evicted_bytes", evicted_bytes)
+        return {"directory": directory, "bytes": usage, "budget": budget,
+                "evicted_files": evicted_files, "evicted_bytes": evicted_bytes}
+
+    def enforce_budgets(self) -> List[Dict]:
+        return [self.evict(directory) for directory in self.budgets if os.path.isdir(directory)]
+
+    def report(self) -> Dict:
+        """Disk usage per managed directory, eviction totals and deduplication savings."""
+        with self._transaction() as db:
+            counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+            pins = len(self._live_pins(db))
+        directories = {}
+        for name, budget in self.budgets.items():
+            files = self._scan(name) if os.path.isdir(name) else []
+            directories[name] = {
+                "bytes": self._usage(files),
+                "files": len(files),
+                "budget": budget,
+                "evicted_files": int(counters.get(f"{name}.evicted_files", 0)),
+                "evicted_bytes": int(counters.get(f"{name}.evicted_bytes", 0)),
+            }
+        return {
+            "directories": directories,
+            "dedup_hits": int(counters.get("dedup_hits", 0)),
+            "dedup_bytes_saved": int(counters.get("dedup_bytes_saved", 0)),
+            "pinned_prefixes": pins,
+        }
+
+
+def get_storage() -> StorageManager:
+    """Returns the process-wide storage manager, creating it on first use."""
+    global _STORAGE
+    with _STORAGE_LOCK:
+        if _STORAGE is None:
+            _STORAGE = StorageManager()
+        return _STORAGE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report or enforce the storage budgets of uploads/, outputs/ and cache/.")
+    parser.add_argument("command", choices=["report", "evict"])
+    args = parser.parse_args()
+    storage = get_storage()
+    if args.command == "evict":
+        print(json.dumps(storage.enforce_budgets(), indent=4))
+    else:
+        print(json.dumps(storage.report(), indent=4))
@@ -0,0 +1,13 @@
+import re
+
+# Rough characters-per-token ratio of the Gemini tokenizer on English text
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of LLM tokens in a text without calling the API.
+    """
+    if not text:
+        return 0
+    pieces = len(re.findall(r"\w+|[^\w\s]", text))
+    return max(pieces, len(text) // CHARS_PER_TOKEN)
@@ -0,0 +1,183 @@
+import math
+import pickle
+import re
+from collections import Counter
+from typing import Callable, List, Optional
+
+from tools.token_utils import estimate_tokens
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Weight of the embedding cosine score when embeddings are available
+EMBEDDING_WEIGHT = 0.5
+DEFAULT_TOP_K = 8
+DEFAULT_TOKEN_BUDGET = 1500
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for", "with", "is", "are",
+    "was", "were", "be", "it", "this", "that", "so", "uh", "um", "like", "i", "you", "we", "they",
+}
+SPEAKER_LINE = re.compile(r"^\s*\[([^\]]+)\]:\s*(.*)$")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+
+
+class TranscriptIndex:
+    """
+    Per-job retrieval index over transcript sentences and speaker turns.
+    Ranks passages with BM25 and, when an encoder is attached, blends in a
+    cosine similarity over a NumPy embedding matrix.
+    """
+
+    def __init__(self, passages: List[dict]):
+        self.passages = passages
+        self.doc_terms = [Counter(tokenize(p["text"])) for p in passages]
+        self.doc_lengths = [sum(terms.values()) for terms in self.doc_terms]
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if passages else 0.0
+        df = Counter()
+        for terms in self.doc_terms:
+            df.update(terms.keys())
+        n = len(passages)
+        self.idf = {term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+        self.embeddings = None
+        self.encoder = None
+
+    @classmethod
+    def from_transcript(cls, transcript: str, speaker_transcripts: Optional[List[dict]] = None, language: str = "en") -> "TranscriptIndex":
+        """
+        Builds the index from the transcript's sentences plus, when available,
+        each speaker turn from `speaker_transcripts`. Turns are read from
+        "[SPEAKER]: text" lines when no speaker_transcripts are given.
+        """
+        from tools.sentence_segmenter import segment_chunks
+
+        lines = [line for line in transcript.split("\n") if line.strip()]
+        if not speaker_transcripts:
+            speaker_transcripts = []
+            for line in lines:
+                match = SPEAKER_LINE.match(line)
+                if match and match.group(2).strip():
+                    speaker_transcripts.append({"speaker": match.group(1), "transcript": match.group(2)})
+
+        # Segment line by line so no sentence crosses a speaker turn
+        line_texts = [SPEAKER_LINE.sub(r"\2", line) for line in lines]
+        passages = []
+        for position, sentence in enumerate(segment_chunks(line_texts, language, n_process=1)):
+            passages.append({"kind": "sentence", "position": position, "text": sentence})
+        for position, turn in enumerate(speaker_transcripts):
+            text = (turn.get("transcript") or "").strip()
+            if text:
+                passages.append({
+                    "kind": "turn",
+                    "position": position,
+                    "speaker": turn.get("speaker"),
+                    "start": turn.get("start"),
+                    "end": turn.get("end"),
+                    "text": f"[{turn.get('speaker')}]: {text}",
+                })
+        return cls(passages)
+
+    def attach_encoder(self, encoder: Callable[[List[str]], "object"]):
+        """
+        Embeds all passages with `encoder` (a function mapping a list of texts
+        to a 2-D array) and enables hybrid BM25 + cosine ranking.
+        """
+        import numpy as np
+
+        self.encoder = encoder
+        if not self.passages:
+            return
+        matrix = np.asarray(encoder([p["text"] for p in self.passages]), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.embeddings = matrix / np.maximum(norms, 1e-12)
+
+    def bm25_scores(self, query: str) -> List[float]:
+        terms = tokenize(query)
+        scores = []
+        for doc, length in zip(self.doc_terms, self.doc_lengths):
+            score = 0.0
+            for term in terms:
+                freq = doc.get(term)
+                if not freq:
+                    continue
+                denom = freq + BM25_K1 * (1 - BM25_B + BM25_B * length / (self.avg_length or 1))
+                score += self.idf[term] * freq * (BM25_K1 + 1) / denom
+            scores.append(score)
+        return scores
+
+    def scores(self, query: str) -> List[float]:
+        scores = self.bm25_scores(query)
+        if self.embeddings is None or self.encoder is None:
+            return scores
+        import numpy as np
+
+        top = max(scores) if scores and max(scores) > 0 else 1.0
+        query_vector = np.asarray(self.encoder([query]), dtype=np.float32)[0]
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        cosine = self.embeddings @ query_vector
+        return [(1 - EMBEDDING_WEIGHT) * s / top + EMBEDDING_WEIGHT * float(c) for s, c in zip(scores, cosine)]
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K, token_budget: Optional[int] = None) -> List[dict]:
+        """
+        Returns up to `k` passages relevant to the query, best first, stopping
+        before their combined size exceeds `token_budget`.
+        """
+        ranked = sorted(zip(self.scores(query), range(len(self.passages))), reverse=True)
+        results = []
+        used_tokens = 0
+        for score, i in ranked:
+            if len(results) >= k or score <= 0:
+                break
+            passage = self.passages[i]
+            # Sentences and the speaker turns containing them overlap; keep
+            # whichever covers more text
+            if any(passage["text"] in r["text"] for r in results):
+                continue
+            contained = [r for r in results if r["text"] in passage["text"]]
+            tokens = estimate_tokens(passage["text"])
+            freed = sum(estimate_tokens(r["text"]) for r in contained)
+            if token_budget is not None and used_tokens - freed + tokens > token_budget:
+                continue
+            results = [r for r in results if r not in contained]
+            used_tokens += tokens - freed
+            results.append(dict(passage, score=score))
+        return results
+
+    def context_for(self, query: str, k: int = DEFAULT_TOP_K, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+        """
+        Returns the retrieved passages as prompt context, in transcript order.
+        """
+        passages = self.search(query, k, token_budget)
+        passages.sort(key=lambda p: (p["kind"] != "turn", p["position"]))
+        return "\n".join(p["text"] for p in passages)
+
+    def save(self, path: str):
+        """
+        Pickles the index (without the encoder) for reuse by later requests.
+        """
+        encoder = self.encoder
+        self.encoder = None
+        try:
+            with open(path, "wb") as f:
+                pickle.dump(self, f)
+        finally:
+            self.encoder = encoder
+
+    @staticmethod
+    def load(path: str) -> "TranscriptIndex":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def sentence_transformer_encoder(model_name: str = "all-MiniLM-L6-v2"):
+    """
+    Returns an encoder backed by sentence-transformers, or None if it is not installed.
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+    model = SentenceTransformer(model_name)
+    return lambda texts: model.encode(texts, batch_size=64, convert_to_numpy=True)
@@ -0,0 +1,268 @@
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Windowed diarization: the recording is cut into overlapping windows that
+# are diarized in parallel worker processes. Window-local speakers are then
+# mapped to global speakers by clustering their embeddings, with the
+# constraint that two speakers of the same window stay apart.
+DIARIZATION_SAMPLE_RATE = 16000
+WINDOW_SECONDS = 300.0
+OVERLAP_SECONDS = 30.0
+# Recordings at least this long are diarized in windows in "auto" mode
+WINDOWED_MIN_SECONDS = 1200.0
+# Cosine distance under which two window speakers are the same person
+CLUSTER_THRESHOLD = 0.6
+# Same-speaker turns separated by less than this are joined, and turns
+# shorter than this are absorbed into their neighbour
+MIN_TURN_SECONDS = 1.0
+DER_FRAME_SECONDS = 0.01
+PIPELINE_NAME = "pyannote/speaker-diarization"
+
+_PIPELINE = None
+
+
+def plan_windows(duration: float, window: float = WINDOW_SECONDS, overlap: float = OVERLAP_SECONDS) -> List[Tuple[float, float]]:
+    """Splits [0, duration] into windows of `window` seconds overlapping by `overlap`."""
+    if duration <= window:
+        return [(0.0, duration)]
+    windows = []
+    start = 0.0
+    while True:
+        end = min(start + window, duration)
+        windows.append((start, end))
+        if end >= duration:
+            return windows
+        start = end - overlap
+
+
+def load_window(audio_path: str, start: float, end: float, sample_rate: int = DIARIZATION_SAMPLE_RATE) -> np.ndarray:
+    """Decodes one window of the file as mono float32 with ffmpeg."""
+    command = [
+        "ffmpeg", "-v", "error",
+        "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+        "-i", audio_path,
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    result = subprocess.run(command, capture_output=True, check=True)
+    raw = result.stdout[:len(result.stdout) - len(result.stdout) % 2]
+    return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def load_pipeline():
+    from pyannote.audio import Pipeline
+    return Pipeline.from_pretrained(PIPELINE_NAME, use_auth_token=os.getenv("HF_TOKEN"))
+
+
+def _init_worker(threads: int):
+    global _PIPELINE
+    import torch
+    torch.set_num_threads(threads)
+    _PIPELINE = load_pipeline()
+
+
+def diarize_window(audio_path: str, start: float, end: float) -> Dict:
+    """
+    Diarizes one window in a worker process. Returns its turns in absolute
+    time and one embedding per window-local speaker (None if the pipeline
+    cannot return embeddings).
+    """
+    import torch
+    audio = load_window(audio_path, start, end)
+    waveform = {"waveform": torch.from_numpy(audio).unsqueeze(0), "sample_rate": DIARIZATION_SAMPLE_RATE}
+    try:
+        diarization, embeddings = _PIPELINE(waveform, return_embeddings=True)
+    except TypeError:
+        # Older pipelines cannot return speaker embeddings
+        diarization, embeddings = _PIPELINE(waveform), None
+    labels = diarization.labels()
+    turns = [{"speaker": speaker, "start": start + turn.start, "end": start + turn.end}
+             for turn, _, speaker in diarization.itertracks(yield_label=True)]
+    speaker_embeddings = None
+    if embeddings is not None:
+        speaker_embeddings = {label: np.asarray(embeddings[i], dtype=np.float32) for i, label in enumerate(labels)}
+    return {"start": start, "end": end, "turns": turns, "embeddings": speaker_embeddings}
+
+
+def cluster_speakers(window_results: List[Dict], threshold: float = CLUSTER_THRESHOLD) -> Dict[Tuple[int, str], str]:
+    """
+    Maps (window index, local label) to a global speaker label. Average-linkage
+    agglomerative clustering on cosine distance; speakers of the same window
+    are never merged.
+    """
+    keys, vectors = [], []
+    for w, result in enumerate(window_results):
+        for label, vector in (result["embeddings"] or {}).items():
+            if np.all(np.isfinite(vector)) and np.linalg.norm(vector) > 0:
+                keys.append((w, label))
+                vectors.append(vector / np.linalg.norm(vector))
+    clusters = [[i] for i in range(len(keys))]
+    if keys:
+        similarity = np.stack(vectors) @ np.stack(vectors).T
+        while len(clusters) > 1:
+            best, pair = None, None
+            for a in range(len(clusters)):
+                windows_a = {keys[i][0] for i in clusters[a]}
+                for b in range(a + 1, len(clusters)):
+                    if windows_a & {keys[i][0] for i in clusters[b]}:
+                        continue
+                    distance = 1 - similarity[np.ix_(clusters[a], clusters[b])].mean()
+                    if distance < threshold and (best is None or distance < best):
+                        best, pair = distance, (a, b)
+            if pair is None:
+                break
+            a, b = pair
+            clusters[a] += clusters.pop(b)
+    mapping = {}
+    for n, cluster in enumerate(sorted(clusters, key=min)):
+        for i in cluster:
+            mapping[keys[i]] = f"SPEAKER_{n:02d}"
+    return mapping
+
+
+def match_by_overlap(window_results: List[Dict]) -> Dict[Tuple[int, str], str]:
+    """
+    Fallback when embeddings are unavailable: maps each window's speakers to
+    the previous window's by how much they co-occur in the shared overlap.
+    """
+    from scipy.optimize import linear_sum_assignment
+    mapping = {}
+    next_id = 0
+    for w, result in enumerate(window_results):
+        labels = sorted({t["speaker"] for t in result["turns"]})
+        assigned = {}
+        if w > 0:
+            previous = window_results[w - 1]
+            overlap = (result["start"], previous["end"])
+            prev_labels = sorted({t["speaker"] for t in previous["turns"]})
+            if labels and prev_labels and overlap[1] > overlap[0]:
+                cooccurrence = np.zeros((len(labels), len(prev_labels)))
+                for t in result["turns"]:
+                    for p in previous["turns"]:
+                        shared = min(t["end"], p["end"], overlap[1]) - max(t["start"], p["start"], overlap[0])
+                        if shared > 0:
+                            cooccurrence[labels.index(t["speaker"]), prev_labels.index(p["speaker"])] += shared
+                rows, cols = linear_sum_assignment(-cooccurrence)
+                for r, c in zip(rows, cols):
+                    if cooccurrence[r, c] > 0:
+                        assigned[labels[r]] = mapping[(w - 1, prev_labels[c])]
+        for label in labels:
+            if label not in assigned:
+                assigned[label] = f"SPEAKER_{next_id:02d}"
+                next_id += 1
+            else:
+                next_id = max(next_id, int(assigned[label].split("_")[1]) + 1)
+            mapping[(w, label)] = assigned[label]
+    return mapping
+
+
+def stitch_windows(window_results: List[Dict], mapping: Dict[Tuple[int, str], str]) -> List[Dict]:
+    """
+    Relabels window turns with global speakers. In each overlap the earlier
+    window owns the first half and the later window the second.
+    """
+    turns = []
+    for w, result in enumerate(window_results):
+        lower = result["start"] if w == 0 else (result["start"] + window_results[w - 1]["end"]) / 2
+        upper = result["end"] if w == len(window_results) - 1 else (window_results[w + 1]["start"] + result["end"]) / 2
+        for turn in result["turns"]:
+            start, end = max(turn["start"], lower), min(turn["end"], upper)
+            if end > start:
+                speaker = mapping.get((w, turn["speaker"]), f"W{w}_{turn['speaker']}")
+                turns.append({"speaker": speaker, "start": start, "end": end})
+    return sorted(turns, key=lambda t: t["start"])
+
+
+def merge_short_turns(turns: List[Dict], min_turn: float = MIN_TURN_SECONDS) -> List[Dict]:
+    """
+    Joins same-speaker turns separated by less than `min_turn` and absorbs
+    turns shorter than `min_turn` into the preceding turn.
+    """
+    def join(items):
+        joined = []
+        for turn in items:
+            if joined and joined[-1]["speaker"] == turn["speaker"] and turn["start"] - joined[-1]["end"] < min_turn:
+                joined[-1]["end"] = max(joined[-1]["end"], turn["end"])
+            else:
+                joined.append(dict(turn))
+        return joined
+
+    turns = join(sorted(turns, key=lambda t: t["start"]))
+    absorbed = []
+    for turn in turns:
+        if absorbed and turn["end"] - turn["start"] < min_turn:
+            absorbed[-1]["end"] = max(absorbed[-1]["end"], turn["end"])
+        else:
+            absorbed.append(turn)
+    # A short first turn joins the one after it
+    if len(absorbed) > 1 and absorbed[0]["end"] - absorbed[0]["start"] < min_turn:
+        absorbed[1]["start"] = absorbed[0]["start"]
+        absorbed.pop(0)
+    return join(absorbed)
+
+
+def diarization_error_rate(reference: List[Dict], hypothesis: List[Dict], frame: float = DER_FRAME_SECONDS) -> Dict:
+    """
+    Frame-level DER of `hypothesis` against `reference` with the optimal
+    one-to-one speaker mapping. Overlapped speech counts once, for the
+    latest-starting turn.
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    end = max([t["end"] for t in reference + hypothesis] or [0.0])
+    frames = int(np.ceil(end / frame))
+
+    def labels(turns):
+        names = sorted({t["speaker"] for t in turns})
+        grid = np.full(frames, -1, dtype=np.int32)
+        for t in sorted(turns, key=lambda t: t["start"]):
+            grid[int(t["start"] / frame):int(np.ceil(t["end"] / frame))] = names.index(t["speaker"])
+        return grid, names
+
+    ref, ref_names = labels(reference)
+    hyp, hyp_names = labels(hypothesis)
+    speech = ref >= 0
+    total = int(speech.sum())
+    missed = int((speech & (hyp < 0)).sum())
+    false_alarm = int((~speech & (hyp >= 0)).sum())
+    both = speech & (hyp >= 0)
+    confusion = int(both.sum())
+    if ref_names and hyp_names:
+        overlap = np.zeros((len(ref_names), len(hyp_names)))
+        np.add.at(overlap, (ref[both], hyp[both]), 1)
+        rows, cols = linear_sum_assignment(-overlap)
+        confusion -= int(overlap[rows, cols].sum())
+    return {
+        "der": (missed + false_alarm + confusion) / total if total else 0.0,
+        "missed": missed * frame,
+        "false_alarm": false_alarm * frame,
+        "confusion": confusion * frame,
+        "reference_speech": total * frame,
+    }
+
+
+def diarize_windowed(audio_path: str, duration: float, workers: Optional[int] = None,
+                     window: float = WINDOW_SECONDS, overlap: float = OVERLAP_SECONDS,
+                     min_turn: float = MIN_TURN_SECONDS) -> List[Dict]:
+    """
+    Diarizes overlapping windows in parallel processes and returns global
+    speaker turns in the diarization agent's format.
+    """
+    from orchestration.resources import thread_budget
+    windows = plan_windows(duration, window, overlap)
+    # Split the diarizer stage's thread budget between the worker processes
+    cores = thread_budget()
+    workers = max(1, min(workers or cores, len(windows)))
+    threads = max(1, cores // workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as executor:
+        futures = [executor.submit(diarize_window, audio_path, start, end) for start, end in windows]
+        results = [f.result() for f in futures]
+    if all(r["embeddings"] is not None for r in results):
+        mapping = cluster_speakers(results)
+    else:
+        mapping = match_by_overlap(results)
+    return merge_short_turns(stitch_windows(results, mapping), min_turn)
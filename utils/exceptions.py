@@ -25,3 +25,19 @@ class OutputProcessingError(Exception):
 class InvalidOutputFormatError(OutputProcessingError):
     """Exception raised for invalid output format."""
     pass
+
+class LLMProcessingError(Exception):
+    """Base exception for LLM API errors."""
+    pass
+
+class QuotaExceededError(LLMProcessingError):
+    """Exception raised when the shared LLM quota cannot be acquired in time."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CapacityExceededError(Exception):
+    """Exception raised when the backend cannot queue another pipeline job."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after